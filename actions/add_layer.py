@@ -6,7 +6,7 @@ or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
 from qgis.core import QgsCategorizedSymbolRenderer, QgsDataSourceUri, QgsFeature, QgsField, QgsGeometry, QgsFillSymbol,\
-    QgsMarkerSymbol, QgsLayerTreeLayer, QgsLineSymbol, QgsProject, QgsRectangle, QgsRendererCategory, \
+    QgsMarkerSymbol, QgsLayerTreeLayer, QgsLineSymbol, QgsPointXY, QgsProject, QgsRectangle, QgsRendererCategory, \
     QgsSymbol, QgsVectorLayer, QgsVectorLayerExporter
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtGui import QColor
@@ -355,33 +355,32 @@ class AddLayer(object):
         """
 
         prov = virtual_layer.dataProvider()
-        # Enter editing mode
-        virtual_layer.startEditing()
+        features = data[layer_type]['features']
 
-        # Add headers to layer
+        # Add headers to layer. Fields are strings, as styles and filters of these layers expect
+        keys = []
         if counter > 0:
-            for key, value in list(data[layer_type]['features'][0]['properties'].items()):
-                if key == 'the_geom':
-                    continue
-                prov.addAttributes([QgsField(str(key), QVariant.String)])
+            keys = [key for key in features[0]['properties'] if key != 'the_geom']
+        prov.addAttributes([QgsField(str(key), QVariant.String) for key in keys])
+        virtual_layer.updateFields()
 
-        for feature in data[layer_type]['features']:
+        fields = virtual_layer.fields()
+        qgs_features = []
+        for feature in features:
             geometry = self.get_geometry(feature)
             if not geometry:
                 continue
-            attributes = []
-            fet = QgsFeature()
+            properties = feature['properties']
+            fet = QgsFeature(fields)
             fet.setGeometry(geometry)
-            for key, value in feature['properties'].items():
-                if key == 'the_geom':
-                    continue
-                attributes.append(value)
+            fet.setAttributes([properties.get(key) for key in keys])
+            qgs_features.append(fet)
 
-            fet.setAttributes(attributes)
-            prov.addFeatures([fet])
+        # Add all the features at once. Spatial index is created first so it is filled while adding them
+        prov.createSpatialIndex()
+        prov.addFeatures(qgs_features)
+        virtual_layer.updateExtents()
 
-        # Commit changes
-        virtual_layer.commitChanges()
         QgsProject.instance().addMapLayer(virtual_layer, False)
         root = QgsProject.instance().layerTreeRoot()
         my_group = root.findGroup(group)
@@ -396,6 +395,7 @@ class AddLayer(object):
         :return: Geometry of the feature (QgsGeometry)
         functions  called in -> getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
             def get_point(self, feature)
+            get_multipoint(self, feature)
             get_linestring(self, feature)
             get_multilinestring(self, feature)
             get_polygon(self, feature)
@@ -403,11 +403,8 @@ class AddLayer(object):
         """
 
         try:
-            coordinates = getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
-            type_ = feature['geometry']['type']
-            geometry = f"{type_}{coordinates}"
-            return QgsGeometry.fromWkt(geometry)
-        except AttributeError as e:
+            return getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
+        except (AttributeError, IndexError, TypeError) as e:
             self.controller.log_info(f"{type(e).__name__} --> {e}")
             return None
 
@@ -415,90 +412,81 @@ class AddLayer(object):
     def get_point(self, feature):
         """ Manage feature geometry when is Point
         :param feature: feature to get geometry type and coordinates (GeoJson)
-        :return: Coordinates of the feature (String)
+        :return: Geometry of the feature (QgsGeometry)
+        This function is called in def get_geometry(self, feature)
+              geometry = getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
+          """
+
+        coords = feature['geometry']['coordinates']
+        return QgsGeometry.fromPointXY(QgsPointXY(coords[0], coords[1]))
+
+
+    def get_multipoint(self, feature):
+        """ Manage feature geometry when is MultiPoint
+        :param feature: feature to get geometry type and coordinates (GeoJson)
+        :return: Geometry of the feature (QgsGeometry)
         This function is called in def get_geometry(self, feature)
               geometry = getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
           """
-        return f"({feature['geometry']['coordinates'][0]} {feature['geometry']['coordinates'][1]})"
+        return QgsGeometry.fromMultiPointXY(self.get_coordinates(feature['geometry']['coordinates']))
 
 
     def get_linestring(self, feature):
         """ Manage feature geometry when is LineString
         :param feature: feature to get geometry type and coordinates (GeoJson)
-        :return: Coordinates of the feature (String)
+        :return: Geometry of the feature (QgsGeometry)
         This function is called in def get_geometry(self, feature)
               geometry = getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
           """
-        return self.get_coordinates(feature)
+        return QgsGeometry.fromPolylineXY(self.get_coordinates(feature['geometry']['coordinates']))
 
 
     def get_multilinestring(self, feature):
         """ Manage feature geometry when is MultiLineString
         :param feature: feature to get geometry type and coordinates (GeoJson)
-        :return: Coordinates of the feature (String)
+        :return: Geometry of the feature (QgsGeometry)
         This function is called in def get_geometry(self, feature)
               geometry = getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
           """
-        return self.get_multi_coordinates(feature)
+        return QgsGeometry.fromMultiPolylineXY(self.get_multi_coordinates(feature['geometry']['coordinates']))
 
 
     def get_polygon(self, feature):
         """ Manage feature geometry when is Polygon
         :param feature: feature to get geometry type and coordinates (GeoJson)
-        :return: Coordinates of the feature (String)
+        :return: Geometry of the feature (QgsGeometry)
         This function is called in def get_geometry(self, feature)
               geometry = getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
           """
-        return self.get_multi_coordinates(feature)
+        return QgsGeometry.fromPolygonXY(self.get_multi_coordinates(feature['geometry']['coordinates']))
 
 
     def get_multipolygon(self, feature):
         """ Manage feature geometry when is MultiPolygon
         :param feature: feature to get geometry type and coordinates (GeoJson)
-        :return: Coordinates of the feature (String)
+        :return: Geometry of the feature (QgsGeometry)
         This function is called in def get_geometry(self, feature)
               geometry = getattr(self, f"get_{feature['geometry']['type'].lower()}")(feature)
         """
 
-        coordinates = "("
-        for coords in feature['geometry']['coordinates']:
-            coordinates += "("
-            for cc in coords:
-                coordinates += "("
-                for c in cc:
-                    coordinates += f"{c[0]} {c[1]}, "
-                coordinates = coordinates[:-2] + "), "
-            coordinates = coordinates[:-2] + "), "
-        coordinates = coordinates[:-2] + ")"
-        return coordinates
-
-
-    def get_coordinates(self, feature):
-        """ Get coordinates of the received feature, to be a point
-        :param feature: Json with the information of the received feature (geoJson)
-        :return: Coordinates of the feature received (String)
-        """
+        polygons = [self.get_multi_coordinates(rings) for rings in feature['geometry']['coordinates']]
+        return QgsGeometry.fromMultiPolygonXY(polygons)
+
 
-        coordinates = "("
-        for coords in feature['geometry']['coordinates']:
-            coordinates += f"{coords[0]} {coords[1]}, "
-        coordinates = coordinates[:-2] + ")"
-        return coordinates
+    def get_coordinates(self, coordinates):
+        """ Get points of a list of coordinates
+        :param coordinates: GeoJson coordinates [[x, y], ...] (list)
+        :return: Points (list of QgsPointXY)
+        """
+        return [QgsPointXY(c[0], c[1]) for c in coordinates]
 
 
-    def get_multi_coordinates(self, feature):
-        """ Get coordinates of the received feature, can be a line
-        :param feature: Json with the information of the received feature (geoJson)
-        :return: Coordinates of the feature received (String)
+    def get_multi_coordinates(self, coordinates):
+        """ Get lists of points of a list of lists of coordinates, like lines or polygon rings
+        :param coordinates: GeoJson coordinates [[[x, y], ...], ...] (list)
+        :return: Lists of points (list of lists of QgsPointXY)
         """
-        coordinates = "("
-        for coords in feature['geometry']['coordinates']:
-            coordinates += "("
-            for c in coords:
-                coordinates += f"{c[0]} {c[1]}, "
-            coordinates = coordinates[:-2] + "), "
-        coordinates = coordinates[:-2] + ")"
-        return coordinates
+        return [[QgsPointXY(c[0], c[1]) for c in coords] for coords in coordinates]
 
 
     def populate_vlayer_old(self, virtual_layer, data, layer_type, counter, group='GW Temporal Layers'):
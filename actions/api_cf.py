@@ -5,7 +5,7 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 # -*- coding: latin-1 -*-
-from qgis.core import QgsGeometry, QgsMapToPixel, QgsPointXY, QgsVectorLayer
+from qgis.core import QgsApplication, QgsGeometry, QgsMapToPixel, QgsPointXY, QgsTask, QgsVectorLayer
 from qgis.gui import QgsDateTimeEdit, QgsMapToolEmitPoint, QgsRubberBand, QgsVertexMarker
 from qgis.PyQt.QtCore import pyqtSignal, QDate, QObject, QPoint, QStringListModel, Qt
 from qgis.PyQt.QtGui import QColor, QCursor, QIcon, QStandardItem, QStandardItemModel
@@ -24,10 +24,12 @@ import webbrowser
 from collections import OrderedDict
 from functools import partial
 from sip import isdeleted
+from time import time
 
 from .. import utils_giswater
 from .api_catalog import ApiCatalog
 from .api_parent import ApiParent
+from .identify_engine import IdentifyEngine
 from .manage_document import ManageDocument
 from .manage_element import ManageElement
 from .manage_gallery import ManageGallery
@@ -39,6 +41,25 @@ from ..actions.api_dimensioning import ApiDimensioning
 
 class ApiCF(ApiParent, QObject):
 
+    # Load times of tabs of all info forms: {tab_name: {'prefetch' | 'fill': [loads, seconds]}}
+    tab_load_times = {}
+    # Attribute that controls if tab is loaded
+    tab_loaded_attrs = {'tab_elements': 'tab_element_loaded', 'tab_relations': 'tab_relations_loaded',
+                        'tab_connections': 'tab_connections_loaded', 'tab_hydrometer': 'tab_hydrometer_loaded',
+                        'tab_hydrometer_val': 'tab_hydrometer_val_loaded', 'tab_visit': 'tab_visit_loaded',
+                        'tab_event': 'tab_event_loaded', 'tab_documents': 'tab_document_loaded',
+                        'tab_rpt': 'tab_rpt_loaded', 'tab_plan': 'tab_plan_loaded'}
+    # Tables whose column configuration is read when tab is prefetched
+    prefetch_tables = {'tab_elements': ['v_ui_element_x_{geom_type}'],
+                       'tab_relations': ['v_ui_{geom_type}_x_relations'],
+                       'tab_connections': ['v_ui_node_x_connection_upstream', 'v_ui_node_x_connection_downstream'],
+                       'tab_hydrometer': ['v_rtc_hydrometer'],
+                       'tab_hydrometer_val': ['v_ui_hydroval_x_connec'],
+                       'tab_visit': [],
+                       'tab_event': ['v_ui_event_x_{geom_type}'],
+                       'tab_documents': ['v_ui_doc_x_{geom_type}'],
+                       'tab_plan': []}
+
     # :var signal_activate: emitted from def cancel_snapping_tool(self, dialog, action) in order to re-start CadApiInfo
     signal_activate = pyqtSignal()
 
@@ -55,6 +76,8 @@ class ApiCF(ApiParent, QObject):
         self.layer_new_feature = None
         self.tab_type = tab_type
         self.connected = False
+        self.prefetch_id = 0
+        self.prefetch_tasks = []
         self.event_id = None
         self.visit_id = None
 
@@ -66,15 +89,7 @@ class ApiCF(ApiParent, QObject):
         y = cursor.pos().y()
         click_point = QPoint(x + 5, y + 5)
 
-        visible_layers = self.get_visible_layers(as_list=True)
-        scale_zoom = self.iface.mapCanvas().scale()
-
-        # Get layers under mouse clicked
-        extras = f'"pointClickCoords":{{"xcoord":{point.x()}, "ycoord":{point.y()}}}, '
-        extras += f'"visibleLayers":{visible_layers}, '
-        extras += f'"zoomScale":{scale_zoom} '
-        body = self.create_body(extras=extras)
-        json_result = self.controller.get_json('gw_fct_getlayersfromcoordinates', body)
+        json_result = self.get_layers_from_coordinates(point)
         if not json_result:
             return False
 
@@ -117,6 +132,35 @@ class ApiCF(ApiParent, QObject):
         main_menu.exec_(click_point)
 
 
+    def get_layers_from_coordinates(self, point):
+        """ Get features of visible layers under @point.
+            Features of arc, node, connec and gully layers are found with the spatial indexes of IdentifyEngine,
+            the server is only asked for the other layers or while indexes are being built """
+
+        if self.controller.identify_engine is None:
+            self.controller.identify_engine = IdentifyEngine(self.controller)
+        engine = self.controller.identify_engine
+
+        canvas = self.iface.mapCanvas()
+        layers_names, server_layers = engine.identify(canvas, point, self.get_visible_db_layers())
+        if not server_layers:
+            return {'status': 'Accepted', 'body': {'data': {'layersNames': layers_names}}}
+
+        # Get layers under mouse clicked
+        visible_layers = [self.controller.get_layer_source_table_name(layer) for layer in server_layers]
+        extras = f'"pointClickCoords":{{"xcoord":{point.x()}, "ycoord":{point.y()}}}, '
+        extras += f'"visibleLayers":{json.dumps(visible_layers)}, '
+        extras += f'"zoomScale":{canvas.scale()} '
+        body = self.create_body(extras=extras)
+        json_result = self.controller.get_json('gw_fct_getlayersfromcoordinates', body)
+        if not json_result:
+            return json_result
+
+        engine.add_icons(json_result['body']['data']['layersNames'])
+        json_result['body']['data']['layersNames'] = layers_names + json_result['body']['data']['layersNames']
+        return json_result
+
+
     def identify_all(self, complet_list, rb_list):
 
         self.resetRubberbands()
@@ -184,6 +228,7 @@ class ApiCF(ApiParent, QObject):
         :return:
         """
         # Manage tab signal
+        self.cancel_prefetch()
         self.tab_element_loaded = False
         self.tab_relations_loaded = False
         self.tab_connections_loaded = False
@@ -643,6 +688,7 @@ class ApiCF(ApiParent, QObject):
             self.controller.dlg_docker.setWindowTitle(title)
             btn_cancel.clicked.connect(self.manage_docker_close)
         else:
+            dlg_cf.dlg_closed.connect(self.cancel_prefetch)
             dlg_cf.dlg_closed.connect(self.roll_back)
             dlg_cf.dlg_closed.connect(partial(self.resetRubberbands))
             dlg_cf.dlg_closed.connect(partial(self.save_settings, dlg_cf))
@@ -662,6 +708,7 @@ class ApiCF(ApiParent, QObject):
         # Open dialog
         self.open_dialog(dlg_cf, dlg_name='info_feature')
         dlg_cf.setWindowTitle(title)
+        self.prefetch_tabs(dlg_cf, new_feature)
 
         return self.complet_result, dlg_cf
 
@@ -764,6 +811,7 @@ class ApiCF(ApiParent, QObject):
 
 
     def manage_docker_close(self):
+        self.cancel_prefetch()
         self.roll_back()
         self.resetRubberbands()
         self.controller.close_docker()
@@ -1618,45 +1666,151 @@ class ApiCF(ApiParent, QObject):
         index_tab = self.tab_main.currentIndex()
         tab_name = self.tab_main.widget(index_tab).objectName()
         self.show_actions(dialog, tab_name)
+        self.load_tab(tab_name, new_feature)
+
+
+    def load_tab(self, tab_name, new_feature, prefetched=None):
+        """ Fill tab @tab_name if it has not been loaded yet
+        :param prefetched: data of the tab read in background by def run_prefetch_tab(...) (dict)
+        """
+
+        loaded_attr = self.tab_loaded_attrs.get(tab_name)
+        if loaded_attr is None or getattr(self, loaded_attr):
+            return
+
+        if prefetched is None:
+            prefetched = {}
+        time_start = time()
 
         # Tab 'Elements'
-        if self.tab_main.widget(index_tab).objectName() == 'tab_elements' and not self.tab_element_loaded:
+        if tab_name == 'tab_elements':
             self.fill_tab_element()
-            self.tab_element_loaded = True
         # Tab 'Relations'
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_relations' and not self.tab_relations_loaded:
+        elif tab_name == 'tab_relations':
             self.fill_tab_relations()
-            self.tab_relations_loaded = True
         # Tab 'Connections'
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_connections' and not self.tab_connections_loaded:
+        elif tab_name == 'tab_connections':
             self.fill_tab_connections()
-            self.tab_connections_loaded = True
         # Tab 'Hydrometer'
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_hydrometer' and not self.tab_hydrometer_loaded:
+        elif tab_name == 'tab_hydrometer':
             self.fill_tab_hydrometer()
-            self.tab_hydrometer_loaded = True
         # Tab 'Hydrometer values'
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_hydrometer_val' and not self.tab_hydrometer_val_loaded:
+        elif tab_name == 'tab_hydrometer_val':
             self.fill_tab_hydrometer_values()
-            self.tab_hydrometer_val_loaded = True
         # Tab 'Event'
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_visit' and not self.tab_visit_loaded:
-            self.fill_tab_visit(self.geom_type)
-            self.tab_visit_loaded = True
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_event' and not self.tab_event_loaded:
+        elif tab_name == 'tab_visit':
+            self.fill_tab_visit(self.geom_type, prefetched.get('visit_classes'))
+        elif tab_name == 'tab_event':
             self.fill_tab_event(self.geom_type)
-            self.tab_event_loaded = True
         # Tab 'Documents'
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_documents' and not self.tab_document_loaded:
+        elif tab_name == 'tab_documents':
             self.fill_tab_document()
-            self.tab_document_loaded = True
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_rpt' and not self.tab_rpt_loaded:
-            self.fill_tab_rpt(partial(self.complet_result, new_feature))
-            self.tab_rpt_loaded = True
+        elif tab_name == 'tab_rpt':
+            self.fill_tab_rpt(self.complet_result, new_feature)
         # Tab 'Plan'
-        elif self.tab_main.widget(index_tab).objectName() == 'tab_plan' and not self.tab_plan_loaded:
-            self.fill_tab_plan(self.complet_result)
-            self.tab_plan_loaded = True
+        elif tab_name == 'tab_plan':
+            self.fill_tab_plan(self.complet_result, prefetched.get('plan'))
+
+        setattr(self, loaded_attr, True)
+        self.add_tab_load_time(tab_name, 'fill', time() - time_start)
+
+
+    def prefetch_tabs(self, dialog, new_feature):
+        """ Load tabs listed in 'system_variables/cf_prefetch_tabs' once the form is open, without waiting
+            for the user to select them. Their queries that don't need widgets run in background tasks with
+            connections of the pool, then each tab is filled in the UI thread when its data is ready """
+
+        tab_names = self.controller.settings.value('system_variables/cf_prefetch_tabs', '')
+        if isinstance(tab_names, str):
+            tab_names = tab_names.split(',')
+        tab_names = [tab_name.strip() for tab_name in tab_names if tab_name.strip()]
+        if not tab_names:
+            return
+
+        self.cancel_prefetch()
+        available = [self.tab_main.widget(index).objectName() for index in range(self.tab_main.count())]
+        for tab_name in tab_names:
+            # Tab 'rpt' depends on the selected tab
+            if tab_name not in available or tab_name not in self.prefetch_tables or tab_name == 'tab_rpt':
+                continue
+            task = QgsTask.fromFunction(f"Prefetch {tab_name}", self.run_prefetch_tab, tab_name,
+                                        on_finished=partial(self.prefetch_tab_finished, dialog, new_feature,
+                                                            self.prefetch_id, tab_name, time()),
+                                        flags=QgsTask.Silent)
+            self.prefetch_tasks.append(task)
+            QgsApplication.taskManager().addTask(task)
+
+
+    def run_prefetch_tab(self, task, tab_name):
+        """ Executed in a background thread. Read data of @tab_name that doesn't need any widget.
+            Database errors are not shown here, they are returned in key 'error' """
+
+        prefetched = {}
+        dao = self.controller.dao
+        with dao.lease():
+            # Configuration of columns is cached, so it is not read again when tab is filled
+            for table_name in self.prefetch_tables[tab_name]:
+                if task.isCanceled():
+                    return None
+                table_name = table_name.format(geom_type=self.geom_type)
+                if self.controller.table_models.get_columns_config(table_name, manage_result=False) is None:
+                    return {'error': str(dao.last_error)}
+
+            if tab_name == 'tab_visit':
+                sql = (f"SELECT id, ui_tablename FROM {self.schema_name}.config_visit_class"
+                       f" WHERE feature_type = upper('{self.geom_type}')")
+                prefetched['visit_classes'] = dao.get_rows(sql, commit=True)
+            elif tab_name == 'tab_plan' and self.geom_type in ('arc', 'node'):
+                prefetched['plan'] = self.get_info_plan(self.complet_result, manage_result=False)
+            if dao.last_error:
+                return {'error': str(dao.last_error)}
+
+        return prefetched
+
+
+    def prefetch_tab_finished(self, dialog, new_feature, prefetch_id, tab_name, time_start, exception, result=None):
+        """ Executed in the UI thread. Fill tab with prefetched data if its dialog is still open """
+
+        if prefetch_id != self.prefetch_id or self.dlg_is_destroyed or isdeleted(dialog):
+            return
+
+        if exception or result is None:
+            self.controller.log_info(f"Prefetch of {tab_name} not completed: {exception}")
+            return
+
+        # Tab is not filled, so it will be read again when selected
+        if 'error' in result:
+            self.controller.show_warning(f"Prefetch of {tab_name} failed", parameter=result['error'])
+            return
+
+        # Show message of failed result and manage options for layers, not allowed in the background thread
+        if result.get('plan'):
+            self.controller.manage_json_result(result['plan'])
+
+        self.add_tab_load_time(tab_name, 'prefetch', time() - time_start)
+        self.load_tab(tab_name, new_feature, result)
+
+
+    def cancel_prefetch(self):
+        """ Cancel running prefetch tasks and discard their results """
+
+        self.prefetch_id += 1
+        for task in self.prefetch_tasks:
+            try:
+                task.cancel()
+            except RuntimeError:
+                # Task already finished and deleted
+                pass
+        self.prefetch_tasks = []
+
+
+    def add_tab_load_time(self, tab_name, step, seconds):
+        """ Record load time of tabs to tune which ones are worth to prefetch """
+
+        times = ApiCF.tab_load_times.setdefault(tab_name, {}).setdefault(step, [0, 0.0])
+        times[0] += 1
+        times[1] += seconds
+        self.controller.log_info(f"Tab {tab_name} {step}: {seconds:.3f} s (average {times[1] / times[0]:.3f} s)")
 
 
     def fill_tab_element(self):
@@ -1836,24 +1990,21 @@ class ApiCF(ApiParent, QObject):
         if self.schema_name not in table_name:
             table_name = self.schema_name + "." + table_name
 
-        # Set model
-        model = QSqlTableModel(db=self.controller.db)
-        model.setTable(table_name)
-        model.setEditStrategy(edit_strategy)
-        if expr_filter:
-            model.setFilter(expr_filter)
-        model.select()
+        if not widget:
+            self.controller.log_info("set_model_to_table: widget not found")
+
+        # Tables with column configuration are sorted by first column, as set_columns_config will do
+        sort_order = None
+        if self.controller.table_models.get_columns_config(table_name.split('.')[-1]):
+            sort_order = 0
+
+        # Set model. It is reused if widget has been already filled with this table
+        model = self.controller.table_models.select(widget, table_name, expr_filter, edit_strategy, sort_order)
 
         # Check for errors
         if model.lastError().isValid():
             self.controller.show_warning(model.lastError().text())
 
-        # Attach model to table view
-        if widget:
-            widget.setModel(model)
-        else:
-            self.controller.log_info("set_model_to_table: widget not found")
-
 
     """ FUNCTIONS RELATED WITH TAB RELATIONS"""
 
@@ -2104,11 +2255,15 @@ class ApiCF(ApiParent, QObject):
 
     """ FUNTIONS RELATED WITH TAB VISIT"""
 
-    def fill_tab_visit(self, geom_type):
-        """ Fill tab Visit """
+    def fill_tab_visit(self, geom_type, rows=None):
+        """ Fill tab Visit
+        :param rows: visit classes of @geom_type, if already read (list)
+        """
 
-        sql = f"SELECT id, ui_tablename FROM {self.schema_name}.config_visit_class WHERE feature_type = upper('{geom_type}')"
-        rows = self.controller.get_rows(sql)
+        if rows is None:
+            sql = (f"SELECT id, ui_tablename FROM {self.schema_name}.config_visit_class"
+                   f" WHERE feature_type = upper('{geom_type}')")
+            rows = self.controller.get_rows(sql)
         table_visit_node_dict = {}
         for row in rows:
             table_visit_node_dict[row[0]] = str(row[1])
@@ -3032,20 +3187,30 @@ class ApiCF(ApiParent, QObject):
 
     """ FUNCTIONS RELATED WITH TAB PLAN """
 
-    def fill_tab_plan(self, complet_result):
+    def get_info_plan(self, complet_result, manage_result=True):
+        """ Get fields of tab 'Plan' from database
+        :param manage_result: Show errors and manage result, False when called from a background task (bool)
+        """
+
+        form = '"tabName":"tab_plan"'
+        feature = f'"featureType":"{complet_result[0]["body"]["feature"]["featureType"]}", '
+        feature += f'"tableName":"{self.tablename}", '
+        feature += f'"idName":"{self.field_id}", '
+        feature += f'"id":"{self.feature_id}"'
+        body = self.create_body(form, feature, filter_fields='')
+        return self.controller.get_json('gw_fct_getinfoplan', body, manage_result=manage_result)
+
+
+    def fill_tab_plan(self, complet_result, json_result=None):
+        """
+        :param json_result: result of gw_fct_getinfoplan, if already read (dict)
+        """
 
         plan_layout = self.dlg_cf.findChild(QGridLayout, 'plan_layout')
 
         if self.geom_type == 'arc' or self.geom_type == 'node':
-            index_tab = self.tab_main.currentIndex()
-            tab_name = self.tab_main.widget(index_tab).objectName()
-            form = f'"tabName":"{tab_name}"'
-            feature = f'"featureType":"{complet_result[0]["body"]["feature"]["featureType"]}", '
-            feature += f'"tableName":"{self.tablename}", '
-            feature += f'"idName":"{self.field_id}", '
-            feature += f'"id":"{self.feature_id}"'
-            body = self.create_body(form, feature, filter_fields='')
-            json_result = self.controller.get_json('gw_fct_getinfoplan', body)
+            if json_result is None:
+                json_result = self.get_info_plan(complet_result)
             if not json_result:
                 return False
 
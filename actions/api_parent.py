@@ -13,7 +13,6 @@ from qgis.PyQt.QtGui import QColor, QFontMetrics, QStandardItemModel, QStandardI
 from qgis.PyQt.QtWidgets import QLineEdit, QSizePolicy, QWidget, QComboBox, QGridLayout, QSpacerItem, QLabel, QCheckBox
 from qgis.PyQt.QtWidgets import QCompleter, QToolButton, QFrame, QSpinBox, QDoubleSpinBox, QDateEdit, QAction
 from qgis.PyQt.QtWidgets import QTableView, QTabWidget, QPushButton, QTextEdit, QApplication
-from qgis.PyQt.QtSql import QSqlTableModel
 
 import os
 import re
@@ -47,23 +46,32 @@ class ApiParent(ParentAction):
         visible_layer = '{'
         if as_list is True:
             visible_layer = '['
+        for layer in self.get_visible_db_layers():
+            table_name = self.controller.get_layer_source_table_name(layer)
+            visible_layer += f'"{table_name}", '
+        visible_layer = visible_layer[:-2]
+
+        if as_list is True:
+            visible_layer += ']'
+        else:
+            visible_layer += '}'
+        return visible_layer
+
+
+    def get_visible_db_layers(self):
+        """ Return list of visible layers in TOC loaded from tables of the DB """
+
+        visible_layers = []
         layers = self.controller.get_layers()
         for layer in layers:
             if self.controller.is_layer_visible(layer):
-                table_name = self.controller.get_layer_source_table_name(layer)
                 table = layer.dataProvider().dataSourceUri()
                 # TODO:: Find differences between PostgreSQL and query layers, and replace this if condition.
                 if 'SELECT row_number() over ()' in str(table) or 'srid' not in str(table):
                     continue
+                visible_layers.append(layer)
 
-                visible_layer += f'"{table_name}", '
-        visible_layer = visible_layer[:-2]
-
-        if as_list is True:
-            visible_layer += ']'
-        else:
-            visible_layer += '}'
-        return visible_layer
+        return visible_layers
 
 
     def get_editable_layers(self):
@@ -614,9 +622,7 @@ class ApiParent(ParentAction):
 
         # Set width and alias of visible columns
         columns_to_delete = []
-        sql = (f"SELECT columnindex, width, alias, status FROM config_form_tableview"
-               f" WHERE tablename = '{table_name}' ORDER BY columnindex")
-        rows = self.controller.get_rows(sql, log_info=True)
+        rows = self.controller.table_models.get_columns_config(table_name)
         if not rows:
             return widget
 
@@ -634,8 +640,10 @@ class ApiParent(ParentAction):
         # Set order
         if isQStandardItemModel:
             widget.model().sort(sort_order, Qt.AscendingOrder)
-        else:
+        elif widget.model().property('sort_order') != sort_order:
+            # Select again only if model has not been selected with this order
             widget.model().setSort(sort_order, Qt.AscendingOrder)
+            widget.model().setProperty('sort_order', sort_order)
             widget.model().select()
         # Delete columns
         for column in columns_to_delete:
@@ -923,22 +931,13 @@ class ApiParent(ParentAction):
         if self.schema_name not in table_name:
             table_name = self.schema_name + "." + table_name
 
-        # Set model
-        model = QSqlTableModel(db=self.controller.db)
-        model.setTable(table_name)
-        model.setEditStrategy(QSqlTableModel.OnManualSubmit)
-        model.setSort(0, 0)
-        if filter_:
-            model.setFilter(filter_)
-        model.select()
+        # Set model. It is reused if widget has been already filled with this table
+        model = self.controller.table_models.select(widget, table_name, filter_, sort_order=0)
 
         # Check for errors
         if model.lastError().isValid():
             self.controller.show_warning(model.lastError().text())
 
-        # Attach model to table view
-        widget.setModel(model)
-
 
     def populate_basic_info(self, dialog, result, field_id):
 
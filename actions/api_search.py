@@ -6,7 +6,7 @@ or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
 from qgis.core import QgsPointXY
-from qgis.PyQt.QtCore import QStringListModel, Qt
+from qgis.PyQt.QtCore import QStringListModel, Qt, QTimer
 from qgis.PyQt.QtGui import QColor
 from qgis.PyQt.QtSql import QSqlTableModel
 from qgis.PyQt.QtWidgets import QAbstractItemView, QComboBox, QCompleter, QFileDialog, QGridLayout, QHeaderView, \
@@ -25,6 +25,7 @@ from .manage_document import ManageDocument
 from .manage_new_psector import ManageNewPsector
 from .manage_visit import ManageVisit
 from .api_parent import ApiParent
+from .search_engine import SearchEngine
 from ..ui_manager import SearchUi, InfoGenericUi, SearchWorkcat
 
 
@@ -42,6 +43,8 @@ class ApiSearch(ApiParent):
         self.lbl_visible = False
         self.dlg_search = None
         self.is_mincut = False
+        self.search_engine = SearchEngine(controller)
+        self.search_debounce = int(settings.value('system_variables/search_debounce', 300))
 
 
     def init_dialog(self):
@@ -60,6 +63,8 @@ class ApiSearch(ApiParent):
         open_search = self.controller.get_user_setting_value('open_search', 'false')
         if open_search in ("True", "true", True) and dlg_mincut is None and load_project is False:
             return
+        # Features or selectors may have changed since the dialog was last opened
+        self.search_engine.clear_cache()
         form = ""
         if self.dlg_search is None and dlg_mincut is None:
             self.init_dialog()
@@ -133,6 +138,8 @@ class ApiSearch(ApiParent):
 
     def close_search(self):
 
+        self.search_engine.cancel()
+        self.search_engine.clear_cache()
         self.dlg_search = None
         self.controller.set_user_settings_value('open_search', 'false')
 
@@ -144,11 +151,20 @@ class ApiSearch(ApiParent):
             model = QStringListModel()
             completer.highlighted.connect(partial(self.check_tab, completer))
             self.make_list(completer, model, widget)
-            widget.textChanged.connect(partial(self.make_list, completer, model, widget))
+            # Wait until user stops typing before searching
+            timer = QTimer(widget)
+            timer.setSingleShot(True)
+            timer.setInterval(self.search_debounce)
+            timer.timeout.connect(partial(self.make_list, completer, model, widget))
+            widget.textChanged.connect(partial(self.restart_timer, timer))
 
         return widget
 
 
+    def restart_timer(self, timer, text=None):
+        timer.start()
+
+
     def check_tab(self, completer, is_add_schema=False):
 
         # We look for the index of current tab so we can search by name
@@ -294,7 +310,6 @@ class ApiSearch(ApiParent):
         extras_search = ''
         form_search_add = ''
         extras_search_add = ''
-        result = None
         index = self.dlg_search.main_tab.currentIndex()
         combo_list = self.dlg_search.main_tab.widget(index).findChildren(QComboBox)
         line_list = self.dlg_search.main_tab.widget(index).findChildren(QLineEdit)
@@ -323,34 +338,41 @@ class ApiSearch(ApiParent):
                 return
 
             qgis_project_add_schema = self.controller.plugin_settings_value('gwAddSchema')
+            # Search values other than typed text identify cached results
+            key = (form_search, extras_search, str(qgis_project_add_schema))
             extras_search += f'"{line_edit.property("columnname")}":{{"text":"{value}"}}, '
             extras_search += f'"addSchema":"{qgis_project_add_schema}"'
             extras_search_add += f'"{line_edit.property("columnname")}":{{"text":"{value}"}}'
             body = self.create_body(form=form_search, extras=extras_search)
-            result = self.controller.get_json('gw_fct_setsearch', body, log_sql=True)
-            if not result:
-                return False
+            self.search_engine.search('gw_fct_setsearch', key, str(value), body,
+                partial(self.set_search_result, completer, model, widget, line_list, form_search_add,
+                        extras_search_add))
+
+
+    def set_search_result(self, completer, model, widget, line_list, form_search_add, extras_search_add, result):
+        """ Populate widget (QLineEdit) with @result of gw_fct_setsearch and search second QLineEdit """
 
-            if result:
-                self.result_data = result
+        if self.dlg_search is None:
+            return
+
+        self.result_data = result
 
         # Set label visible
-        if result:
-            if self.result_data['data'] == {} and self.lbl_visible:
-                self.dlg_search.lbl_msg.setVisible(True)
-                if len(line_list) == 2:
-                    widget_add = line_list[1]
-                    widget_add.setReadOnly(True)
-                    widget_add.setStyleSheet("QLineEdit { background: rgb(242, 242, 242); color: rgb(100, 100, 100)}")
-            else:
-                self.lbl_visible = True
-                self.dlg_search.lbl_msg.setVisible(False)
+        if self.result_data['data'] == {} and self.lbl_visible:
+            self.dlg_search.lbl_msg.setVisible(True)
+            if len(line_list) == 2:
+                widget_add = line_list[1]
+                widget_add.setReadOnly(True)
+                widget_add.setStyleSheet("QLineEdit { background: rgb(242, 242, 242); color: rgb(100, 100, 100)}")
+        else:
+            self.lbl_visible = True
+            self.dlg_search.lbl_msg.setVisible(False)
 
-            # Get list of items from returned json from data base and make a list for completer
-            display_list = []
-            for data in self.result_data['data']:
-                display_list.append(data['display_name'])
-            self.set_completer_object_api(completer, model, widget, display_list)
+        # Get list of items from returned json from data base and make a list for completer
+        display_list = []
+        for data in self.result_data['data']:
+            display_list.append(data['display_name'])
+        self.set_completer_object_api(completer, model, widget, display_list)
 
         if len(line_list) == 2:
             line_edit_add = line_list[1]
@@ -358,19 +380,24 @@ class ApiSearch(ApiParent):
             if str(value) == 'null':
                 return
 
+            key = (form_search_add, extras_search_add)
             extras_search_add += f', "{line_edit_add.property("columnname")}":{{"text":"{value}"}}'
             body = self.create_body(form=form_search_add, extras=extras_search_add)
-            result = self.controller.get_json('gw_fct_setsearchadd', body, log_sql=True)
-            if not result:
-                return False
-
-            if result:
-                self.result_data = result
-                if result is not None:
-                    display_list = []
-                    for data in self.result_data['data']:
-                        display_list.append(data['display_name'])
-                    self.set_completer_object_api(completer, model, line_edit_add, display_list)
+            self.search_engine.search('gw_fct_setsearchadd', key, str(value), body,
+                partial(self.set_search_add_result, completer, model, line_edit_add))
+
+
+    def set_search_add_result(self, completer, model, line_edit_add, result):
+        """ Populate second QLineEdit with @result of gw_fct_setsearchadd """
+
+        if self.dlg_search is None:
+            return
+
+        self.result_data = result
+        display_list = []
+        for data in self.result_data['data']:
+            display_list.append(data['display_name'])
+        self.set_completer_object_api(completer, model, line_edit_add, display_list)
 
 
     def clear_line_edit_add(self, line_list):
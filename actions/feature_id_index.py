@@ -0,0 +1,99 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from qgis.core import QgsFeatureRequest
+
+from functools import partial
+
+
+class FeatureIdIndex(object):
+    """ Index {attribute id: [feature ids]} of layers, so features can be selected by their
+        attribute id (arc_id, node_id...) without evaluating an expression over the whole layer.
+        Index of a layer is built reading only the id field and is dropped when its data changes """
+
+    def __init__(self):
+
+        # {(layer_id, field_id): {attribute id: [feature ids]}}
+        self.indexes = {}
+        self.connected = {}
+
+
+    def get_index(self, layer, field_id):
+
+        key = (layer.id(), field_id)
+        index = self.indexes.get(key)
+        if index is not None:
+            return index
+
+        field_index = layer.fields().lookupField(field_id)
+        if field_index == -1:
+            return {}
+
+        index = {}
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([field_index])
+        for feature in layer.getFeatures(request):
+            index.setdefault(str(feature.attribute(field_index)), []).append(feature.id())
+        self.indexes[key] = index
+        self.connect_layer(layer)
+
+        return index
+
+
+    def get_feature_ids(self, layer, field_id, ids):
+        """ Get feature ids of @layer whose @field_id is in @ids """
+
+        index = self.get_index(layer, field_id)
+        feature_ids = []
+        for id_ in ids:
+            feature_ids.extend(index.get(str(id_), ()))
+
+        return feature_ids
+
+
+    def select_by_ids(self, layers, field_id, ids):
+        """ Select features of @layers whose @field_id is in @ids. Remove selection of the layers without any """
+
+        for layer in layers:
+            feature_ids = self.get_feature_ids(layer, field_id, ids) if ids else []
+            if feature_ids:
+                layer.selectByIds(feature_ids)
+            else:
+                layer.removeSelection()
+
+
+    def connect_layer(self, layer):
+        """ Drop indexes of @layer when its features are edited, committed, rolled back or reloaded """
+
+        if layer.id() in self.connected:
+            return
+
+        invalidate = partial(self.invalidate, layer.id())
+        layer.dataChanged.connect(invalidate)
+        layer.willBeDeleted.connect(invalidate)
+        self.connected[layer.id()] = (layer, invalidate)
+
+
+    def invalidate(self, layer_id):
+
+        for key in [key for key in self.indexes if key[0] == layer_id]:
+            del self.indexes[key]
+        layer, invalidate = self.connected.pop(layer_id, (None, None))
+        if layer is not None:
+            try:
+                layer.dataChanged.disconnect(invalidate)
+                layer.willBeDeleted.disconnect(invalidate)
+            except (TypeError, RuntimeError):
+                pass
+
+
+    def reset(self):
+
+        for layer_id in list(self.connected):
+            self.invalidate(layer_id)
+        self.indexes = {}
+
@@ -65,6 +65,14 @@ class GwTask(QgsTask, QObject):
         super().cancel()
 
 
+    def set_progress_rate(self, progress, rows, elapsed):
+        """ Set task @progress and log number of @rows processed per second """
+
+        self.setProgress(progress)
+        if elapsed > 0:
+            self.manage_message(f"Task {self.description()}: {rows} rows ({int(rows / elapsed)} rows/s)")
+
+
     def manage_message(self, msg):
 
         if self.controller:
@@ -0,0 +1,249 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from qgis.core import QgsApplication, QgsFeatureRequest, QgsGeometry, QgsProject, QgsRectangle, QgsSpatialIndex, \
+    QgsTask, QgsVectorLayerFeatureSource
+
+import json
+from functools import partial
+from time import time
+
+
+class IdentifyEngine(object):
+    """ Find features of giswater layers (v_edit_arc, v_edit_node, v_edit_connec, v_edit_gully) near a point
+        using spatial indexes built in background from the layers loaded in the project.
+        Layers without index (not built yet, modified or not managed) are left to gw_fct_getlayersfromcoordinates.
+        Result has the same structure: [{'layerName': tablename, 'icon': icon, 'ids': [{'id': id, 'geometry': wkt}]}]
+    """
+
+    # Tables identified locally and their id field
+    id_fields = {'v_edit_arc': 'arc_id', 'v_edit_node': 'node_id', 'v_edit_connec': 'connec_id',
+                 'v_edit_gully': 'gully_id'}
+
+    def __init__(self, controller, max_age=300):
+        """
+        :param max_age: Seconds after which an index is built again, as data can be changed by other users (int)
+        """
+
+        self.controller = controller
+        self.max_age = max_age
+        # {layer_id: (index, {fid: feature_id}, time built)}
+        self.indexes = {}
+        # {layer_id: generation}. Generation changes when layer is modified, so results of running builds are discarded
+        self.generations = {}
+        self.tasks = {}
+        self.connected = set()
+        # Icons returned by the server for each table
+        self.icons = {}
+        self.local_hits = 0
+        self.server_calls = 0
+        self.sensibility_factor = self.get_sensibility_factor()
+        QgsProject.instance().layerWillBeRemoved.connect(self.remove_layer)
+
+
+    def identify(self, canvas, point, layers):
+        """ Identify features of @layers near @point
+        :param layers: visible layers (list of QgsVectorLayer)
+        :return: (layers names found locally (list), layers that must be identified by the server (list))
+        """
+
+        # Without the tolerance of the server, local results could differ from its ones
+        if self.sensibility_factor is None:
+            self.server_calls += 1
+            return [], list(layers)
+
+        scale = canvas.scale()
+        radius = self.get_tolerance(scale)
+        rect = QgsRectangle(point.x() - radius, point.y() - radius, point.x() + radius, point.y() + radius)
+        point_geometry = QgsGeometry.fromPointXY(point)
+        destination_crs = canvas.mapSettings().destinationCrs()
+
+        layers_names = []
+        server_layers = []
+        for layer in layers:
+            tablename = self.controller.get_layer_source_table_name(layer)
+            if tablename not in self.id_fields or layer.crs() != destination_crs:
+                server_layers.append(layer)
+                continue
+            if layer.hasScaleBasedVisibility() and not layer.isInScaleRange(scale):
+                continue
+
+            index_data = self.get_index(layer, tablename)
+            if index_data is None:
+                server_layers.append(layer)
+                continue
+
+            index, feature_ids = index_data[0], index_data[1]
+            ids = []
+            for fid in index.intersects(rect):
+                geometry = index.geometry(fid)
+                if geometry is None or geometry.distance(point_geometry) > radius:
+                    continue
+                ids.append({'id': feature_ids[fid], 'geometry': self.get_wkt(geometry)})
+            if ids:
+                layers_names.append({'layerName': tablename, 'icon': self.icons.get(tablename, ''), 'ids': ids})
+
+        if not server_layers:
+            self.local_hits += 1
+        else:
+            self.server_calls += 1
+
+        return layers_names, server_layers
+
+
+    def get_sensibility_factor(self):
+        """ Get sensibility factor used by gw_fct_getlayersfromcoordinates for desktop clients.
+            Return None if it can't be read """
+
+        sql = "SELECT value FROM config_param_system WHERE parameter = 'api_sensibility_factor'"
+        row = self.controller.get_row(sql, log_info=False)
+        if not row or row[0] is None:
+            return None
+
+        try:
+            value = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+            return float(value['desktop'] if isinstance(value, dict) else value)
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+    def get_tolerance(self, scale):
+        """ Get search distance in map units at @scale, as gw_fct_getlayersfromcoordinates computes it:
+            ST_DWithin(the_geom, point, zoomScale / 500 * sensibility factor) """
+
+        return scale / 500 * self.sensibility_factor
+
+
+    def add_icons(self, layers_names):
+        """ Keep icons of layers identified by the server, used for the same layers when identified locally """
+
+        for layer in layers_names:
+            if layer.get('icon'):
+                self.icons[layer['layerName']] = layer['icon']
+
+
+    def get_index(self, layer, tablename):
+        """ Get index of @layer if it is ready and valid, otherwise start building it """
+
+        index_data = self.indexes.get(layer.id())
+        if index_data and time() - index_data[2] <= self.max_age:
+            return index_data
+
+        if index_data:
+            # Keep using old index would give deleted features. Build it again
+            del self.indexes[layer.id()]
+        self.build_index(layer, tablename)
+        return None
+
+
+    def build_index(self, layer, tablename):
+        """ Build index of @layer in a background task """
+
+        if layer.id() in self.tasks:
+            return
+
+        self.connect_layer(layer)
+        id_field = self.id_fields[tablename]
+        generation = self.generations.get(layer.id(), 0)
+        source = QgsVectorLayerFeatureSource(layer)
+        request = QgsFeatureRequest().setSubsetOfAttributes([id_field], layer.fields())
+        task = QgsTask.fromFunction(f"Index {layer.name()}", self.run_build_index, source, request, id_field,
+                                    on_finished=partial(self.build_index_finished, layer.id(), generation),
+                                    flags=QgsTask.Silent)
+        self.tasks[layer.id()] = task
+        QgsApplication.taskManager().addTask(task)
+
+
+    def run_build_index(self, task, source, request, id_field):
+        """ Executed in a background thread """
+
+        index = QgsSpatialIndex(QgsSpatialIndex.FlagStoreFeatureGeometries)
+        feature_ids = {}
+        for feature in source.getFeatures(request):
+            if task.isCanceled():
+                return None
+            if not feature.hasGeometry():
+                continue
+            index.addFeature(feature)
+            feature_ids[feature.id()] = feature[id_field]
+
+        return index, feature_ids, time()
+
+
+    def build_index_finished(self, layer_id, generation, exception, result=None):
+        """ Executed in the UI thread. Keep index if layer has not been modified meanwhile """
+
+        self.tasks.pop(layer_id, None)
+        if exception or result is None:
+            self.controller.log_info(f"Identify index not built: {exception}")
+            return
+
+        if self.generations.get(layer_id, 0) != generation:
+            return
+
+        self.indexes[layer_id] = result
+
+
+    def connect_layer(self, layer):
+        """ Invalidate index of @layer when its data is reloaded or its features are edited.
+            Repaints are not used, as the plugin triggers them for many other reasons """
+
+        if layer.id() in self.connected:
+            return
+
+        invalidate = partial(self.invalidate, layer.id())
+        layer.dataChanged.connect(invalidate)
+        layer.featureAdded.connect(invalidate)
+        layer.featureDeleted.connect(invalidate)
+        layer.geometryChanged.connect(invalidate)
+        layer.attributeValueChanged.connect(invalidate)
+        layer.afterCommitChanges.connect(invalidate)
+        layer.afterRollBack.connect(invalidate)
+        self.connected.add(layer.id())
+
+
+    def invalidate(self, layer_id, *args):
+
+        self.generations[layer_id] = self.generations.get(layer_id, 0) + 1
+        self.indexes.pop(layer_id, None)
+
+
+    def remove_layer(self, layer_id):
+
+        self.invalidate(layer_id)
+        self.connected.discard(layer_id)
+        task = self.tasks.pop(layer_id, None)
+        if task:
+            task.cancel()
+
+
+    def reset(self):
+        """ Remove all indexes and cancel running builds """
+
+        for layer_id in list(self.tasks):
+            self.remove_layer(layer_id)
+        self.indexes = {}
+        try:
+            QgsProject.instance().layerWillBeRemoved.disconnect(self.remove_layer)
+        except TypeError:
+            pass
+
+
+    def get_wkt(self, geometry):
+        """ Get WKT of @geometry with the format of PostGIS ST_AsText, as expected by the info menu """
+
+        vertices = [f"{vertex.x()} {vertex.y()}" for vertex in geometry.vertices()]
+        if len(vertices) == 1:
+            return f"POINT({vertices[0]})"
+        return f"LINESTRING({','.join(vertices)})"
+
+
+    def get_stats(self):
+
+        return {'local_hits': self.local_hits, 'server_calls': self.server_calls, 'indexes': len(self.indexes),
+                'building': len(self.tasks)}
+
@@ -1126,50 +1126,25 @@ class ManageNewPsector(ParentManage):
             message = "Any record selected"
             self.controller.show_warning(message)
             return
-        expl_id = []
+        psector_id = utils_giswater.getWidgetText(dialog, 'psector_id')
+        rows = []
         for i in range(0, len(selected_list)):
-            row = selected_list[i].row()
-            id_ = tbl_all_rows.model().record(row).value(id_ori)
-            expl_id.append(id_)
-
-        for i in range(0, len(selected_list)):
-            row = selected_list[i].row()
-            values = ""
-            psector_id = utils_giswater.getWidgetText(dialog, 'psector_id')
-            values += f"'{psector_id}', "
-            if tbl_all_rows.model().record(row).value('unit') not in (None, 'null', 'NULL'):
-                values += f"'{tbl_all_rows.model().record(row).value('unit')}', "
-            else:
-                values += 'null, '
-            if tbl_all_rows.model().record(row).value('id') not in (None, 'null', 'NULL'):
-                values += f"'{tbl_all_rows.model().record(row).value('id')}', "
-            else:
-                values += 'null, '
-            if tbl_all_rows.model().record(row).value('description') not in (None, 'null', 'NULL'):
-                values += f"'{tbl_all_rows.model().record(row).value('description')}', "
-            else:
-                values += 'null, '
-            if tbl_all_rows.model().record(row).value('price') not in (None, 'null', 'NULL'):
-                values += f"'{tbl_all_rows.model().record(row).value('price')}', "
-            else:
-                values += 'null, '
-            values = values[:len(values) - 2]
-            # Check if expl_id already exists in expl_selector
-            sql = (f"SELECT DISTINCT({id_des})"
-                   f" FROM {tableright}"
-                   f" WHERE {id_des} = '{expl_id[i]}'"
-                   f" AND psector_id = '{psector_id}'")
-
-            row = self.controller.get_row(sql)
-            if row is not None:
-                # if exist - show warning
+            record = tbl_all_rows.model().record(selected_list[i].row())
+            values = {}
+            fields = (('unit', 'unit'), (id_des, id_ori), ('descript', 'description'), ('price', 'price'))
+            for field, field_ori in fields:
+                value = record.value(field_ori)
+                values[field] = None if value in (None, 'null', 'NULL') else str(value)
+            values['psector_id'] = psector_id
+            rows.append(values)
+
+        # Insert all rows in one statement, skipping the ones already related with the psector
+        inserted = self.insert_psector_rows(tableright, id_des, rows)
+        if inserted is not None:
+            existing = [row[id_des] for row in rows if row[id_des] not in inserted]
+            if existing:
                 message = "Id already selected"
-                self.controller.show_info_box(message, "Info", parameter=str(expl_id[i]))
-            else:
-                sql = (f"INSERT INTO {tableright}"
-                       f" (psector_id, unit, price_id, descript, price) "
-                       f" VALUES ({values})")
-                self.controller.execute_sql(sql)
+                self.controller.show_info_box(message, "Info", parameter=', '.join(existing))
 
         # Refresh
         expr = f" psector_id = '{utils_giswater.getWidgetText(dialog, 'psector_id')}'"
@@ -1181,8 +1156,6 @@ class ManageNewPsector(ParentManage):
 
     def rows_unselector(self, dialog, tbl_selected_rows, tableright, field_id_right):
 
-        query = (f"DELETE FROM {tableright}"
-                 f" WHERE {tableright}.{field_id_right} = ")
         selected_list = tbl_selected_rows.selectionModel().selectedRows()
         if len(selected_list) == 0:
             message = "Any record selected"
@@ -1193,10 +1166,8 @@ class ManageNewPsector(ParentManage):
             row = selected_list[i].row()
             id_ = str(tbl_selected_rows.model().record(row).value(field_id_right))
             expl_id.append(id_)
-        for i in range(0, len(expl_id)):
-            sql = (f"{query}'{expl_id[i]}'"
-                   f" AND psector_id = '{utils_giswater.getWidgetText(dialog, 'psector_id')}'")
-            self.controller.execute_sql(sql)
+        psector_id = utils_giswater.getWidgetText(dialog, 'psector_id')
+        self.delete_psector_rows(tableright, psector_id, field_id_right, expl_id)
 
         # Refresh
         expr = f" psector_id = '{utils_giswater.getWidgetText(dialog, 'psector_id')}'"
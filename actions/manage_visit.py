@@ -596,20 +596,15 @@ class ManageVisit(ParentManage, QObject):
             db_record = OmVisitXGully(self.controller)
 
         if db_record:
+            # save all the showed records at once. Column 'id' is taken from its sequence
+            visit_id = int(self.visit_id.text())
+            rows = []
             for row in range(widget.model().rowCount()):
                 # get modelIndex to get data
                 index = widget.model().index(row, 0)
+                rows.append({'visit_id': visit_id, column_name: index.data()})
 
-                # set common fields
-                db_record.id = db_record.max_pk() + 1
-                db_record.visit_id = int(self.visit_id.text())
-
-                # set value for column <geom_type>_id
-                # db_record.column_name = index.data()
-                setattr(db_record, column_name, index.data())
-
-                # than save the showed records
-                db_record.upsert()
+            db_record.bulk_insert(rows, fields=['visit_id', column_name])
 
 
     def manage_tab_changed(self, dialog, index):
@@ -51,9 +51,12 @@ class MincutParent(ParentAction):
         self.node_group = []
         self.layers_connec = None
         self.arc_group = []
-        self.hydro_list = []
-        self.deleted_list = []
-        self.connec_list = []
+        # Ordered sets of ids (OrderedDict keys)
+        self.hydro_list = OrderedDict()
+        self.deleted_list = OrderedDict()
+        self.connec_list = OrderedDict()
+        # Index {layer_id: {connec_id: [feature ids]}} of connec layers
+        self.connec_index = {}
 
         # Serialize data of mincut states
         self.set_states()
@@ -81,9 +84,10 @@ class MincutParent(ParentAction):
         # Create the appropriate map tool and connect the gotPoint() signal.
         self.emit_point = QgsMapToolEmitPoint(self.canvas)
         self.canvas.setMapTool(self.emit_point)
-        self.connec_list = []
-        self.hydro_list = []
-        self.deleted_list = []
+        self.connec_list = OrderedDict()
+        self.hydro_list = OrderedDict()
+        self.deleted_list = OrderedDict()
+        self.connec_index = {}
 
         # Snapper
         self.snapper_manager = SnappingConfigManager(self.iface)
@@ -918,7 +922,7 @@ class MincutParent(ParentAction):
     def snapping_selection_hydro(self):
         """ Snap to connec layers to add its hydrometers """
 
-        self.connec_list = []
+        self.connec_list = OrderedDict()
 
         for layer in self.layers_connec:
             if layer.selectedFeatureCount() > 0:
@@ -933,15 +937,10 @@ class MincutParent(ParentAction):
                         self.controller.show_info_box(message, parameter=connec_id)
                         return
                     else:
-                        self.connec_list.append(connec_id)
+                        self.connec_list[connec_id] = None
 
         # Set 'expr_filter' with features that are in the list
-        expr_filter = "\"connec_id\" IN ("
-        for i in range(len(self.connec_list)):
-            expr_filter += f"'{self.connec_list[i]}', "
-        expr_filter = expr_filter[:-2] + ")"
-        if len(self.connec_list) == 0:
-            expr_filter = "\"connec_id\" =''"
+        expr_filter = self.get_expr_filter("connec_id", self.connec_list)
         # Check expression
         (is_valid, expr) = self.check_expression(expr_filter)  # @UnusedVariable
         if not is_valid:
@@ -953,7 +952,7 @@ class MincutParent(ParentAction):
     def snapping_selection_connec(self):
         """ Snap to connec layers """
 
-        self.connec_list = []
+        self.connec_list = OrderedDict()
 
         for layer in self.layers_connec:
             if layer.selectedFeatureCount() > 0:
@@ -961,20 +960,12 @@ class MincutParent(ParentAction):
                 features = layer.selectedFeatures()
                 # Get id from all selected features
                 for feature in features:
-                    connec_id = feature.attribute("connec_id")
-                    # Add element
-                    if connec_id not in self.connec_list:
-                        self.connec_list.append(connec_id)
+                    self.connec_list[feature.attribute("connec_id")] = None
 
         expr_filter = None
         if len(self.connec_list) > 0:
             # Set 'expr_filter' with features that are in the list
-            expr_filter = "\"connec_id\" IN ("
-            for i in range(len(self.connec_list)):
-                expr_filter += f"'{self.connec_list[i]}', "
-            expr_filter = expr_filter[:-2] + ")"
-            if len(self.connec_list) == 0:
-                expr_filter = "\"connec_id\" =''"
+            expr_filter = self.get_expr_filter("connec_id", self.connec_list)
             # Check expression
             (is_valid, expr) = self.check_expression(expr_filter)  # @UnusedVariable
             if not is_valid:
@@ -988,7 +979,7 @@ class MincutParent(ParentAction):
         self.mincut_class = 3
         self.dlg_mincut.closeMainWin = True
         self.dlg_mincut.canceled = False
-        self.connec_list = []
+        self.connec_list = OrderedDict()
         result_mincut_id_text = self.dlg_mincut.result_mincut_id.text()
 
         # Check if id exist in table 'om_mincut'
@@ -1093,37 +1084,62 @@ class MincutParent(ParentAction):
 
         # Set expression filter with 'hydro_list'
 
-        if row[0] in self.deleted_list:
-            self.deleted_list.remove(row[0])
-        self.hydro_list.append(row[0])
-        expr_filter = "\"hydrometer_id\" IN ("
-        for i in range(len(self.hydro_list)):
-            expr_filter += f"'{self.hydro_list[i]}', "
-        expr_filter = expr_filter[:-2] + ")"
+        self.deleted_list.pop(row[0], None)
+        self.hydro_list[row[0]] = None
+        expr_filter = self.get_expr_filter("hydrometer_id", self.hydro_list)
 
         # Reload table
         self.reload_table_hydro(expr_filter)
 
 
-    def select_features_group_layers(self, expr):
-        """ Select features of the layers filtering by @expr """
+    def get_expr_filter(self, field_name, id_list):
+        """ Get expression filter of features with @field_name in @id_list """
+
+        if not id_list:
+            return f"\"{field_name}\" = ''"
+
+        values = "', '".join(str(feature_id).replace("'", "''") for feature_id in id_list)
+        return f"\"{field_name}\" IN ('{values}')"
+
+
+    def get_connec_index(self, layer):
+        """ Get index {connec_id: [feature ids]} of @layer. It is built once reading only 'connec_id' """
 
-        # Iterate over all layers of type 'connec'
-        # Select features and them to 'connec_list'
+        index = self.connec_index.get(layer.id())
+        if index is None:
+            index = {}
+            request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+            request.setSubsetOfAttributes(["connec_id"], layer.fields())
+            for feature in layer.getFeatures(request):
+                index.setdefault(feature["connec_id"], []).append(feature.id())
+            self.connec_index[layer.id()] = index
+
+        return index
+
+
+    def select_connecs(self, connec_ids):
+        """ Select features with 'connec_id' in @connec_ids in every connec layer.
+            Return ids found in any layer """
+
+        found = OrderedDict()
         for layer in self.layers_connec:
-            it = layer.getFeatures(QgsFeatureRequest(expr))
-            # Build a list of feature id's from the previous result
-            id_list = [i.id() for i in it]
-            # Select features with these id's
+            index = self.get_connec_index(layer)
+            id_list = []
+            for connec_id in connec_ids:
+                feature_ids = index.get(connec_id)
+                if feature_ids:
+                    id_list.extend(feature_ids)
+                    found[connec_id] = None
             layer.selectByIds(id_list)
-            if layer.selectedFeatureCount() > 0:
-                # Get selected features of the layer
-                features = layer.selectedFeatures()
-                for feature in features:
-                    connec_id = feature.attribute("connec_id")
-                    # Check if 'connec_id' is already in 'connec_list'
-                    if connec_id not in self.connec_list:
-                        self.connec_list.append(connec_id)
+
+        return found
+
+
+    def select_features_group_layers(self, connec_ids):
+        """ Select features of the layers with 'connec_id' in @connec_ids and add them to 'connec_list' """
+
+        for connec_id in self.select_connecs(connec_ids):
+            self.connec_list[connec_id] = None
 
 
     def select_features_connec(self):
@@ -1135,22 +1151,18 @@ class MincutParent(ParentAction):
                f" WHERE result_id = {result_mincut_id}")
         rows = self.controller.get_rows(sql)
         if rows:
-            expr_filter = "\"connec_id\" IN ("
             for row in rows:
-                if row[0] not in self.connec_list and row[0] not in self.deleted_list:
-                    self.connec_list.append(row[0])
-            for connec_id in self.connec_list:
-                expr_filter += f"'{connec_id}', "
-            expr_filter = expr_filter[:-2] + ")"
-            if len(self.connec_list) == 0:
-                expr_filter = "\"connec_id\" =''"
+                if row[0] not in self.deleted_list:
+                    self.connec_list[row[0]] = None
+            expr_filter = self.get_expr_filter("connec_id", self.connec_list)
             # Check expression
             (is_valid, expr) = self.check_expression(expr_filter)
             if not is_valid:
                 return
 
-            # Select features of the layers filtering by @expr
-            self.select_features_group_layers(expr)
+            # Select features of the layers with these connec_id
+            self.connec_index = {}
+            self.select_features_group_layers(list(self.connec_list))
 
             # Reload table
             self.reload_table_connec(expr_filter)
@@ -1158,9 +1170,9 @@ class MincutParent(ParentAction):
 
     def select_features_hydro(self):
 
-        self.connec_list = []
+        self.connec_list = OrderedDict()
 
-        # Set 'expr_filter' of connecs related with current mincut
+        # Select connecs related with hydrometers of current mincut
         result_mincut_id = utils_giswater.getWidgetText(self.dlg_hydro, self.result_mincut_id)
         sql = (f"SELECT DISTINCT(connec_id) FROM rtc_hydrometer_x_connec AS rtc"
                f" INNER JOIN om_mincut_hydrometer AS anl"
@@ -1168,41 +1180,21 @@ class MincutParent(ParentAction):
                f" WHERE result_id = {result_mincut_id}")
         rows = self.controller.get_rows(sql)
         if rows:
-            expr_filter = "\"connec_id\" IN ("
-            for row in rows:
-                expr_filter += f"'{row[0]}', "
-            expr_filter = expr_filter[:-2] + ")"
-            if len(self.connec_list) == 0:
-                expr_filter = "\"connec_id\" =''"
-            # Check expression
-            (is_valid, expr) = self.check_expression(expr_filter)
-            if not is_valid:
-                return
-
-            # Select features of the layers filtering by @expr
-            self.select_features_group_layers(expr)
+            self.connec_index = {}
+            self.select_features_group_layers([row[0] for row in rows])
 
         # Get list of 'hydrometer_id' belonging to current result_mincut
-        result_mincut_id = utils_giswater.getWidgetText(self.dlg_hydro, self.result_mincut_id)
         sql = (f"SELECT hydrometer_id FROM om_mincut_hydrometer"
                f" WHERE result_id = {result_mincut_id}")
         rows = self.controller.get_rows(sql)
-
-        expr_filter = "\"hydrometer_id\" IN ("
         if rows:
             for row in rows:
-                if row[0] not in self.hydro_list:
-                    self.hydro_list.append(row[0])
+                self.hydro_list[row[0]] = None
         for hyd in self.deleted_list:
-            if hyd in self.hydro_list:
-                self.hydro_list.remove(hyd)
-        for hyd in self.hydro_list:
-            expr_filter += f"'{hyd}', "
-
-        expr_filter = expr_filter[:-2] + ")"
-        if len(self.hydro_list) == 0:
-            expr_filter = "\"hydrometer_id\" =''"
+            self.hydro_list.pop(hyd, None)
+
         # Reload contents of table 'hydro' with expr_filter
+        expr_filter = self.get_expr_filter("hydrometer_id", self.hydro_list)
         self.reload_table_hydro(expr_filter)
 
 
@@ -1231,9 +1223,7 @@ class MincutParent(ParentAction):
                 features = layer.selectedFeatures()
                 for feature in features:
                     # Append 'connec_id' into 'connec_list'
-                    selected_id = feature.attribute("connec_id")
-                    if selected_id not in self.connec_list:
-                        self.connec_list.append(selected_id)
+                    self.connec_list[feature.attribute("connec_id")] = None
 
         # Show message if element is already in the list
         if connec_id in self.connec_list:
@@ -1242,29 +1232,20 @@ class MincutParent(ParentAction):
             return
 
         # If feature id doesn't exist in list -> add
-        self.connec_list.append(connec_id)
+        self.connec_list[connec_id] = None
 
         expr_filter = None
         if len(self.connec_list) > 0:
 
             # Set expression filter with 'connec_list'
-            expr_filter = "\"connec_id\" IN ("
-            for i in range(len(self.connec_list)):
-                expr_filter += f"'{self.connec_list[i]}', "
-            expr_filter = expr_filter[:-2] + ")"
-            if len(self.connec_list) == 0:
-                expr_filter = "\"connec_id\" =''"
+            expr_filter = self.get_expr_filter("connec_id", self.connec_list)
             # Check expression
             (is_valid, expr) = self.check_expression(expr_filter)
             if not is_valid:
                 return
 
-            # Select features with previous filter
-            for layer in self.layers_connec:
-                # Build a list of feature id's and select them
-                it = layer.getFeatures(QgsFeatureRequest(expr))
-                id_list = [i.id() for i in it]
-                layer.selectByIds(id_list)
+            # Select features of 'connec_list'
+            self.select_connecs(self.connec_list)
 
         # Reload contents of table 'connec'
         self.reload_table_connec(expr_filter)
@@ -1312,21 +1293,26 @@ class MincutParent(ParentAction):
         if self.schema_name not in table_name:
             table_name = self.schema_name + "." + table_name
 
-        # Set a model with selected filter expression
-        model = QSqlTableModel(db=self.controller.db)
-        model.setTable(table_name)
-        model.setEditStrategy(QSqlTableModel.OnManualSubmit)
+        if not expr_filter:
+            widget.setModel(None)
+            return expr
+
+        # Reuse current model of the widget if it is attached to the same table.
+        # Filter is set before select, so only the filtered rows are read
+        model = widget.model()
+        if not isinstance(model, QSqlTableModel) or model.tableName() != table_name:
+            model = QSqlTableModel(db=self.controller.db)
+            model.setTable(table_name)
+            model.setEditStrategy(QSqlTableModel.OnManualSubmit)
+        model.setFilter(expr_filter)
         model.select()
         if model.lastError().isValid():
             self.controller.show_warning(model.lastError().text())
             return expr
+
         # Attach model to selected table
-        if expr_filter:
+        if widget.model() is not model:
             widget.setModel(model)
-            widget.model().setFilter(expr_filter)
-            widget.model().select()
-        else:
-            widget.setModel(None)
 
         return expr
 
@@ -1336,8 +1322,7 @@ class MincutParent(ParentAction):
 
         table_name = self.schema_name + ".v_edit_connec"
         widget = self.dlg_connec.tbl_mincut_connec
-        expr = self.set_table_model(widget, table_name, expr_filter)
-        self.set_table_columns(self.dlg_connec, widget, 'v_edit_connec')
+        expr = self.reload_mincut_table(self.dlg_connec, widget, table_name, 'v_edit_connec', expr_filter)
         return expr
 
 
@@ -1346,8 +1331,18 @@ class MincutParent(ParentAction):
 
         table_name = self.schema_name + ".v_rtc_hydrometer"
         widget = self.dlg_hydro.tbl_hydro
+        expr = self.reload_mincut_table(self.dlg_hydro, widget, table_name, 'v_rtc_hydrometer', expr_filter)
+        return expr
+
+
+    def reload_mincut_table(self, dialog, widget, table_name, config_table_name, expr_filter):
+        """ Set @expr_filter to the model of @widget. Columns are only configured when a new model is attached,
+            as the reused model keeps its sort order and headers and the widget keeps hidden columns """
+
+        model = widget.model()
         expr = self.set_table_model(widget, table_name, expr_filter)
-        self.set_table_columns(self.dlg_hydro, widget, 'v_rtc_hydrometer')
+        if widget.model() is not None and widget.model() is not model:
+            self.set_table_columns(dialog, widget, config_table_name)
         return expr
 
 
@@ -1383,26 +1378,16 @@ class MincutParent(ParentAction):
             return
         else:
             for el in del_id:
-                self.connec_list.remove(el)
+                self.connec_list.pop(el, None)
 
         # Select features which are in the list
-        expr_filter = "\"connec_id\" IN ("
-        for i in range(len(self.connec_list)):
-            expr_filter += f"'{self.connec_list[i]}', "
-        expr_filter = expr_filter[:-2] + ")"
-
-        if len(self.connec_list) == 0:
-            expr_filter = "connec_id=''"
+        expr_filter = self.get_expr_filter("connec_id", self.connec_list)
 
         # Update model of the widget with selected expr_filter
-        expr = self.reload_table_connec(expr_filter)
+        self.reload_table_connec(expr_filter)
 
         # Reload selection
-        for layer in self.layers_connec:
-            # Build a list of feature id's and select them
-            it = layer.getFeatures(QgsFeatureRequest(expr))
-            id_list = [i.id() for i in it]
-            layer.selectByIds(id_list)
+        self.select_connecs(self.connec_list)
 
         self.connect_signal_selection_changed("mincut_connec")
 
@@ -1435,17 +1420,10 @@ class MincutParent(ParentAction):
             return
         else:
             for el in del_id:
-                self.hydro_list.remove(el)
-                if el not in self.deleted_list:
-                    self.deleted_list.append(el)
+                self.hydro_list.pop(el, None)
+                self.deleted_list[el] = None
         # Select features that are in the list
-        expr_filter = "\"hydrometer_id\" IN ("
-        for i in range(len(self.hydro_list)):
-            expr_filter += f"'{self.hydro_list[i]}', "
-        expr_filter = expr_filter[:-2] + ")"
-
-        if len(self.hydro_list) == 0:
-            expr_filter = "hydrometer_id=''"
+        expr_filter = self.get_expr_filter("hydrometer_id", self.hydro_list)
 
         # Update model of the widget with selected expr_filter
         self.reload_table_hydro(expr_filter)
@@ -10,7 +10,10 @@ from qgis.PyQt.QtCore import Qt
 from qgis.PyQt.QtWidgets import QMessageBox
 
 import json
+import select
+import socket
 import threading
+import time
 from collections import OrderedDict
 
 from .parent import ParentAction
@@ -24,6 +27,8 @@ class NotifyFunctions(ParentAction):
 
     conn_failed = False
     list_channels = None
+    # Seconds during which a repeated payload is ignored
+    coalesce_window = 0.5
 
     def __init__(self, iface, settings, controller, plugin_dir):
         """ Class to control notify from PostgresSql """
@@ -35,6 +40,9 @@ class NotifyFunctions(ParentAction):
         self.controller = controller
         self.plugin_dir = plugin_dir
         self.thread = None
+        self.wakeup_read = None
+        self.wakeup_write = None
+        self.last_payloads = {}
 
 
     def start_listening(self, list_channels=None):
@@ -46,11 +54,8 @@ class NotifyFunctions(ParentAction):
             list_channels = ['desktop', self.controller.current_user]
 
         self.list_channels = list_channels
-        for channel_name in list_channels:
-            self.controller.execute_sql(f'LISTEN "{channel_name}";')
-
-        thread = threading.Thread(target=self.wait_notifications)
-        thread.start()
+        self.controller.listen(list_channels)
+        self.start_thread()
 
 
     def task_stopped(self, task):
@@ -87,60 +92,99 @@ class NotifyFunctions(ParentAction):
         if list_channels is None:
             list_channels = ['desktop', self.controller.current_user]
 
-        for channel_name in list_channels:
-            self.controller.execute_sql(f'UNLISTEN "{channel_name}";')
+        self.stop_thread()
+        self.controller.listen(list_channels, 'UNLISTEN')
+        # Channels must be listened again when thread is restarted
+        self.conn_failed = True
 
 
     def start_thread(self):
+        """ Start thread that waits for notifications on the socket of the notify connection """
+
+        if self.thread and self.thread.is_alive():
+            self.controller.notify_is_listening = True
+            return
 
         self.controller.notify_is_listening = True
-        self.thread = threading.Timer(interval=1, function=self.wait_notifications)
+        if self.wakeup_write:
+            self.wakeup_write.close()
+        # Socket used to wake up the thread when it has to stop
+        self.wakeup_read, self.wakeup_write = socket.socketpair()
+        self.thread = threading.Thread(target=self.wait_notifications, args=(self.wakeup_read,), daemon=True)
         self.thread.start()
 
 
     def stop_thread(self):
 
-        if self.thread:
+        if self.thread and self.thread.is_alive():
             self.controller.log_info("Notify canceled")
-            self.thread.cancel()
-            self.controller.notify_is_listening = False
+            try:
+                self.wakeup_write.send(b'\0')
+            except OSError:
+                pass
+            if self.thread is not threading.current_thread():
+                self.thread.join(2)
+        if self.wakeup_write:
+            self.wakeup_write.close()
+            self.wakeup_write = None
+        self.thread = None
+        self.controller.notify_is_listening = False
 
 
-    def wait_notifications(self):
+    def wait_notifications(self, wakeup):
+        """ Executed in the notify thread. Block until a notification arrives or thread is stopped """
 
         try:
-            if self.conn_failed:
-                for channel_name in self.list_channels:
-                    self.controller.execute_sql(f'LISTEN "{channel_name}";')
-
-                self.conn_failed = False
-
-            # Check if any notification to process
-            dao = self.controller.dao
-            status = dao.get_poll()
-            if status:
-                self.start_thread()
-            else:
-                self.conn_failed = True
-                self.stop_thread()
-                return
-
-            last_paiload = None
-            while dao.conn.notifies:
-                notify = dao.conn.notifies.pop()
-                msg = f'<font color="blue"><bold>Got NOTIFY: </font>'
-                msg += f'<font color="black"><bold>{notify.pid}, {notify.channel}, {notify.payload} </font>'
-                self.controller.log_info(msg)
-                if notify.payload and notify.payload != last_paiload:
-                    last_paiload = notify.payload
-                    try:
-                        complet_result = json.loads(notify.payload, object_pairs_hook=OrderedDict)
-                        self.execute_functions(complet_result)
-                    except Exception:
-                        pass
-
-        except AttributeError:
+            while True:
+                if self.conn_failed:
+                    if not self.controller.listen(self.list_channels):
+                        break
+                    self.conn_failed = False
+
+                dao = self.controller.dao
+                listen_conn = dao.get_listen_conn()
+                readable = select.select([listen_conn, wakeup], [], [])[0]
+                if wakeup in readable:
+                    break
+
+                if not dao.get_poll():
+                    self.conn_failed = True
+                    break
+
+                self.process_notifications(dao, listen_conn)
+
+        except (AttributeError, OSError, ValueError) as e:
+            # Connection closed or replaced meanwhile
+            self.controller.log_info(f"Notify stopped: {e}")
             self.conn_failed = True
+        finally:
+            self.controller.notify_is_listening = False
+            wakeup.close()
+
+
+    def process_notifications(self, dao, listen_conn):
+        """ Execute functions of pending notifications in arrival order.
+            Same payload received again within @coalesce_window seconds is executed only once """
+
+        now = time.time()
+        self.last_payloads = {payload: when for payload, when in self.last_payloads.items()
+                              if now - when < self.coalesce_window}
+        while listen_conn.notifies:
+            notify = listen_conn.notifies.pop(0)
+            msg = f'<font color="blue"><bold>Got NOTIFY: </font>'
+            msg += f'<font color="black"><bold>{notify.pid}, {notify.channel}, {notify.payload} </font>'
+            self.controller.log_info(msg)
+            if not notify.payload or notify.payload in self.last_payloads:
+                continue
+
+            self.last_payloads[notify.payload] = now
+            try:
+                complet_result = json.loads(notify.payload, object_pairs_hook=OrderedDict)
+                # Don't share the connection of the UI thread
+                with dao.lease():
+                    self.execute_functions(complet_result)
+            except Exception:
+                pass
 
 
     def execute_functions(self, complet_result):
@@ -13,9 +13,12 @@ from qgis.PyQt.QtGui import QColor
 from qgis.PyQt.QtSql import QSqlTableModel
 from qgis.PyQt.QtCore import Qt, QDate, QDateTime, QStringListModel
 
+import json
+from collections import OrderedDict
 from functools import partial
 
 from .. import utils_giswater
+from .feature_id_index import FeatureIdIndex
 from .parent import ParentAction
 from .multiple_selection import MultipleSelection
 from ..map_tools.snapping_utils_v3 import SnappingConfigManager
@@ -39,6 +42,7 @@ class ParentManage(ParentAction, object):
         self.xyCoordinates_conected = False
         self.remove_ids = True
         self.snapper_manager = None
+        self.feature_id_index = FeatureIdIndex()
 
 
     def reset_lists(self):
@@ -515,18 +519,10 @@ class ParentManage(ParentAction, object):
             return None
 
         # Set expression filter with features in the list
-        expr_filter = field_id + " IN ("
-        for i in range(len(list_ids)):
-            expr_filter += f"'{list_ids[i]}', "
-        expr_filter = expr_filter[:-2] + ")"
-
-        # Check expression
-        (is_valid, expr) = self.check_expression(expr_filter)
-        if not is_valid:
-            return None
+        expr_filter = self.get_ids_filter(field_id, list_ids)
 
-        # Select features of layers applying @expr
-        self.select_features_by_ids(geom_type, expr)
+        # Select features of layers with ids of the list
+        self.select_features_by_list(geom_type, list_ids)
 
         return expr_filter
 
@@ -643,6 +639,39 @@ class ParentManage(ParentAction, object):
                     layer.removeSelection()
 
 
+    def select_features_by_list(self, geom_type, ids):
+        """ Select features of layers of group @geom_type whose @geom_type_id is in @ids.
+            Feature ids are taken from FeatureIdIndex instead of evaluating an expression """
+
+        if not geom_type in self.layers:
+            return
+
+        self.feature_id_index.select_by_ids(self.layers[geom_type], f"{geom_type}_id", ids)
+
+
+    def get_ids_filter(self, field_id, ids):
+        """ Get expression filter '"@field_id" IN (...)' with @ids """
+
+        return f'"{field_id}" IN (' + ', '.join(f"'{id_}'" for id_ in ids) + ')'
+
+
+    def get_selected_ids(self, geom_type, ids=None):
+        """ Get list of @geom_type_id of features selected in layers of group @geom_type, without duplicates.
+            Ids of @ids are kept first """
+
+        field_id = f"{geom_type}_id"
+        selected_ids = OrderedDict.fromkeys(ids if ids else [])
+        for layer in self.layers[geom_type]:
+            if layer.selectedFeatureCount() > 0:
+                field_index = layer.fields().lookupField(field_id)
+                request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+                request.setSubsetOfAttributes([field_index])
+                for feature in layer.getSelectedFeatures(request):
+                    selected_ids[feature.attribute(field_index)] = None
+
+        return list(selected_ids)
+
+
     def delete_records(self, dialog, table_object, query=False):
         """ Delete selected elements of the table """
 
@@ -685,50 +714,36 @@ class ParentManage(ParentAction, object):
 
         del_id = []
         inf_text = ""
-        list_id = ""
         for i in range(0, len(selected_list)):
             row = selected_list[i].row()
             id_feature = widget.model().record(row).value(field_id)
             inf_text += f"{id_feature}, "
-            list_id += f"'{id_feature}', "
             del_id.append(id_feature)
         inf_text = inf_text[:-2]
-        list_id = list_id[:-2]
         message = "Are you sure you want to delete these records?"
         title = "Delete records"
         answer = self.controller.ask_question(message, title, inf_text)
         if answer:
-            for el in del_id:
-                self.ids.remove(el)
+            del_id = set(del_id)
+            self.ids = [id_ for id_ in self.ids if id_ not in del_id]
         else:
             return
 
         expr_filter = None
-        expr = None
         if len(self.ids) > 0:
-
             # Set expression filter with features in the list
-            expr_filter = f'"{field_id}" IN ('
-            for i in range(len(self.ids)):
-                expr_filter += f"'{self.ids[i]}', "
-            expr_filter = expr_filter[:-2] + ")"
-
-            # Check expression
-            (is_valid, expr) = self.check_expression(expr_filter)  # @UnusedVariable
-            if not is_valid:
-                return
+            expr_filter = self.get_ids_filter(field_id, self.ids)
 
         # Update model of the widget with selected expr_filter
         if query:
-            self.delete_feature_at_plan(dialog, self.geom_type, list_id)
+            self.delete_feature_at_plan(dialog, self.geom_type, del_id)
             self.reload_qtable(dialog, self.geom_type)
         else:
             self.reload_table(dialog, table_object, self.geom_type, expr_filter)
             self.apply_lazy_init(table_object)
 
-        # Select features with previous filter
-        # Build a list of feature id's and select them
-        self.select_features_by_ids(self.geom_type, expr)
+        # Select features of the list
+        self.select_features_by_list(self.geom_type, self.ids)
 
         if query:
             self.remove_selection()
@@ -742,6 +757,7 @@ class ParentManage(ParentAction, object):
     def manage_close(self, dialog, table_object, cur_active_layer=None, excluded_layers=[]):
         """ Close dialog and disconnect snapping """
 
+        self.feature_id_index.reset()
         if cur_active_layer:
             self.iface.setActiveLayer(cur_active_layer)
         if hasattr(self, 'single_tool_mode'):
@@ -788,16 +804,8 @@ class ParentManage(ParentAction, object):
         if self.remove_ids:
             self.ids = []
 
-        # Iterate over all layers of the group
-        for layer in self.layers[geom_type]:
-            if layer.selectedFeatureCount() > 0:
-                # Get selected features of the layer
-                features = layer.selectedFeatures()
-                for feature in features:
-                    # Append 'feature_id' into the list
-                    selected_id = feature.attribute(field_id)
-                    if selected_id not in self.ids:
-                        self.ids.append(selected_id)
+        # Append ids of selected features of all layers of the group
+        self.ids = self.get_selected_ids(geom_type, self.ids)
 
         if geom_type == 'arc':
             self.list_ids['arc'] = self.ids
@@ -813,17 +821,10 @@ class ParentManage(ParentAction, object):
         expr_filter = None
         if len(self.ids) > 0:
             # Set 'expr_filter' with features that are in the list
-            expr_filter = f'"{field_id}" IN ('
-            for i in range(len(self.ids)):
-                expr_filter += f"'{self.ids[i]}', "
-            expr_filter = expr_filter[:-2] + ")"
+            expr_filter = self.get_ids_filter(field_id, self.ids)
 
-            # Check expression
-            (is_valid, expr) = self.check_expression(expr_filter)  # @UnusedVariable
-            if not is_valid:
-                return
-
-            self.select_features_by_ids(geom_type, expr)
+            # Select features of the list in all layers of the group
+            self.select_features_by_list(geom_type, self.ids)
 
         # Reload contents of table 'tbl_@table_object_x_@geom_type'
         if query:
@@ -843,12 +844,46 @@ class ParentManage(ParentAction, object):
 
 
     def delete_feature_at_plan(self, dialog, geom_type, list_id):
-        """ Delete features_id to table plan_@geom_type_x_psector"""
+        """ Delete features_id of @list_id from table plan_psector_x_@geom_type """
 
         value = utils_giswater.getWidgetText(dialog, dialog.psector_id)
-        sql = (f"DELETE FROM plan_psector_x_{geom_type} "
-               f"WHERE {geom_type}_id IN ({list_id}) AND psector_id = '{value}'")
-        self.controller.execute_sql(sql)
+        self.delete_psector_rows(f"plan_psector_x_{geom_type}", value, f"{geom_type}_id", list_id)
+
+
+    def insert_psector_rows(self, table_name, field_id, rows):
+        """ Insert @rows (list of dicts with psector_id, @field_id and other fields of @table_name) in one statement.
+            Rows whose @field_id is already related with the psector are not inserted.
+            Values are converted to the types of the table by json_populate_recordset
+            :return: List of @field_id inserted or None if error
+        """
+
+        if not rows:
+            return []
+
+        fields = ', '.join(rows[0].keys())
+        values = ', '.join(f"r.{field}" for field in rows[0].keys())
+        sql = (f"INSERT INTO {table_name} ({fields})"
+               f" SELECT DISTINCT ON (r.psector_id, r.{field_id}) {values}"
+               f" FROM json_populate_recordset(NULL::{table_name}, %s) AS r"
+               f" WHERE NOT EXISTS (SELECT 1 FROM {table_name} AS t"
+               f" WHERE t.psector_id = r.psector_id AND t.{field_id} = r.{field_id})"
+               f" RETURNING {field_id}")
+        inserted = self.controller.get_rows(sql, log_info=False, params=(json.dumps(rows, default=str),))
+        if inserted is None:
+            return None if self.controller.last_error else []
+
+        return [row[0] for row in inserted]
+
+
+    def delete_psector_rows(self, table_name, psector_id, field_id, ids):
+        """ Delete rows of @table_name related with @psector_id whose @field_id is in @ids in one statement """
+
+        if not ids:
+            return True
+
+        sql = (f"DELETE FROM {table_name}"
+               f" WHERE psector_id = %s AND {field_id}::text = ANY(%s)")
+        return self.controller.execute_sql(sql, params=(psector_id, [str(id_) for id_ in ids]))
 
 
     def enable_feature_type(self, dialog, widget_name='tbl_relation'):
@@ -878,57 +913,30 @@ class ParentManage(ParentAction, object):
 
         field_id = f"{self.geom_type}_id"
         feature_id = utils_giswater.getWidgetText(dialog, "feature_id")
-        expr_filter = f"{field_id} = '{feature_id}'"
-
-        # Check expression
-        (is_valid, expr) = self.check_expression(expr_filter)
-        if not is_valid:
-            return None
 
-        # Select features of layers applying @expr
-        self.select_features_by_ids(self.geom_type, expr)
+        # Select features of layers with entered id
+        self.select_features_by_list(self.geom_type, [feature_id])
 
         if feature_id == 'null':
             message = "You need to enter a feature id"
             self.controller.show_info_box(message)
             return
 
-        # Iterate over all layers of the group
-        for layer in self.layers[self.geom_type]:
-            if layer.selectedFeatureCount() > 0:
-                # Get selected features of the layer
-                features = layer.selectedFeatures()
-                for feature in features:
-                    # Append 'feature_id' into the list
-                    selected_id = feature.attribute(field_id)
-                    if selected_id not in self.ids:
-                        self.ids.append(selected_id)
-            if feature_id not in self.ids:
-                # If feature id doesn't exist in list -> add
-                self.ids.append(str(feature_id))
+        # Append ids of selected features of all layers of the group and entered id if not found
+        self.ids = self.get_selected_ids(self.geom_type, self.ids)
+        if self.layers[self.geom_type] and feature_id not in self.ids:
+            self.ids.append(str(feature_id))
 
         # Set expression filter with features in the list
-        expr_filter = f'"{field_id}" IN (  '
-        for i in range(len(self.ids)):
-            expr_filter += f"'{self.ids[i]}', "
-        expr_filter = expr_filter[:-2] + ")"
-
-        # Check expression
-        (is_valid, expr) = self.check_expression(expr_filter)
-        if not is_valid:
-            return
+        expr_filter = self.get_ids_filter(field_id, self.ids)
 
-        # Select features with previous filter
-        # Build a list of feature id's and select them
-        for layer in self.layers[self.geom_type]:
-            it = layer.getFeatures(QgsFeatureRequest(expr))
-            id_list = [i.id() for i in it]
-            if len(id_list) > 0:
-                layer.selectByIds(id_list)
+        # Select features of the list in all layers of the group
+        self.select_features_by_list(self.geom_type, self.ids)
 
         # Reload contents of table 'tbl_???_x_@geom_type'
         if query:
             self.insert_feature_to_plan(dialog, self.geom_type)
+            self.reload_qtable(dialog, self.geom_type)
             self.remove_selection()
         else:
             self.reload_table(dialog, table_object, self.geom_type, expr_filter)
@@ -946,16 +954,8 @@ class ParentManage(ParentAction, object):
         """ Insert features_id to table plan_@geom_type_x_psector """
 
         value = utils_giswater.getWidgetText(dialog, dialog.psector_id)
-        for i in range(len(self.ids)):
-            sql = (f"SELECT {geom_type}_id "
-                   f"FROM plan_psector_x_{geom_type} "
-                   f"WHERE {geom_type}_id = '{self.ids[i]}' AND psector_id = '{value}'")
-            row = self.controller.get_row(sql)
-            if not row:
-                sql = (f"INSERT INTO plan_psector_x_{geom_type}"
-                       f"({geom_type}_id, psector_id) VALUES('{self.ids[i]}', '{value}')")
-                self.controller.execute_sql(sql)
-            self.reload_qtable(dialog, geom_type)
+        rows = [{f"{geom_type}_id": str(feature_id), 'psector_id': value} for feature_id in self.ids]
+        self.insert_psector_rows(f"plan_psector_x_{geom_type}", f"{geom_type}_id", rows)
 
 
     def reload_qtable(self, dialog, geom_type):
@@ -0,0 +1,129 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from qgis.core import QgsApplication, QgsTask
+
+from collections import OrderedDict
+from functools import partial
+
+
+class SearchEngine(object):
+    """ Run typeahead search functions (gw_fct_setsearch, gw_fct_setsearchadd) in background tasks.
+        Responses older than the last request of the same function are discarded and results are kept
+        in a LRU cache keyed by (function_name, key, prefix) """
+
+    def __init__(self, controller, cache_size=200):
+        """
+        :param cache_size: Maximum number of results kept in cache (int)
+        """
+
+        self.controller = controller
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.last_request = {}
+        self.tasks = {}
+        self.hits = 0
+        self.misses = 0
+
+
+    def search(self, function_name, key, prefix, body, callback):
+        """ Get result of @function_name for @prefix and call @callback(result) in the UI thread
+        :param key: Values of the search form other than @prefix, like tab name and combo values (tuple)
+        """
+
+        request_id = self.last_request.get(function_name, 0) + 1
+        self.last_request[function_name] = request_id
+
+        result = self.get_cached(function_name, key, prefix)
+        if result is not None:
+            self.hits += 1
+            callback(result)
+            return
+
+        self.misses += 1
+        task = QgsTask.fromFunction(f"Search {prefix}", self.run_search, function_name, body,
+                                    on_finished=partial(self.search_finished, function_name, key, prefix,
+                                                        request_id, callback),
+                                    flags=QgsTask.Silent)
+        # Keep a reference until task has finished
+        self.tasks[(function_name, request_id)] = task
+        QgsApplication.taskManager().addTask(task)
+
+
+    def run_search(self, task, function_name, body):
+        """ Executed in a background thread. Only logs errors: they are shown by search_finished """
+
+        with self.controller.dao.lease():
+            result = self.controller.get_json(function_name, body, log_sql=True, manage_result=False)
+            error = self.controller.dao.last_error
+            return result, None if error is None else str(error)
+
+
+    def search_finished(self, function_name, key, prefix, request_id, callback, exception, result=None):
+        """ Executed in the UI thread when search task has finished """
+
+        self.tasks.pop((function_name, request_id), None)
+        if exception:
+            self.controller.log_warning(f"Search error: {exception}")
+            return
+
+        if not result:
+            return
+
+        result, error = result
+        if result and result.get('status') != 'Failed' and 'data' in result:
+            self.add_cached(function_name, key, prefix, result)
+
+        # Discard response if user has typed again
+        if request_id != self.last_request.get(function_name):
+            return
+
+        if error:
+            self.controller.show_warning("Search error", parameter=error)
+            return
+
+        if not result:
+            return
+
+        # Show message of failed result and manage options for layers, not allowed in the background thread
+        self.controller.manage_json_result(result)
+        if result.get('status') == 'Failed' or 'data' not in result:
+            return
+
+        callback(result)
+
+
+    def get_cached(self, function_name, key, prefix):
+        """ Get result from cache. Results of shorter prefixes are not filtered, as the columns matched
+            and the number of rows returned are decided by the database functions """
+
+        cache_key = (function_name, key, prefix)
+        if cache_key not in self.cache:
+            return None
+
+        self.cache.move_to_end(cache_key)
+        return self.cache[cache_key]
+
+
+    def add_cached(self, function_name, key, prefix, result):
+
+        self.cache[(function_name, key, prefix)] = result
+        self.cache.move_to_end((function_name, key, prefix))
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+    def clear_cache(self):
+        self.cache.clear()
+
+
+    def cancel(self):
+        """ Discard pending responses """
+
+        for function_name in self.last_request:
+            self.last_request[function_name] += 1
+
@@ -8,11 +8,70 @@ or (at your option) any later version.
 from qgis.PyQt.QtCore import pyqtSignal
 from qgis.core import QgsTask
 
+import io
 import re
 import os
 import subprocess
 
 from .add_layer import AddLayer
+from ..dao.copy_writer import CopyWriter
+
+
+RE_RPT_JOINED_VALUES = re.compile(r'[0-9][-]\d{1,2}[.]]*')
+RE_RPT_OVERLAPPED = re.compile(r'(\d\..*\.\d)')
+RE_RPT_TIME = re.compile(r'^([012]?[0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$')
+
+
+class RptJsonWriter(object):
+    """ Incremental writer of the JSON array sent to gw_fct_rpt2pg_main """
+
+    def __init__(self, stream=None):
+
+        self.stream = stream if stream is not None else io.StringIO()
+        self.rows = 0
+        self.stream.write('[')
+
+
+    def write_row(self, target, col40, values):
+
+        if self.rows > 0:
+            self.stream.write(', ')
+        self.stream.write(f'{{"target": "{target}", "col40": "{col40}"')
+        for x, value in enumerate(values):
+            if "''" not in value:
+                value = '"' + value.strip().replace("\n", "") + '"'
+            else:
+                value = 'null'
+            self.stream.write(f', "col{x + 1}":{value}')
+        self.stream.write('}')
+        self.rows += 1
+
+
+    def getvalue(self):
+        return self.stream.getvalue() + ']'
+
+
+class RptCopyWriter(CopyWriter):
+    """ Incremental writer of the rows loaded into temp_csv with COPY FROM STDIN (text format) """
+
+    def __init__(self, fid):
+        super().__init__(fid, min_columns=40)
+
+
+    def write_row(self, target, col40, values):
+
+        fields = [self.copy_value(value.strip()) if "''" not in value else '\\N' for value in values]
+        # Values take precedence over time column, same as duplicated key 'col40' in json mode
+        if len(fields) < 40:
+            fields += ['\\N'] * (39 - len(fields)) + [self.copy_sentinel(col40)]
+        self.write_fields(self.copy_sentinel(target), fields)
+
+
+    def copy_sentinel(self, value):
+        """ Escape target or time column, set to "null" by the RPT loader when they are unknown """
+
+        value = value.strip("'")
+        return '\\N' if value == 'null' else self.copy_value(value)
 
 
 class TaskGo2Epa(QgsTask):
@@ -51,6 +110,8 @@ class TaskGo2Epa(QgsTask):
         self.plugin_dir = self.go2epa.plugin_dir
         self.net_geom = self.go2epa.net_geom
         self.export_subcatch = self.go2epa.export_subcatch
+        self.rpt_copy = self.controller.settings.value('system_variables/go2epa_rpt_copy', 'FALSE').upper() == 'TRUE'
+        self.inp_stream = self.controller.settings.value('system_variables/go2epa_inp_stream', 'FALSE').upper() == 'TRUE'
 
 
     def run(self):
@@ -64,13 +125,29 @@ class TaskGo2Epa(QgsTask):
         self.complet_result = None
 
         self.controller.show_db_exception = False
-        status = True
 
-        if not self.exec_function_pg2epa():
+        # Use a connection of the pool, so the UI thread can keep querying the database meanwhile
+        try:
+            with self.controller.dao.lease():
+                return self.run_steps()
+        except Exception as e:
+            self.exception = e
             return False
 
-        if self.export_inp:
-            status = self.export_to_inp()
+
+    def run_steps(self):
+
+        status = True
+        if self.inp_stream and self.export_inp:
+            status = self.exec_function_pg2epa_stream()
+            if not status:
+                return False
+        else:
+            if not self.exec_function_pg2epa():
+                return False
+
+            if self.export_inp:
+                status = self.export_to_inp()
 
         if status and self.exec_epa:
             status = self.execute_epa()
@@ -178,6 +255,55 @@ class TaskGo2Epa(QgsTask):
         return True
 
 
+    def exec_function_pg2epa_stream(self):
+        """ Call gw_fct_pg2epa_main and write its INP lines into file as they are fetched from the server """
+
+        self.setProgress(0)
+        extras = f'"resultId":"{self.result_name}"'
+        extras += f', "useNetworkGeom":"{self.net_geom}"'
+        extras += f', "dumpSubcatch":"{self.export_subcatch}"'
+        body = self.create_body(extras=extras)
+
+        # First row returns function result without INP lines, next ones return INP lines ordered
+        sql = (f"WITH result AS (SELECT gw_fct_pg2epa_main({body})::jsonb AS json_result) "
+               f"SELECT 0 AS line, NULL AS text, json_result #- '{{body,file}}' AS json_result FROM result "
+               f"UNION ALL "
+               f"SELECT file.line, file.item->>'text', NULL FROM result, "
+               f"jsonb_array_elements(json_result->'body'->'file') WITH ORDINALITY AS file(item, line) "
+               f"ORDER BY line")
+
+        self.controller.log_info(f"Write inp file........: {self.file_inp}")
+        json_result = None
+        total = 0
+        with open(self.file_inp, "w", buffering=1024 * 1024) as file_inp:
+            for rows in self.controller.get_rows_chunks(sql, log_sql=True):
+                if self.isCanceled():
+                    return False
+                for row in rows:
+                    if row['line'] == 0:
+                        json_result = row['json_result']
+                    elif row['text'] is not None:
+                        file_inp.write(row['text'].rstrip() + "\n")
+                total += len(rows)
+                self.controller.log_info(f"INP lines written: {total}")
+
+        self.complet_result = json_result
+        if json_result is None or not json_result:
+            self.function_failed = True
+            return False
+
+        if 'status' in json_result and json_result['status'] == 'Failed':
+            self.controller.log_warning(json_result)
+            self.function_failed = True
+            return False
+
+        self.controller.layer_manager(json_result)
+        self.message = json_result['message']['text']
+        self.common_msg += "Export INP finished. "
+
+        return True
+
+
     def export_to_inp(self):
 
         if self.isCanceled():
@@ -257,6 +383,7 @@ class TaskGo2Epa(QgsTask):
 
         self.rpt_result = None
         self.json_rpt = None
+        self.rpt_writer = None
         status = False
         try:
             # Call import function
@@ -271,12 +398,12 @@ class TaskGo2Epa(QgsTask):
 
 
     def read_rpt_file(self, file_path=None):
+        """ Parse RPT file line by line and build JSON array of rows into self.json_rpt """
 
+        file_size = os.path.getsize(file_path) or 1
         self.file_rpt = open(file_path, "r+")
-        full_file = self.file_rpt.readlines()
-        progress = 0
 
-        # Create dict with sources
+        # Create dict with sources: {source: (position, tablename)}
         sql = f"SELECT tablename, target FROM config_fprocess WHERE fid = {self.fid};"
         rows = self.controller.get_rows(sql)
         sources = {}
@@ -285,107 +412,97 @@ class TaskGo2Epa(QgsTask):
             item = json_elem.split(',')
             for i in item:
                 sources[i.strip()] = row[0].strip()
+        sources = {k: (position, v) for position, (k, v) in enumerate(sources.items())}
 
         # While we don't find a match with the target, target and col40 must be null
         target = "null"
         col40 = "null"
-        json_rpt = ""
-        row_count = sum(1 for rows in full_file)  # @UnusedVariable
+        if self.rpt_copy:
+            writer = RptCopyWriter(self.fid)
+        else:
+            writer = RptJsonWriter()
+        read_size = 0
+        progress = 0
 
-        for line_number, row in enumerate(full_file):
+        for line_number, row in enumerate(self.file_rpt):
 
             if self.isCanceled():
                 return False
 
-            progress += 1
+            read_size += len(row)
             if '**' in row or '--' in row:
                 continue
 
-            row = row.rstrip()
-            dirty_list = row.split(' ')
-
-            # Clean unused items
-            for x in range(len(dirty_list) - 1, -1, -1):
-                if dirty_list[x] == '':
-                    dirty_list.pop(x)
-
-            sp_n = []
-            if len(dirty_list) > 0:
-                for x in range(0, len(dirty_list)):
-                    if bool(re.search('[0-9][-]\d{1,2}[.]]*', str(dirty_list[x]))):
-                        last_index = 0
-                        for i, c in enumerate(dirty_list[x]):
-                            if "-" == c:
-                                json_elem = dirty_list[x][last_index:i]
-                                last_index = i
-                                sp_n.append(json_elem)
-
-                        # noinspection PyUnboundLocalVariable
-                        json_elem = dirty_list[x][last_index:i]
-                        sp_n.append(json_elem)
-
-                    elif bool(re.search('(\d\..*\.\d)', str(dirty_list[x]))):
-                        if 'Version' not in dirty_list and 'VERSION' not in dirty_list:
-                            error_near = f"Error near line {line_number+1} -> {dirty_list}"
-                            self.controller.log_info(error_near)
-                            message = (f"The rpt file is not valid to import. "
-                                       f"Because columns on rpt file are overlaped, it seems you need to improve your simulation. "
-                                       f"Please ckeck and fix it before continue. \n"
-                                       f"{error_near}")
-                            self.error_msg = message
-                            return False
-                    elif bool(re.search('>50', str(dirty_list[x]))):
-                        error_near = f"Error near line {line_number+1} -> {dirty_list}"
-                        self.controller.log_info(error_near)
-                        message = (f"The rpt file is not valid to import. "
-                                   f"Because velocity has not numeric value (>50), it seems you need to improve your simulation. "
-                                   f"Please ckeck and fix it before continue. \n"
-                                   f"{error_near}")
-                        self.error_msg = message
-                        return False
-                    else:
-                        sp_n.append(dirty_list[x])
+            sp_n = self.split_rpt_row(row, line_number)
+            if sp_n is None:
+                return False
 
             # Find strings into dict and set target column
-            for k, v in sources.items():
-                try:
-                    if k in (f'{sp_n[0]} {sp_n[1]}', f'{sp_n[0]}'):
-                        target = "'" + v + "'"
-                        _time = re.compile('^([012]?[0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]$')
-                        if _time.search(sp_n[3]):
-                            col40 = "'" + sp_n[3] + "'"
-                except IndexError:
-                    pass
-                except Exception as e:
-                    self.controller.log_info(type(e).__name__)
+            if len(sp_n) > 1:
+                # If both keys match, keep the one defined last in config_fprocess
+                matches = [sources[k] for k in (f'{sp_n[0]} {sp_n[1]}', sp_n[0]) if k in sources]
+                if matches:
+                    target = "'" + max(matches)[1] + "'"
+                    if len(sp_n) > 3 and RE_RPT_TIME.search(sp_n[3]):
+                        col40 = "'" + sp_n[3] + "'"
 
             if len(sp_n) > 0:
-                json_elem = f'"target": "{target}", "col40": "{col40}", '
-                for x in range(0, len(sp_n)):
-                    json_elem += f'"col{x + 1}":'
-                    if "''" not in sp_n[x]:
-                        value = '"' + sp_n[x].strip().replace("\n", "") + '", '
-                        value = value.replace("''", "null")
-                    else:
-                        value = 'null, '
-                    json_elem += value
-
-                json_elem = '{' + str(json_elem[:-2]) + '}, '
-                json_rpt += json_elem
+                writer.write_row(target, col40, sp_n)
 
             # Update progress bar
+            progress += 1
             if progress % 1000 == 0:
-                self.setProgress((line_number * 100) / row_count)
-
-        # Manage JSON
-        json_rpt = '[' + str(json_rpt[:-2]) + ']'
-        self.json_rpt = json_rpt
+                self.setProgress((read_size * 100) / file_size)
 
+        if self.rpt_copy:
+            self.rpt_writer = writer
+        else:
+            self.json_rpt = writer.getvalue()
         self.close_file()
 
         return True
 
 
+    def split_rpt_row(self, row, line_number):
+        """ Split RPT @row into list of values. Return None if row is not valid to import """
+
+        dirty_list = [item for item in row.rstrip().split(' ') if item != '']
+        sp_n = []
+        for item in dirty_list:
+            if RE_RPT_JOINED_VALUES.search(item):
+                # Split values joined by '-' (last character is discarded)
+                last_index = 0
+                for i, c in enumerate(item):
+                    if "-" == c:
+                        sp_n.append(item[last_index:i])
+                        last_index = i
+                sp_n.append(item[last_index:len(item) - 1])
+
+            elif RE_RPT_OVERLAPPED.search(item):
+                if 'Version' not in dirty_list and 'VERSION' not in dirty_list:
+                    error_near = f"Error near line {line_number+1} -> {dirty_list}"
+                    self.controller.log_info(error_near)
+                    message = (f"The rpt file is not valid to import. "
+                               f"Because columns on rpt file are overlaped, it seems you need to improve your simulation. "
+                               f"Please ckeck and fix it before continue. \n"
+                               f"{error_near}")
+                    self.error_msg = message
+                    return None
+            elif '>50' in item:
+                error_near = f"Error near line {line_number+1} -> {dirty_list}"
+                self.controller.log_info(error_near)
+                message = (f"The rpt file is not valid to import. "
+                           f"Because velocity has not numeric value (>50), it seems you need to improve your simulation. "
+                           f"Please ckeck and fix it before continue. \n"
+                           f"{error_near}")
+                self.error_msg = message
+                return None
+            else:
+                sp_n.append(item)
+
+        return sp_n
+
+
     def create_body(self, form='', feature='', filter_fields='', extras=None):
         """ Create and return parameters as body to functions"""
 
@@ -406,6 +523,9 @@ class TaskGo2Epa(QgsTask):
     def exec_import_function(self):
         """ Call function gw_fct_rpt2pg_main """
 
+        if self.rpt_copy and not self.copy_rpt_rows():
+            return False
+
         extras = f'"resultId":"{self.result_name}"'
         if self.json_rpt:
             extras += f', "file": {self.json_rpt}'
@@ -426,3 +546,24 @@ class TaskGo2Epa(QgsTask):
         self.common_msg += "Import RPT file finished."
 
         return True
+
+
+    def copy_rpt_rows(self):
+        """ Load rows parsed from RPT file into temp_csv using COPY """
+
+        try:
+            sql = f"DELETE FROM temp_csv WHERE fid = {self.fid} AND cur_user = current_user"
+            if not self.controller.execute_sql(sql, commit=False):
+                self.function_failed = True
+                return False
+
+            self.controller.log_info(f"Copy {self.rpt_writer.rows} rows into temp_csv")
+            self.rpt_writer.rewind()
+            status = self.controller.copy_expert(self.rpt_writer.get_copy_sql(), self.rpt_writer)
+            if not status:
+                self.function_failed = True
+        finally:
+            self.rpt_writer.close()
+            self.rpt_writer = None
+
+        return status
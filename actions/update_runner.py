@@ -0,0 +1,197 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+
+UpdateStep = namedtuple('UpdateStep', 'filepath relpath schema_name project_epsg group')
+StepResult = namedtuple('StepResult', 'step status duration error skipped')
+
+
+class UpdateRunner(object):
+    """ Execute the SQL files of a schema update planned beforehand.
+        Every file is stored with its record in journal table 'audit_update_journal' of the schema.
+        Without transaction, every file is committed with its record, so an update that fails can be executed
+        again and files already applied are skipped. Consecutive files of the same group don't depend on each
+        other and are executed concurrently, each one with a connection of the pool.
+        With transaction, files and records are executed one after the other in the current transaction,
+        which is rolled back if a file fails. Commit is left to the caller """
+
+    journal_table = 'audit_update_journal'
+
+    def __init__(self, controller, sql_dir, version, stop_on_error=True, max_workers=4, transaction=False):
+        """
+        :param sql_dir: Folder used to get relative path of the files stored in the journal (string)
+        :param version: Version of the update, files are only skipped if applied for the same version (string)
+        :param transaction: Execute all files in a single transaction instead of committing each one (boolean)
+        """
+
+        self.controller = controller
+        self.sql_dir = sql_dir
+        self.version = str(version)
+        self.transaction = transaction
+        self.stop_on_error = stop_on_error or transaction
+        self.max_workers = 1 if transaction else max(1, int(max_workers))
+        self.steps = []
+        self.results = []
+        self.error_count = 0
+
+
+    def add_file(self, filepath, schema_name, project_epsg, group=None):
+        """ Add file to the plan. Consecutive files with the same @group (not None) can run concurrently """
+
+        relpath = os.path.relpath(filepath, self.sql_dir).replace(os.sep, '/')
+        self.steps.append(UpdateStep(filepath, relpath, schema_name, project_epsg, group))
+
+
+    def get_batches(self):
+        """ Split steps in batches: consecutive steps of the same group or single steps """
+
+        batches = []
+        for step in self.steps:
+            if batches and step.group is not None and batches[-1][-1].group == step.group:
+                batches[-1].append(step)
+            else:
+                batches.append([step])
+
+        return batches
+
+
+    def run(self):
+        """ Execute planned steps. Return False if any of them failed """
+
+        schemas = {step.schema_name for step in self.steps}
+        for schema_name in schemas:
+            if not self.create_journal(schema_name):
+                return False
+        applied = {}
+        for schema_name in schemas:
+            applied[schema_name] = self.get_applied(schema_name)
+
+        status = True
+        for batch in self.get_batches():
+            pending = []
+            for step in batch:
+                checksum = self.get_checksum(step.filepath)
+                if (step.relpath, checksum) in applied[step.schema_name]:
+                    self.results.append(StepResult(step, True, 0, None, True))
+                else:
+                    pending.append((step, checksum))
+
+            if len(pending) > 1 and self.max_workers > 1:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                    results = list(executor.map(lambda args: self.execute_step(*args, leased=True), pending))
+            else:
+                results = [self.execute_step(step, checksum) for step, checksum in pending]
+
+            for result in results:
+                self.results.append(result)
+                if not result.status:
+                    status = False
+                    self.error_count += 1
+                    self.controller.log_info("read_execute_file error", parameter=result.step.filepath)
+                    self.controller.log_info(f"Message: {result.error}")
+
+            if not status and self.stop_on_error:
+                failed = [result for result in results if not result.status][0]
+                if self.transaction:
+                    self.controller.dao.rollback()
+                self.controller.manage_exception_db(failed.error, filepath=failed.step.filepath)
+                break
+
+        self.controller.log_info(self.get_report(limit=None))
+        return status
+
+
+    def execute_step(self, step, checksum, leased=False):
+        """ Execute file of @step and store it in the journal in the same transaction """
+
+        if leased:
+            with self.controller.dao.lease():
+                return self.execute_step(step, checksum)
+
+        dao = self.controller.dao
+        time_start = time()
+        status = True
+        try:
+            for sql in self.controller.sql_templates.render(step.filepath, step.schema_name, step.project_epsg):
+                status = dao.execute_sql(sql, commit=False)
+                if not status:
+                    break
+        except Exception as e:
+            if not self.transaction:
+                dao.rollback()
+            return StepResult(step, False, time() - time_start, e, False)
+
+        duration = time() - time_start
+        if status:
+            relpath = step.relpath.replace("'", "''")
+            sql = (f"INSERT INTO {step.schema_name}.{self.journal_table} (version, filepath, checksum, duration)"
+                   f" VALUES ('{self.version}', '{relpath}', '{checksum}', {duration:.3f})")
+            status = dao.execute_sql(sql, commit=not self.transaction)
+        error = dao.last_error
+        if not status and not self.transaction:
+            dao.rollback()
+
+        return StepResult(step, status, duration, error, False)
+
+
+    def create_journal(self, schema_name):
+
+        sql = (f"CREATE TABLE IF NOT EXISTS {schema_name}.{self.journal_table} ("
+               f"id serial PRIMARY KEY, version text NOT NULL, filepath text NOT NULL, checksum text NOT NULL, "
+               f"duration numeric, tstamp timestamp DEFAULT now())")
+        status = self.controller.dao.execute_sql(sql, commit=not self.transaction)
+        if not status:
+            self.controller.manage_exception_db(self.controller.dao.last_error, sql)
+        return status
+
+
+    def get_applied(self, schema_name):
+        """ Get (filepath, checksum) of files already applied for current version """
+
+        sql = (f"SELECT filepath, checksum FROM {schema_name}.{self.journal_table}"
+               f" WHERE version = '{self.version}'")
+        rows = self.controller.get_rows(sql, log_info=False)
+        if not rows:
+            return set()
+
+        return {(row[0], row[1]) for row in rows}
+
+
+    def get_checksum(self, filepath):
+
+        sha1 = hashlib.sha1()
+        try:
+            with open(filepath, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    sha1.update(block)
+        except OSError:
+            return None
+
+        return sha1.hexdigest()
+
+
+    def get_report(self, limit=15):
+        """ Get report of executed files sorted by duration. Show only the slowest @limit files """
+
+        executed = [result for result in self.results if not result.skipped]
+        skipped = len(self.results) - len(executed)
+        total = sum(result.duration for result in executed)
+        report = (f"Update {self.version}: {len(executed)} files executed in {total:.1f} s, "
+                  f"{skipped} already applied, {self.error_count} errors\n")
+        executed.sort(key=lambda result: result.duration, reverse=True)
+        for result in executed[:limit]:
+            status = '' if result.status else ' (error)'
+            report += f"{result.duration:8.2f} s  {result.step.relpath}{status}\n"
+
+        return report
+
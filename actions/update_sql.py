@@ -24,17 +24,22 @@ import subprocess
 import xml.etree.cElementTree as ET
 from collections import OrderedDict
 from functools import partial
-from time import sleep
+from time import sleep, time
 
 from .. import utils_giswater
+from ..dao.copy_writer import CopyWriter
 from .api_parent import ApiParent
 from .create_gis_project import CreateGisProject
 from .gw_task import GwTask
 from .i18n_generator import I18NGenerator
+from .update_runner import UpdateRunner
 from ..ui_manager import MainUi, InfoShowInfo, MainDbProjectUi, MainRenameProjUi, MainProjectInfoUi, \
     MainGisProjectUi, ToolboxUi, MainFields, MainVisitClass, MainVisitParam, MainSysFields, Credentials
 
 
+RE_INP_SEPARATOR = re.compile(' |\t')
+
+
 class UpdateSQL(ApiParent):
 
     def __init__(self, iface, settings, controller, plugin_dir):
@@ -54,6 +59,7 @@ class UpdateSQL(ApiParent):
         self.project_type_selected = None
         self.schema_type = None
         self.project_issample = True
+        self.update_runner = None
 
 
     def init_sql(self, set_database_connection=False, username=None, show_dialog=True):
@@ -158,6 +164,7 @@ class UpdateSQL(ApiParent):
         self.dev_user = self.settings.value('system_variables/devoloper_mode').upper()
         self.read_all_updates = self.settings.value('system_variables/read_all_updates').upper()
         self.dev_commit = self.settings.value('system_variables/dev_commit').upper()
+        self.update_journal = self.settings.value('system_variables/update_journal', 'FALSE').upper()
 
         # Create dialog object
         self.dlg_readsql = MainUi()
@@ -1775,16 +1782,19 @@ class UpdateSQL(ApiParent):
         self.task1 = GwTask('Manage schema')
         QgsApplication.taskManager().addTask(self.task1)
         self.task1.setProgress(0)
-        status = self.load_fct_ftrg(project_type=project_type)
-        self.task1.setProgress(20)
-        if status:
-            status = self.update_30to31(project_type=project_type)
-        self.task1.setProgress(40)
-        if status:
-            status = self.update_31to39(project_type=project_type)
-        self.task1.setProgress(60)
-        if status:
-            status = self.api(project_type=project_type)
+        if self.update_journal == 'TRUE':
+            status = self.run_updates(project_type)
+        else:
+            status = self.load_fct_ftrg(project_type=project_type)
+            self.task1.setProgress(20)
+            if status:
+                status = self.update_30to31(project_type=project_type)
+            self.task1.setProgress(40)
+            if status:
+                status = self.update_31to39(project_type=project_type)
+            self.task1.setProgress(60)
+            if status:
+                status = self.api(project_type=project_type)
         self.task1.setProgress(80)
         if status:
             status = self.execute_last_process(schema_name=schema_name, locale=True)
@@ -1804,6 +1814,35 @@ class UpdateSQL(ApiParent):
         return status
 
 
+    def run_updates(self, project_type):
+        """ Plan the files of the update and execute them with UpdateRunner. Files are journaled.
+            As read_execute_file does, they are committed one by one only if dev_commit, so a failed update
+            is resumed when executed again. Otherwise they run in the current transaction """
+
+        self.update_runner = UpdateRunner(self.controller, self.sql_dir, self.plugin_version,
+            stop_on_error=(self.dev_commit == 'FALSE'), max_workers=self.controller.get_pool_size(),
+            transaction=(self.dev_commit == 'FALSE'))
+        try:
+            # Folder methods only add their files to the plan while update_runner is set. Runner stops at the
+            # first file that fails, so while planning they only fail if a folder is not found
+            planned = self.load_fct_ftrg(project_type=project_type)
+            if planned:
+                planned = self.update_30to31(project_type=project_type)
+            if planned:
+                planned = self.update_31to39(project_type=project_type)
+            if planned:
+                planned = self.api(project_type=project_type)
+        finally:
+            runner = self.update_runner
+            self.update_runner = None
+
+        self.task1.setProgress(20)
+        status = runner.run() and bool(planned)
+        self.error_count += runner.error_count
+        self.controller.show_info_box("Update report", "Info", inf_text=runner.get_report())
+        return status
+
+
     def get_schema_name(self):
 
         schema_name = utils_giswater.getWidgetText(self.dlg_readsql, self.dlg_readsql.project_schema_name)
@@ -2370,6 +2409,10 @@ class UpdateSQL(ApiParent):
             schema_name = self.schema.replace('"', '')
 
         self.project_epsg = str(self.project_epsg).replace('"', '')
+        if self.update_runner is not None:
+            self.add_files_to_runner(filedir, filelist, schema_name, i18n, no_ct)
+            return True
+
         if i18n:
             for file in filelist:
                 if "utils.sql" in file:
@@ -2396,26 +2439,45 @@ class UpdateSQL(ApiParent):
         return status
 
 
-    def read_execute_file(self, filedir, file, schema_name, project_epsg):
+    def add_files_to_runner(self, filedir, filelist, schema_name, i18n=False, no_ct=False):
+        """ Add to the plan of the update the same files that executeFiles would execute.
+            Translation files of a folder update different tables, so they are executed concurrently """
 
-        status = False
-        try:
-            filepath = filedir + os.sep + file
-            f = open(filepath, 'r', encoding="utf8")
-            if f:
-                f_to_read = str(f.read().replace("SCHEMA_NAME", schema_name).replace("SRID_VALUE", project_epsg))
-                if self.dev_commit == 'TRUE':
-                    status = self.controller.execute_sql(str(f_to_read), filepath=filepath)
+        if i18n:
+            for file in filelist:
+                if "utils.sql" in file:
+                    file = 'utils.sql'
+                elif str(self.project_type_selected) + ".sql" in file:
+                    file = str(self.project_type_selected) + '.sql'
                 else:
-                    status = self.controller.execute_sql(str(f_to_read), commit=False, filepath=filepath)
+                    continue
+                self.update_runner.add_file(filedir + os.sep + file, schema_name, self.project_epsg, group=filedir)
+        else:
+            for file in filelist:
+                if ".sql" in file and ((no_ct is True and "tablect.sql" not in file) or no_ct is False):
+                    self.update_runner.add_file(filedir + os.sep + file, schema_name, self.project_epsg)
+
 
+    def read_execute_file(self, filedir, file, schema_name, project_epsg):
+
+        status = True
+        filepath = filedir + os.sep + file
+        try:
+            # File is sent in chunks of complete statements, committed at the end if dev_commit
+            for sql in self.controller.sql_templates.render(filepath, schema_name, project_epsg):
+                status = self.controller.execute_sql(sql, commit=False, filepath=filepath)
                 if status is False:
-                    self.error_count = self.error_count + 1
-                    self.controller.log_info(str("read_execute_file error"), parameter=filepath)
-                    self.controller.log_info(str('Message: ' + str(self.controller.last_error)))
-                    if self.dev_commit == 'TRUE':
-                        self.controller.dao.rollback()
-                    return False
+                    break
+            if status and self.dev_commit == 'TRUE':
+                self.controller.dao.commit()
+
+            if status is False:
+                self.error_count = self.error_count + 1
+                self.controller.log_info(str("read_execute_file error"), parameter=filepath)
+                self.controller.log_info(str('Message: ' + str(self.controller.last_error)))
+                if self.dev_commit == 'TRUE':
+                    self.controller.dao.rollback()
+                return False
 
         except Exception as e:
             self.error_count = self.error_count + 1
@@ -2425,7 +2487,6 @@ class UpdateSQL(ApiParent):
                 self.controller.dao.rollback()
             status = False
         finally:
-            f.close()
             return status
 
 
@@ -2529,7 +2590,7 @@ class UpdateSQL(ApiParent):
         if accepted:
 
             # Set wait cursor
-            self.task1 = GwTask('Manage schema')
+            self.task1 = GwTask('Manage schema', controller=self.controller)
             QgsApplication.taskManager().addTask(self.task1)
             self.task1.setProgress(0)
 
@@ -3303,66 +3364,43 @@ class UpdateSQL(ApiParent):
 
 
     def insert_inp_into_db(self, folder_path=None):
+        """ Load INP file into temp_csv (fid 239) in one streaming pass using COPY """
 
-        _file = open(folder_path, "r+", encoding='utf8')
-        full_file = _file.readlines()
-        sql = ""
-        progress = 0
+        file_size = os.path.getsize(folder_path) or 1
+        writer = CopyWriter(239)
+        time_start = time()
+        read_size = 0
         target = ""
-        for row in full_file:
-            progress += 1
-            row = row.rstrip()
-            if len(row) == 0:
-                continue
-            if str(row[0]) == "[":
-                target = str(row)
-            if target in ('[TRANSECTS]', '[CONTROLS]', '[RULES]'):
-                sp_n = [row]
-            elif target in ('[EVAPORATION]', '[TEMPERATURE]'):
-                sp_n = re.split(' |\t', row, 1)
-            else:
-                if str(row[0]) != ';':
-                    list_aux = row.split("\t")
-                    dirty_list = []
-                    for x in range(0, len(list_aux)):
-                        aux = list_aux[x].split(" ")
-                        for i in range(len(aux)):
-                            dirty_list.append(aux[i])
+        with open(folder_path, "r+", encoding='utf8') as _file:
+            for row in _file:
+                read_size += len(row)
+                row = row.rstrip()
+                if len(row) == 0:
+                    continue
+                if row[0] == "[":
+                    target = row
+                if target in ('[TRANSECTS]', '[CONTROLS]', '[RULES]'):
+                    sp_n = [row]
+                elif target in ('[EVAPORATION]', '[TEMPERATURE]'):
+                    sp_n = RE_INP_SEPARATOR.split(row, 1)
                 else:
-                    dirty_list = [row]
-
-                for x in range(len(dirty_list) - 1, -1, -1):
-                    if dirty_list[x] == '' or "**" in dirty_list[x] or "--" in dirty_list[x] or dirty_list[x] == '; '\
-                            or dirty_list[x] == ';' or dirty_list[x] == ';\n':
-                        dirty_list.pop(x)
-                sp_n = dirty_list
-
-            if len(sp_n) > 0:
-                sql += "INSERT INTO temp_csv (fid, source, "
-                values = "VALUES(239, $$" + target + "$$, "
-                for x in range(0, len(sp_n)):
-                    if "''" not in sp_n[x]:
-                        sql += "csv" + str(x + 1) + ", "
-                        value = "$$" + sp_n[x].strip().replace("\n", "") + "$$, "
-                        values += value.replace("$$$$", "null")
-                    else:
-                        sql += "csv" + str(x + 1) + ", "
-                        values = "VALUES(null, "
-                sql = sql[:-2] + ") "
-                values = values[:-2] + ");\n"
-                sql += values
-
-            if progress % 500 == 0:
-                # TODO:: Use dev_commit or dev_user?
-                self.controller.execute_sql(sql, commit=self.dev_user)
-                sql = ""
+                    dirty_list = RE_INP_SEPARATOR.split(row) if row[0] != ';' else [row]
+                    sp_n = [item for item in dirty_list
+                            if item not in ('', ';') and "**" not in item and "--" not in item]
+
+                if len(sp_n) > 0:
+                    fields = ['\\N' if "''" in value else writer.copy_value(value.strip()) for value in sp_n]
+                    writer.write_fields(writer.copy_value(target) if target else '', fields)
+                    if writer.rows % 10000 == 0:
+                        self.task1.set_progress_rate(read_size * 50 / file_size, writer.rows, time() - time_start)
+
+        writer.rewind()
+        # TODO:: Use dev_commit or dev_user?
+        status = self.controller.copy_expert(writer.get_copy_sql(), writer, commit=self.dev_user)
+        writer.close()
+        self.task1.set_progress_rate(50, writer.rows, time() - time_start)
 
-        if sql != "":
-            # TODO:: Use dev_commit or dev_user?
-            self.controller.execute_sql(sql, commit=self.dev_user)
-
-        _file.close()
-        del _file
+        return status
 
 
     def select_file_inp(self):
@@ -3408,6 +3446,10 @@ class UpdateSQL(ApiParent):
     def manage_result_message(self, status, msg_ok=None, msg_error=None, parameter=None):
         """ Manage message depending result @status """
 
+        # Database functions and table configuration could have been changed
+        self.controller.reset_routines_cache()
+        self.controller.table_models.reset()
+
         if status:
             if msg_ok is None:
                 msg_ok = "Process finished successfully"
@@ -25,6 +25,8 @@ import sys
 
 from .pg_dao import PgDao
 from .logger import Logger
+from .sql_template_cache import SqlTemplateCache
+from .table_model_registry import TableModelRegistry
 from .. import utils_giswater
 from .. import sys_manager
 from ..ui_manager import DialogTextUi, DockerUi
@@ -65,6 +67,15 @@ class DaoController(object):
         self.use_notify = False
         self.notify = None
         self.notify_is_listening = False
+        self.routines = {}
+        self.routines_hits = 0
+        self.routines_misses = 0
+        self.table_models = TableModelRegistry(self)
+        self.sql_templates = SqlTemplateCache()
+        self.layer_index = None
+        self.layer_index_tables = {}
+        self.layer_sources = {}
+        self.identify_engine = None
 
         if create_logger:
             self.set_logger(logger_name)
@@ -111,6 +122,39 @@ class DaoController(object):
                 self.notify_is_listening = False
 
 
+    def listen(self, channels, command='LISTEN'):
+        """ Execute @command (LISTEN or UNLISTEN) of @channels in the dedicated notify connection """
+
+        status = self.dao.listen(channels, command)
+        if not status:
+            self.last_error = self.dao.last_error
+            self.log_warning(f"Error {command} channels: {self.last_error}")
+
+        return status
+
+
+    def get_pool_size(self):
+        """ Get maximum number of connections leased to background tasks """
+
+        pool_size = 4
+        if self.settings:
+            try:
+                pool_size = max(1, int(self.settings.value('system_variables/db_pool_size', pool_size)))
+            except (TypeError, ValueError):
+                pass
+
+        return pool_size
+
+
+    def get_pool_stats(self):
+        """ Get statistics of the connection pool used by background tasks """
+
+        if not self.dao:
+            return None
+
+        return self.dao.get_pool_stats()
+
+
     def close_db(self):
         """ Close database connection """
 
@@ -127,6 +171,10 @@ class DaoController(object):
 
 
     def set_schema_name(self, schema_name):
+
+        if schema_name != self.schema_name:
+            self.reset_routines_cache()
+            self.table_models.reset()
         self.schema_name = schema_name
 
 
@@ -148,7 +196,8 @@ class DaoController(object):
 
             self.min_log_level = int(self.settings.value('status/log_level'))
             log_suffix = self.settings.value('status/log_suffix')
-            self.logger = Logger(self, logger_name, self.min_log_level, log_suffix)
+            use_queue = str(self.settings.value('status/log_queue', 'FALSE')).upper() == 'TRUE'
+            self.logger = Logger(self, logger_name, self.min_log_level, log_suffix, use_queue=use_queue)
 
             if self.min_log_level == 10:
                 self.min_message_level = 0
@@ -425,7 +474,7 @@ class DaoController(object):
             return False
 
         # Connect to Database
-        self.dao = PgDao()
+        self.dao = PgDao(self.get_pool_size())
         self.dao.set_params(host, port, db, user, pwd, sslmode)
         status = self.dao.init_db()
         if not status:
@@ -459,7 +508,7 @@ class DaoController(object):
             return False
 
         # Connect to Database
-        self.dao = PgDao()
+        self.dao = PgDao(self.get_pool_size())
         self.dao.set_conn_string(conn_string)
         status = self.dao.init_db()
         if not status:
@@ -702,14 +751,27 @@ class DaoController(object):
         return rows
 
 
-    def execute_sql(self, sql, log_sql=False, log_error=False, commit=True, filepath=None):
+    def get_rows_chunks(self, sql, size=5000, log_sql=False, commit=True, params=None):
+        """ Execute SQL with a server-side cursor. Yield its rows in lists of @size rows """
+
+        if not self.manage_connection():
+            return
+
+        sql = self.get_sql(sql, log_sql, params)
+        for rows in self.dao.get_rows_chunks(sql, size, commit):
+            yield rows
+        self.last_error = self.dao.last_error
+        if self.last_error:
+            self.manage_exception_db(self.last_error, sql)
+
+
+    def execute_sql(self, sql, log_sql=False, log_error=False, commit=True, filepath=None, params=None):
         """ Execute SQL. Check its result in log tables, and show it to the user """
 
         if not self.manage_connection():
             return None
 
-        if log_sql:
-            self.log_info(sql, stack_level_increase=1)
+        sql = self.get_sql(sql, log_sql, params)
         result = self.dao.execute_sql(sql, commit)
         self.last_error = self.dao.last_error
         if not result:
@@ -721,6 +783,22 @@ class DaoController(object):
         return True
 
 
+    def copy_expert(self, sql, file, log_sql=False, commit=True):
+        """ Execute COPY statement @sql using @file as source (FROM STDIN) or target (TO STDOUT) """
+
+        if not self.manage_connection():
+            return None
+
+        if log_sql:
+            self.log_info(sql, stack_level_increase=1)
+        self.last_error = self.dao.copy_expert(sql, file, commit)
+        if self.last_error:
+            self.manage_exception_db(self.last_error, sql)
+            return False
+
+        return True
+
+
     def execute_returning(self, sql, log_sql=False, log_error=False, commit=True):
         """ Execute SQL. Check its result in log tables, and show it to the user """
 
@@ -857,23 +935,27 @@ class DaoController(object):
 
 
     def get_json(self, function_name, parameters=None, schema_name=None, commit=True, log_sql=False,
-                 log_result=False, json_loads=False, is_notify=False):
+                 log_result=False, json_loads=False, is_notify=False, manage_result=True):
         """ Manage execution API function
         :param function_name: Name of function to call (text)
         :param parameters: Parameters for function (json)
         :param commit: Commit sql (bool)
         :param log_sql: Show query in qgis log (bool)
+        :param manage_result: Check connection and function, show errors and manage options for layers.
+            Background tasks must set it to False: errors are only logged, the database error is left
+            in dao.last_error and the caller must call manage_json_result in the UI thread (bool)
         :return: Response of the function executed (json)
         """
 
-        if not self.manage_connection():
-            return None
+        if manage_result:
+            if not self.manage_connection():
+                return None
 
-        # Check if function exists
-        row = self.check_function(function_name, schema_name, commit)
-        if row in (None, ''):
-            self.show_warning("Function not found in database", parameter=function_name)
-            return None
+            # Check if function exists
+            row = self.check_function(function_name, schema_name, commit)
+            if row in (None, ''):
+                self.show_warning("Function not found in database", parameter=function_name)
+                return None
 
         # Execute function. If failed, always log it
         if schema_name:
@@ -884,7 +966,10 @@ class DaoController(object):
             sql += f"{parameters}"
         sql += f");"
 
-        row = self.get_row(sql, commit=commit, log_sql=log_sql)
+        if manage_result:
+            row = self.get_row(sql, commit=commit, log_sql=log_sql)
+        else:
+            row = self.dao.get_row(self.get_sql(sql, log_sql), commit)
         if not row or not row[0]:
             self.log_warning(f"Function error: {function_name}")
             self.log_warning(sql)
@@ -901,6 +986,9 @@ class DaoController(object):
         if log_result:
             self.log_info(json_result, stack_level_increase=1)
 
+        if not manage_result:
+            return json_result
+
         # If failed, manage exception
         if 'status' in json_result and json_result['status'] == 'Failed':
             self.manage_exception_api(json_result, sql, is_notify=is_notify)
@@ -912,6 +1000,68 @@ class DaoController(object):
         return json_result
 
 
+    def get_json_batch(self, function_name, parameters, schema_name=None, commit=True, log_sql=False,
+                       manage_result=True):
+        """ Execute API function once for each item of @parameters in a single query
+        :param parameters: Parameters for each function call (dict {key: json})
+        :param manage_result: Check connection and function, and manage each response with manage_json_result.
+            Background tasks must set it to False and call manage_json_result in the UI thread (bool)
+        :return: Response of each function call (dict {key: json}). None if query failed
+        """
+
+        if manage_result:
+            if not self.manage_connection():
+                return None
+
+            # Check if function exists
+            row = self.check_function(function_name, schema_name, commit)
+            if row in (None, ''):
+                self.show_warning("Function not found in database", parameter=function_name)
+                return None
+
+        if not parameters:
+            return {}
+
+        if schema_name:
+            function_name = f"{schema_name}.{function_name}"
+        sql_list = []
+        for key, body in parameters.items():
+            key = str(key).replace("'", "''")
+            sql_list.append(f"SELECT '{key}'::text AS key, {function_name}({body}) AS json_result")
+        sql = "\nUNION ALL\n".join(sql_list) + ";"
+        if log_sql:
+            self.log_info(sql, stack_level_increase=1)
+
+        # Don't show exception. Caller can execute functions one by one
+        rows = self.dao.get_rows(sql, commit)
+        last_error = self.dao.last_error
+        if manage_result:
+            self.last_error = last_error
+        if last_error:
+            self.log_warning(f"Function error: {function_name}", parameter=last_error)
+            return None
+
+        json_results = {}
+        for row in rows:
+            json_result = row['json_result']
+            if not json_result:
+                continue
+            if manage_result:
+                self.manage_json_result(json_result, sql)
+            json_results[row['key']] = json_result
+
+        return json_results
+
+
+    def manage_json_result(self, json_result, sql=None):
+        """ Show exception of failed @json_result, otherwise manage its options for layers """
+
+        if 'status' in json_result and json_result['status'] == 'Failed':
+            self.manage_exception_api(json_result, sql)
+        else:
+            self.layer_manager(json_result)
+
+
     def translate_tooltip(self, context_name, widget, idx=None):
         """ Translate tooltips widgets of the form to current language
             If we find a translation, it will be put
@@ -1028,24 +1178,26 @@ class DaoController(object):
 
 
     def get_layer_by_tablename(self, tablename, show_warning=False, log_info=False, schema_name = None):
-        """ Iterate over all layers and get the one with selected @tablename """
+        """ Get layer with selected @tablename. If there are more than one, get the first one listed in TOC """
 
         # Check if we have any layer loaded
-        layers = self.get_layers()
-        if len(layers) == 0:
+        layer_index = self.get_layer_index()
+        if len(layer_index) == 0:
             return None
 
-        # Iterate over all layers
         layer = None
         if schema_name is None:
             schema_name = QgsExpressionContextUtils.projectScope(QgsProject.instance()).variable('gwMainSchema')
 
-        for cur_layer in layers:
-            uri_table = self.get_layer_source_table_name(cur_layer)
-            table_schema = self.get_layer_schema(cur_layer)
-            if (uri_table is not None and uri_table == tablename) and schema_name in ('', None, table_schema):
-                layer = cur_layer
-                break
+        # Only layers listed in TOC are considered
+        root = QgsProject.instance().layerTreeRoot()
+        layers = [cur_layer for cur_layer, table_schema in layer_index.get(tablename, {}).values()
+                  if schema_name in ('', None, table_schema) and root.findLayer(cur_layer.id())]
+        if len(layers) > 1:
+            toc_order = {cur_layer.id(): i for i, cur_layer in enumerate(self.get_layers())}
+            layers.sort(key=lambda cur_layer: toc_order.get(cur_layer.id(), len(toc_order)))
+        if layers:
+            layer = layers[0]
 
         if layer is None and show_warning:
             self.show_warning("Layer not found", parameter=tablename)
@@ -1056,6 +1208,67 @@ class DaoController(object):
         return layer
 
 
+    def get_layer_index(self):
+        """ Get index of project layers: {tablename: {layer_id: (layer, schema_name)}}.
+            It is built on first use and kept updated listening to QgsProject signals """
+
+        if self.layer_index is None:
+            self.layer_index = {}
+            self.layer_index_tables = {}
+            for layer in QgsProject.instance().mapLayers().values():
+                self.add_layer_to_index(layer)
+            QgsProject.instance().layersAdded.connect(self.add_layers_to_index)
+            QgsProject.instance().layerWillBeRemoved.connect(self.remove_layer_from_index)
+
+        return self.layer_index
+
+
+    def reset_layer_index(self):
+        """ Remove layer index and identify indexes and stop listening to QgsProject signals """
+
+        if self.layer_index is not None:
+            try:
+                QgsProject.instance().layersAdded.disconnect(self.add_layers_to_index)
+                QgsProject.instance().layerWillBeRemoved.disconnect(self.remove_layer_from_index)
+            except TypeError:
+                pass
+        self.layer_index = None
+        self.layer_index_tables = {}
+        self.layer_sources = {}
+        if self.identify_engine is not None:
+            self.identify_engine.reset()
+            self.identify_engine = None
+
+
+    def add_layers_to_index(self, layers):
+
+        for layer in layers:
+            self.add_layer_to_index(layer)
+
+
+    def add_layer_to_index(self, layer):
+
+        tablename = self.get_layer_source_table_name(layer)
+        if tablename is None:
+            return
+
+        self.layer_index.setdefault(tablename, {})[layer.id()] = (layer, self.get_layer_schema(layer))
+        self.layer_index_tables[layer.id()] = tablename
+
+
+    def remove_layer_from_index(self, layer_id):
+
+        self.layer_sources.pop(layer_id, None)
+        tablename = self.layer_index_tables.pop(layer_id, None)
+        if tablename is None:
+            return
+
+        layers = self.layer_index.get(tablename, {})
+        layers.pop(layer_id, None)
+        if not layers:
+            self.layer_index.pop(tablename, None)
+
+
     def get_layer_source(self, layer):
         """ Get database connection paramaters of @layer """
 
@@ -1072,6 +1285,12 @@ class DaoController(object):
         # Get dbname, host, port, user and password
         uri = layer.dataProvider().dataSourceUri()
 
+        # Parse uri only if it has changed since last call. Cache is cleared when layer is removed
+        self.get_layer_index()
+        cached = self.layer_sources.get(layer.id())
+        if cached and cached[0] == uri:
+            return dict(cached[1])
+
         try:
             # Split 'uri' with quoted substrings preservation
             splt = shlex.split(uri)
@@ -1080,6 +1299,7 @@ class DaoController(object):
             splt_dct['schema'], splt_dct['table'] = splt_dct['table'].split('.')
             for key in layer_source.keys():
                 layer_source[key] = splt_dct.get(key)
+            self.layer_sources[layer.id()] = (uri, dict(layer_source))
         except Exception as e:
             msg = f"get_layer_source exception in layer '{layer.name()}': {str(e)}"
             self.log_warning(msg)
@@ -1409,20 +1629,66 @@ class DaoController(object):
 
 
     def check_function(self, function_name, schema_name=None, commit=True):
-        """ Check if @function_name exists in selected schema """
+        """ Check if @function_name exists in selected schema. Database is only queried on a cache miss """
 
         if schema_name is None:
             schema_name = self.schema_name
 
         schema_name = schema_name.replace('"', '')
+        routines = self.routines.get(schema_name)
+        if routines is None:
+            routines = self.load_routines_cache(schema_name, commit)
+
+        if function_name in routines:
+            self.routines_hits += 1
+            return [function_name]
+
+        # Function may have been created after the cache was loaded
+        self.routines_misses += 1
         sql = ("SELECT routine_name FROM information_schema.routines "
                "WHERE lower(routine_schema) = %s "
                "AND lower(routine_name) = %s ")
         params = [schema_name, function_name]
         row = self.get_row(sql, params=params, commit=commit)
+        if row:
+            routines.add(function_name)
         return row
 
 
+    def load_routines_cache(self, schema_name=None, commit=True):
+        """ Load names of all routines of selected schema into cache with one query """
+
+        if schema_name is None:
+            schema_name = self.schema_name
+
+        schema_name = schema_name.replace('"', '')
+        sql = ("SELECT DISTINCT(lower(routine_name)) FROM information_schema.routines "
+               "WHERE lower(routine_schema) = %s")
+        params = [schema_name]
+        rows = self.get_rows(sql, params=params, commit=commit, log_info=False)
+        routines = set()
+        if rows:
+            routines = set(row[0] for row in rows)
+        self.routines[schema_name] = routines
+        return routines
+
+
+    def reset_routines_cache(self, schema_name=None):
+        """ Remove routines of @schema_name (or all of them) from cache """
+
+        if schema_name is None:
+            self.routines = {}
+        else:
+            self.routines.pop(schema_name.replace('"', ''), None)
+
+
+    def get_routines_cache_stats(self):
+        """ Get hits and misses of routines cache """
+
+        return {'hits': self.routines_hits, 'misses': self.routines_misses,
+                'schemas': {schema: len(routines) for schema, routines in self.routines.items()}}
+
+
     def check_table(self, tablename, schemaname=None):
         """ Check if selected table exists in selected schema """
 
@@ -0,0 +1,71 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import tempfile
+
+
+class CopyWriter(object):
+    """ Incremental writer of rows loaded into a temp_csv like table with COPY FROM STDIN (text format).
+        Rows are spooled to a temporary file because the number of columns is only known at the end """
+
+    def __init__(self, fid, min_columns=0, max_size=8 * 1024 * 1024):
+
+        self.fid = fid
+        self.stream = tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+', encoding='utf8', newline='\n')
+        self.rows = 0
+        self.columns = min_columns
+        self.lines = None
+
+
+    def write_fields(self, source, fields):
+        """ Write row with @source and already escaped @fields (csv1...csvN) """
+
+        self.stream.write(f"{self.fid}\t{source}\t" + '\t'.join(fields) + '\n')
+        self.columns = max(self.columns, len(fields))
+        self.rows += 1
+
+
+    def copy_value(self, value):
+        """ Escape @value for COPY text format. Empty string is loaded as NULL, as INSERT with $$$$ replaced by null """
+
+        if value in ('', None):
+            return '\\N'
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\r', '\\r').replace('\n', '\\n')
+
+
+    def get_copy_sql(self, tablename='temp_csv'):
+        """ Get COPY statement filling columns fid, source, csv1...csvN """
+
+        columns = ['fid', 'source'] + [f'csv{x + 1}' for x in range(self.columns)]
+        return f"COPY {tablename} ({', '.join(columns)}) FROM STDIN"
+
+
+    def rewind(self):
+        """ Prepare to be read by cursor.copy_expert """
+
+        self.stream.seek(0)
+        self.lines = iter(self.stream)
+
+
+    def read(self, size=-1):
+        """ File-like interface used by cursor.copy_expert. Returns one row per call padded to all columns """
+
+        line = next(self.lines, '')
+        if line == '':
+            return ''
+
+        padding = self.columns - (line.count('\t') - 1)
+        return line[:-1] + '\t\\N' * padding + '\n'
+
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+    def close(self):
+        self.stream.close()
+
@@ -0,0 +1,124 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import re
+
+
+class LayerConfigCache(object):
+    """ Local cache of the layer fields configuration returned by gw_fct_getinfofromid.
+        One file per connection (host, port, database and user), schema, project version and info type,
+        stored in the user 'cache' folder. Each file keeps a stamp of the tables read to build the fields
+        (form configuration, values of combos and catalogs) used to check if it is still valid """
+
+    # Tables of the schema included in the stamp: names and LIKE patterns. Missing tables are skipped
+    stamp_tables = ('config_form_fields', 'sys_feature_cat', 'exploitation', 'macroexploitation', 'sector',
+                    'macrosector', 'dma', 'macrodma', 'presszone', 'dqa', 'ext_municipality')
+    stamp_patterns = ('%typevalue', 'cat\\_%', 'value\\_%')
+
+    def __init__(self, controller):
+
+        self.controller = controller
+        main_folder = os.path.join(os.path.expanduser("~"), self.controller.plugin_name)
+        self.cache_folder = main_folder + os.sep + "cache" + os.sep
+
+
+    def get_filepath(self, schema_name, version, info_type):
+
+        filename = f"layer_config_{self.get_connection_key()}_{schema_name}_{version}_{info_type}"
+        filename = re.sub(r'[^\w\-.]', '_', filename)
+        return self.cache_folder + filename + ".json"
+
+
+    def get_connection_key(self):
+        """ Get host, port, database and user of current connection, so databases don't share cache files """
+
+        try:
+            params = self.controller.dao.conn.get_dsn_parameters()
+        except Exception:
+            params = {}
+
+        return '_'.join(str(params.get(key, '')) for key in ('host', 'port', 'dbname', 'user'))
+
+
+    def get_stamp(self, schema_name):
+        """ Get stamp of current content of the tables read to build the fields of the forms.
+            Executed in background tasks, so database errors are only logged """
+
+        tables = ', '.join(f"'{table}'" for table in self.stamp_tables)
+        patterns = ', '.join(f"'{pattern}'" for pattern in self.stamp_patterns)
+        sql = (f"SELECT table_name FROM information_schema.tables "
+               f"WHERE table_schema = '{schema_name}' AND table_type = 'BASE TABLE' "
+               f"AND (table_name IN ({tables}) OR table_name LIKE ANY (ARRAY[{patterns}])) "
+               f"ORDER BY table_name")
+        rows = self.controller.dao.get_rows(sql, commit=True)
+        if not rows:
+            self.log_stamp_error(sql)
+            return None
+
+        # Signature of each table: number of rows and last transaction that inserted or updated any of them.
+        # Rows are not read as text, so geometries and other large values are not fetched
+        sql_list = []
+        for row in rows:
+            sql_list.append(f"SELECT '{row[0]}'::text, count(*) || ':' || coalesce(max(t.xmin::text::bigint), 0) "
+                            f"FROM {schema_name}.\"{row[0]}\" t")
+        sql = "\nUNION ALL\n".join(sql_list)
+        rows = self.controller.dao.get_rows(sql, commit=True)
+        if not rows:
+            self.log_stamp_error(sql)
+            return None
+
+        stamps = ','.join(f"{row[0]}:{row[1]}" for row in sorted(rows))
+        return hashlib.md5(stamps.encode('utf8')).hexdigest()
+
+
+    def log_stamp_error(self, sql):
+
+        error = self.controller.dao.last_error
+        if error:
+            self.controller.log_warning(f"Error getting layer config stamp: {error}", parameter=sql)
+
+
+    def load(self, schema_name, version, info_type):
+        """ Get cached configuration: {'stamp': stamp, 'layers': {layer_name: fields}} """
+
+        filepath = self.get_filepath(schema_name, version, info_type)
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            with open(filepath, 'r', encoding='utf8') as f:
+                cache = json.load(f)
+            if 'stamp' not in cache or 'layers' not in cache:
+                return None
+            return cache
+        except Exception as e:
+            self.controller.log_warning(f"Error reading layer config cache: {e}", parameter=filepath)
+            return None
+
+
+    def save(self, schema_name, version, info_type, stamp, layers):
+        """ Save configuration of @layers ({layer_name: fields}) """
+
+        if stamp is None:
+            return False
+
+        filepath = self.get_filepath(schema_name, version, info_type)
+        try:
+            if not os.path.exists(self.cache_folder):
+                os.makedirs(self.cache_folder)
+            # Write to a temporary file first so a partial file is never read
+            with open(filepath + ".tmp", 'w', encoding='utf8') as f:
+                json.dump({'stamp': stamp, 'layers': layers}, f)
+            os.replace(filepath + ".tmp", filepath)
+            return True
+        except Exception as e:
+            self.controller.log_warning(f"Error writing layer config cache: {e}", parameter=filepath)
+            return False
+
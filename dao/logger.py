@@ -6,15 +6,17 @@ or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
 import logging
-import inspect
+import logging.handlers
 import os
+import queue
+import sys
 import time
 
 
 class Logger(object):
 
     def __init__(self, controller, log_name, log_level, log_suffix,
-                 folder_has_tstamp=False, file_has_tstamp=True, remove_previous=False):
+                 folder_has_tstamp=False, file_has_tstamp=True, remove_previous=False, use_queue=False):
         """ Class constructor """
 
         # Create logger
@@ -48,10 +50,19 @@ class Logger(object):
         log_date = '%d/%m/%Y %H:%M:%S'
         formatter = logging.Formatter(log_format, log_date)
 
-        # Create file handler
+        # Create file handler. If @use_queue, records are written to file by a background thread
         self.fh = logging.FileHandler(filepath)
         self.fh.setFormatter(formatter)
-        self.logger_file.addHandler(self.fh)
+        self.qh = None
+        self.listener = None
+        if use_queue:
+            log_queue = queue.SimpleQueue()
+            self.qh = logging.handlers.QueueHandler(log_queue)
+            self.listener = logging.handlers.QueueListener(log_queue, self.fh)
+            self.listener.start()
+            self.logger_file.addHandler(self.qh)
+        else:
+            self.logger_file.addHandler(self.fh)
 
         # Initialize number of errors in current process
         self.num_errors = 0
@@ -61,7 +72,11 @@ class Logger(object):
         """ Close logger file """
 
         try:
-            self.logger_file.removeHandler(self.fh)
+            if self.listener:
+                self.logger_file.removeHandler(self.qh)
+                self.listener.stop()
+            else:
+                self.logger_file.removeHandler(self.fh)
             self.fh.flush()
             self.fh.close()
             del self.fh
@@ -73,15 +88,18 @@ class Logger(object):
         """ Logger message into logger file with selected level """
 
         try:
-            module_path = inspect.stack()[stack_level][1]
-            file_name = os.path.basename(module_path)
-            function_line = inspect.stack()[stack_level][2]
-            function_name = inspect.stack()[stack_level][3]
-            header = "{" + file_name + " | Line " + str(function_line) + " (" + str(function_name) + ")}"
-            text = header
+            if not self.logger_file.isEnabledFor(log_level):
+                return
+
+            # Get caller frame without building the whole stack. Message is formatted by the handler
+            frame = sys._getframe(stack_level)
+            file_name = os.path.basename(frame.f_code.co_filename)
+            text = "{%s | Line %s (%s)}"
+            args = [file_name, frame.f_lineno, frame.f_code.co_name]
             if msg:
-                text += "\n" + str(msg)
-            self.logger_file.log(log_level, text)
+                text += "\n%s"
+                args.append(msg)
+            self.logger_file.log(log_level, text, *args)
 
         except Exception as e:
             self.controller.log_warning("Error logging: " + str(e), logger_file=False)
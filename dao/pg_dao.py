@@ -7,15 +7,113 @@ or (at your option) any later version.
 # -*- coding: utf-8 -*-
 import psycopg2
 import psycopg2.extras
+import threading
+
+from contextlib import contextmanager
+
+from .pg_pool import PgPool
 
 
 class PgDao(object):
 
-    def __init__(self):
+    def __init__(self, pool_size=4):
 
+        # Connection, cursor and last error of threads with a leased connection
+        self.local = threading.local()
+        self.main_conn = None
+        self.main_cursor = None
+        self.main_error = None
         self.last_error = None
         self.set_search_path = None
         self.conn = None
+        self.cursor = None
+        self.pool = None
+        self.pool_size = pool_size
+        self.listen_conn = None
+
+
+    @property
+    def conn(self):
+        return getattr(self.local, 'conn', None) or self.main_conn
+
+
+    @conn.setter
+    def conn(self, conn):
+        if getattr(self.local, 'conn', None):
+            self.local.conn = conn
+        else:
+            self.main_conn = conn
+
+
+    @property
+    def cursor(self):
+        return getattr(self.local, 'cursor', None) or self.main_cursor
+
+
+    @cursor.setter
+    def cursor(self, cursor):
+        if getattr(self.local, 'cursor', None):
+            self.local.cursor = cursor
+        else:
+            self.main_cursor = cursor
+
+
+    @property
+    def last_error(self):
+        if getattr(self.local, 'conn', None):
+            return getattr(self.local, 'last_error', None)
+        return self.main_error
+
+
+    @last_error.setter
+    def last_error(self, error):
+        if getattr(self.local, 'conn', None):
+            self.local.last_error = error
+        else:
+            self.main_error = error
+
+
+    def get_pool(self):
+
+        if self.pool is None or self.pool.closed:
+            self.pool = PgPool(self, self.pool_size)
+        return self.pool
+
+
+    @contextmanager
+    def lease(self):
+        """ Use a connection of the pool for all the queries of current thread inside this block.
+            Intended for background tasks, so they don't share the connection of the UI thread """
+
+        if getattr(self.local, 'conn', None):
+            # Nested lease: keep using current connection
+            yield self.local.conn
+            return
+
+        pool = self.get_pool()
+        conn = pool.lease()
+        self.local.conn = conn
+        self.local.cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        self.local.last_error = None
+        try:
+            yield conn
+        finally:
+            try:
+                self.local.cursor.close()
+            except Exception:
+                pass
+            # Connection may have been replaced by reset_db
+            conn = self.local.conn or conn
+            self.local.conn = None
+            self.local.cursor = None
+            pool.release(conn)
+
+
+    def get_pool_stats(self):
+
+        if self.pool is None:
+            return None
+        return self.pool.get_stats()
 
 
     def init_db(self):
@@ -41,8 +139,11 @@ class PgDao(object):
                 self.cursor.close()
             if self.conn:
                 self.conn.close()
-            del self.cursor
-            del self.conn
+            self.cursor = None
+            self.conn = None
+            if self.pool and not getattr(self.local, 'conn', None):
+                self.pool.close()
+            self.close_listen_conn()
         except Exception as e:
             self.last_error = e
             status = False
@@ -76,21 +177,56 @@ class PgDao(object):
             self.cursor.execute(sql)
 
 
+    def get_listen_conn(self):
+        """ Get dedicated connection for LISTEN/NOTIFY, so notifications are not consumed nor
+            delayed by the queries executed in the connection of the UI thread """
+
+        if self.listen_conn is None or self.listen_conn.closed:
+            self.listen_conn = psycopg2.connect(self.conn_string)
+            self.listen_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return self.listen_conn
+
+
+    def close_listen_conn(self):
+
+        if self.listen_conn:
+            try:
+                self.listen_conn.close()
+            except Exception:
+                pass
+        self.listen_conn = None
+
+
+    def listen(self, channels, command='LISTEN'):
+        """ Execute @command (LISTEN or UNLISTEN) of @channels in the dedicated connection """
+
+        self.last_error = None
+        status = True
+        try:
+            conn = self.get_listen_conn()
+            with conn.cursor() as cursor:
+                for channel in channels:
+                    cursor.execute(f'{command} "{channel}";')
+        except Exception as e:
+            self.last_error = e
+            self.close_listen_conn()
+            status = False
+
+        return status
+
+
     def get_poll(self):
+        """ Read pending notifications of the dedicated connection into its attribute 'notifies' """
 
         status = True
         try:
-            if self.check_cursor():
-                self.conn.poll()
-            else:
-                status = False
-        except psycopg2.InterfaceError:
-            self.reset_db()
-        except psycopg2.OperationalError:
-            self.reset_db()
-        finally:
-            status = not self.cursor.closed
-            return status
+            self.get_listen_conn().poll()
+        except (psycopg2.InterfaceError, psycopg2.OperationalError) as e:
+            self.last_error = e
+            self.close_listen_conn()
+            status = False
+
+        return status
 
 
     def get_conn_encoding(self):
@@ -154,6 +290,39 @@ class PgDao(object):
             return rows
 
 
+    def get_rows_chunks(self, sql, size=5000, commit=False, name='gw_chunks'):
+        """ Get rows of selected query in lists of @size rows using a server-side (named) cursor """
+
+        self.last_error = None
+        cursor = None
+        finished = False
+        try:
+            self.check_cursor()
+            cursor = self.conn.cursor(name=name, cursor_factory=psycopg2.extras.DictCursor)
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+            finished = True
+            if commit:
+                self.commit()
+        except Exception as e:
+            self.last_error = e
+        finally:
+            # Iteration stopped by the caller or failed
+            if not finished:
+                try:
+                    if cursor and not cursor.closed:
+                        cursor.close()
+                    if commit:
+                        self.rollback()
+                except Exception:
+                    pass
+
+
     def get_row(self, sql, commit=False):
         """ Get single row from selected query """
 
@@ -251,13 +420,17 @@ class PgDao(object):
         self.conn.rollback()
 
 
-    def copy_expert(self, sql, csv_file):
-        """ Dumps contents of the query to selected CSV file """
+    def copy_expert(self, sql, csv_file, commit=False):
+        """ Execute COPY statement @sql reading from or writing to selected @csv_file """
 
         try:
             self.cursor.copy_expert(sql, csv_file)
+            if commit:
+                self.commit()
             return None
         except Exception as e:
+            if commit:
+                self.rollback()
             return e
 
 
@@ -0,0 +1,137 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import psycopg2
+import psycopg2.extensions
+import threading
+import time
+
+
+class PgPool(object):
+    """ Thread-safe pool of database connections leased to background threads (QgsTask workers) """
+
+    def __init__(self, dao, max_size=4, timeout=60):
+        """
+        :param dao: PgDao that provides connection string and search_path (PgDao)
+        :param max_size: Maximum number of connections opened by the pool (int)
+        :param timeout: Seconds to wait for a free connection when all of them are leased (int)
+        """
+
+        self.dao = dao
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle = []
+        self.leased = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        self.stats = {'created': 0, 'leases': 0, 'waits': 0, 'wait_time': 0.0, 'discarded': 0}
+
+
+    def lease(self):
+        """ Get a connection for exclusive use of current thread. Its search_path is set again """
+
+        with self.condition:
+            if self.closed:
+                raise psycopg2.InterfaceError("Connection pool is closed")
+
+            time_start = None
+            while not self.idle and self.leased >= self.max_size:
+                if time_start is None:
+                    time_start = time.time()
+                    self.stats['waits'] += 1
+                remaining = self.timeout - (time.time() - time_start)
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    raise psycopg2.OperationalError("Timeout waiting for a free database connection")
+            if time_start is not None:
+                self.stats['wait_time'] += time.time() - time_start
+
+            conn = self.idle.pop() if self.idle else None
+            # Count it as leased while connecting outside the lock
+            self.leased += 1
+
+        try:
+            if conn is None or conn.closed:
+                conn = self.connect()
+            self.set_search_path(conn)
+        except Exception:
+            with self.condition:
+                self.leased -= 1
+                self.condition.notify()
+            if conn is not None:
+                self.close_conn(conn)
+            raise
+
+        with self.condition:
+            self.stats['leases'] += 1
+
+        return conn
+
+
+    def release(self, conn):
+        """ Return leased @conn to the pool. Pending transaction is rolled back """
+
+        with self.condition:
+            self.leased -= 1
+            reuse = not self.closed and not conn.closed
+            if reuse:
+                try:
+                    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                except Exception:
+                    reuse = False
+            if reuse:
+                self.idle.append(conn)
+            else:
+                self.stats['discarded'] += 1
+                self.close_conn(conn)
+            self.condition.notify()
+
+
+    def connect(self):
+
+        conn = psycopg2.connect(self.dao.conn_string)
+        with self.condition:
+            self.stats['created'] += 1
+        return conn
+
+
+    def set_search_path(self, conn):
+
+        if self.dao.set_search_path:
+            with conn.cursor() as cursor:
+                cursor.execute(self.dao.set_search_path)
+            conn.commit()
+
+
+    def close_conn(self, conn):
+
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+    def close(self):
+        """ Close idle connections. Leased ones are closed when released """
+
+        with self.condition:
+            self.closed = True
+            for conn in self.idle:
+                self.close_conn(conn)
+            self.idle = []
+            self.condition.notify_all()
+
+
+    def get_stats(self):
+
+        with self.condition:
+            stats = dict(self.stats)
+            stats['idle'] = len(self.idle)
+            stats['leased'] = self.leased
+            stats['max_size'] = self.max_size
+        return stats
+
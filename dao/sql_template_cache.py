@@ -0,0 +1,127 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import os
+import re
+import threading
+
+
+RE_PLACEHOLDER = re.compile(r'(SCHEMA_NAME|SRID_VALUE)')
+RE_SQL_TOKEN = re.compile(r"""
+    (?<![\w$])[Ee]'(?:[^'\\]|\\.|'')*'    # escape string literal (backslash escapes quote)
+    |'(?:[^']|'')*'                       # string literal
+    |"(?:[^"]|"")*"                       # quoted identifier
+    |--[^\n]*                             # line comment
+    |/\*.*?\*/                            # block comment
+    |(?P<dollar>\$(?:[A-Za-z_]\w*)?\$)    # start of dollar quoted string (function bodies)
+    |(?P<semicolon>;)
+""", re.S | re.X)
+
+
+class SqlTemplate(object):
+    """ SQL file split in chunks of complete statements. Each chunk is kept as a list of parts where
+        odd items are the placeholders, so values are substituted in a single pass """
+
+    def __init__(self, filepath, mtime, size, chunks):
+
+        self.filepath = filepath
+        self.mtime = mtime
+        self.size = size
+        self.chunks = chunks
+        self.placeholders = {part for chunk in chunks for part in chunk[1::2]}
+
+
+    def render(self, values):
+        """ Yield SQL of every chunk with placeholders replaced by @values """
+
+        for chunk in self.chunks:
+            parts = list(chunk)
+            parts[1::2] = [values.get(placeholder, placeholder) for placeholder in chunk[1::2]]
+            yield ''.join(parts)
+
+
+class SqlTemplateCache(object):
+    """ SQL files of folder 'sql' read and tokenized once per session.
+        A file is read again if its modification time or size have changed """
+
+    def __init__(self, chunk_size=256 * 1024):
+        """
+        :param chunk_size: Approximate size of the chunks sent to the server. Statements are never split (int)
+        """
+
+        self.chunk_size = chunk_size
+        self.templates = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    def get_template(self, filepath):
+
+        stat = os.stat(filepath)
+        with self.lock:
+            template = self.templates.get(filepath)
+            if template and template.mtime == stat.st_mtime_ns and template.size == stat.st_size:
+                self.hits += 1
+                return template
+
+        with open(filepath, 'r', encoding="utf8") as f:
+            text = f.read()
+        chunks = [RE_PLACEHOLDER.split(chunk) for chunk in self.split_chunks(text)]
+        template = SqlTemplate(filepath, stat.st_mtime_ns, stat.st_size, chunks)
+        with self.lock:
+            self.misses += 1
+            self.templates[filepath] = template
+
+        return template
+
+
+    def render(self, filepath, schema_name, project_epsg):
+        """ Yield SQL chunks of @filepath with SCHEMA_NAME and SRID_VALUE replaced """
+
+        values = {'SCHEMA_NAME': schema_name, 'SRID_VALUE': str(project_epsg)}
+        return self.get_template(filepath).render(values)
+
+
+    def split_chunks(self, text):
+        """ Split @text in chunks of about chunk_size characters ending at the end of a statement """
+
+        chunks = []
+        start = 0
+        pos = 0
+        length = len(text)
+        while pos < length:
+            match = RE_SQL_TOKEN.search(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+            if match.group('dollar'):
+                # Skip function body until closing tag
+                end = text.find(match.group('dollar'), pos)
+                pos = length if end == -1 else end + len(match.group('dollar'))
+            elif match.group('semicolon') and pos - start >= self.chunk_size:
+                chunks.append(text[start:pos])
+                start = pos
+
+        if text[start:].strip():
+            chunks.append(text[start:])
+
+        return chunks
+
+
+    def reset(self):
+
+        with self.lock:
+            self.templates = {}
+
+
+    def get_stats(self):
+
+        with self.lock:
+            size = sum(template.size for template in self.templates.values())
+            return {'files': len(self.templates), 'size': size, 'hits': self.hits, 'misses': self.misses}
+
@@ -125,6 +125,79 @@ class Table(object):
         return True
 
 
+    def bulk_insert(self, rows, fields=None, chunk_size=5000, commit=True):
+        """Insert all @rows (list of dicts field: value) in a single statement per @chunk_size rows.
+        Primary key is not sent, so its value is taken from the table sequence.
+        Return the list of new primary key values or None if any error."""
+
+        if not rows:
+            return []
+
+        if fields is None:
+            fields = [x for x in self.field_names() if x != self.pk()]
+
+        pks = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            sql = "INSERT INTO {0} ({1}) VALUES {2} RETURNING {3}".format(
+                self.table_name(), ", ".join(fields), ", ".join(["%s"] * len(chunk)), self.pk())
+            params = [tuple(self.bulk_value(row.get(field)) for field in fields) for row in chunk]
+            result = self.controller().get_rows(sql, commit=commit, params=params)
+            if result is None:
+                return None
+            pks.extend(row[0] for row in result)
+
+        return pks
+
+
+    def bulk_upsert(self, rows, fields=None, chunk_size=5000, commit=True):
+        """Insert or update all @rows (list of dicts field: value) in a single statement per @chunk_size rows.
+        Rows without primary key value (or negative one) get it from the table sequence.
+        Return the list of primary key values or None if any error."""
+
+        if not rows:
+            return []
+
+        if fields is None:
+            fields = [x for x in self.field_names() if x != self.pk()]
+
+        nextval = "nextval(pg_get_serial_sequence('{}', '{}'))".format(self.table_name(), self.pk())
+        row_sql = "(%s, " + ", ".join(["%s"] * len(fields)) + ")"
+        pks = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            values = []
+            params = []
+            for row in chunk:
+                pk = row.get(self.pk())
+                if pk is None or (isinstance(pk, int) and pk < 0):
+                    values.append(row_sql.replace("%s", nextval, 1))
+                else:
+                    values.append(row_sql)
+                    params.append(pk)
+                params.extend(self.bulk_value(row.get(field)) for field in fields)
+
+            sql = ("INSERT INTO {0} ({1}, {2}) VALUES {3}"
+                   " ON CONFLICT ({1}) DO UPDATE SET ({2}) = ROW({4})"
+                   " RETURNING {1}").format(
+                self.table_name(), self.pk(), ", ".join(fields), ", ".join(values),
+                ", ".join("EXCLUDED." + field for field in fields))
+            result = self.controller().get_rows(sql, commit=commit, params=params)
+            if result is None:
+                return None
+            pks.extend(row[0] for row in result)
+
+        return pks
+
+
+    def bulk_value(self, value):
+        """Convert void values to NULL as done in upsert."""
+
+        if value in (None, '', 'null', 'NULL'):
+            return None
+        return value
+
+
     def nextval(self, commit=True):
         """Get the next id for the __pk. that will be used for the next insert.
         BEWARE that this call increment the sequence at each call."""
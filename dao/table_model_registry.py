@@ -0,0 +1,92 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from qgis.PyQt.QtCore import Qt
+from qgis.PyQt.QtSql import QSqlTableModel
+
+
+class TableModelRegistry(object):
+    """ Table models of QTableView widgets and configuration of their columns.
+        A widget filled again with the same table keeps its model and only its filter is changed.
+        Models are not shared between widgets, so each dialog keeps its own filter.
+        Column configuration (table 'config_form_tableview') is read once per session """
+
+    def __init__(self, controller):
+
+        self.controller = controller
+        self.columns_config = {}
+        self.hits = 0
+        self.misses = 0
+
+
+    def get_model(self, widget, table_name, edit_strategy=QSqlTableModel.OnManualSubmit):
+        """ Get model attached to @widget if it is a model of @table_name, otherwise create a new one """
+
+        model = widget.model() if widget else None
+        if isinstance(model, QSqlTableModel) and model.tableName() == table_name \
+                and model.editStrategy() == edit_strategy:
+            self.hits += 1
+            return model
+
+        self.misses += 1
+        model = QSqlTableModel(db=self.controller.db)
+        model.setTable(table_name)
+        model.setEditStrategy(edit_strategy)
+        return model
+
+
+    def select(self, widget, table_name, filter_=None, edit_strategy=QSqlTableModel.OnManualSubmit, sort_order=None):
+        """ Set filter and sort of the model of @widget and select its rows.
+            Only first rows are fetched, next ones are fetched by the view while scrolling """
+
+        model = self.get_model(widget, table_name, edit_strategy)
+        model.setFilter(filter_ if filter_ else '')
+        if sort_order is not None:
+            model.setSort(sort_order, Qt.AscendingOrder)
+            model.setProperty('sort_order', sort_order)
+        model.select()
+
+        if widget and widget.model() is not model:
+            widget.setModel(model)
+
+        return model
+
+
+    def get_columns_config(self, table_name, manage_result=True):
+        """ Get rows of table 'config_form_tableview' related with @table_name
+        :param manage_result: Show database errors. Background tasks must set it to False: the error is left
+            in dao.last_error to be shown in the UI thread (bool)
+        """
+
+        if table_name in self.columns_config:
+            return self.columns_config[table_name]
+
+        sql = (f"SELECT columnindex, width, alias, status FROM config_form_tableview"
+               f" WHERE tablename = '{table_name}' ORDER BY columnindex")
+        if manage_result:
+            rows = self.controller.get_rows(sql, log_info=False)
+            if rows is None and self.controller.last_error:
+                return None
+        else:
+            rows = self.controller.dao.get_rows(sql, commit=True)
+            if rows is None:
+                return None
+
+        self.columns_config[table_name] = rows if rows else []
+        return self.columns_config[table_name]
+
+
+    def reset(self):
+        """ Remove cached configuration of columns """
+        self.columns_config = {}
+
+
+    def get_stats(self):
+        """ Get reused (hits) and created (misses) models """
+
+        return {'hits': self.hits, 'misses': self.misses, 'columns_config': len(self.columns_config)}
+
@@ -5,13 +5,14 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
-from qgis.core import QgsEditorWidgetSetup, QgsExpressionContextUtils, QgsFieldConstraints, QgsPointLocator, \
-    QgsProject, QgsSnappingUtils, QgsTolerance
+from qgis.core import QgsApplication, QgsEditorWidgetSetup, QgsExpressionContextUtils, QgsFieldConstraints, \
+    QgsPointLocator, QgsProject, QgsSnappingUtils, QgsTask, QgsTolerance
 from qgis.PyQt.QtCore import QObject, QPoint, QSettings, Qt
 from qgis.PyQt.QtWidgets import QAction, QActionGroup, QApplication, QDockWidget, QMenu, QToolBar, QToolButton
 from qgis.PyQt.QtGui import QCursor, QIcon, QKeySequence, QPixmap
 
 import configparser
+import importlib
 import json
 import os.path
 import sys
@@ -19,36 +20,49 @@ import webbrowser
 from collections import OrderedDict
 from functools import partial
 from json import JSONDecodeError
+from time import time
 
-from .actions.add_layer import AddLayer
-from .actions.basic import Basic
-from .actions.check_project_result import CheckProjectResult
-from .actions.edit import Edit
-from .actions.go2epa import Go2Epa
-from .actions.master import Master
-from .actions.mincut import MincutParent
-from .actions.om import Om
-from .actions.parent import ParentAction
-from .actions.tm_basic import TmBasic
-from .actions.update_sql import UpdateSQL
-from .actions.utils import Utils
 from .dao.controller import DaoController
-from .map_tools.cad_add_circle import CadAddCircle
-from .map_tools.cad_add_point import CadAddPoint
-from .map_tools.cad_api_info import CadApiInfo
-from .map_tools.change_elem_type import ChangeElemType
-from .map_tools.connec import ConnecMapTool
-from .map_tools.delete_node import DeleteNodeMapTool
-from .map_tools.dimensioning import Dimensioning
-from .map_tools.draw_profiles import DrawProfiles
-from .map_tools.flow_trace_flow_exit import FlowTraceFlowExitMapTool
-from .map_tools.move_node import MoveNodeMapTool
-from .map_tools.replace_feature import ReplaceFeatureMapTool
+from .dao.layer_config_cache import LayerConfigCache
 from .models.plugin_toolbar import PluginToolbar
 from .models.sys_feature_cat import SysFeatureCat
 from .ui_manager import DialogTextUi
 
 
+# Map tools of the actions {index_action: (module, class)}. Imported when the action is triggered for the first time
+MAP_TOOL_CLASSES = {
+    16: ('map_tools.move_node', 'MoveNodeMapTool'),
+    17: ('map_tools.delete_node', 'DeleteNodeMapTool'),
+    20: ('map_tools.connec', 'ConnecMapTool'),
+    28: ('map_tools.change_elem_type', 'ChangeElemType'),
+    37: ('map_tools.cad_api_info', 'CadApiInfo'),
+    199: ('map_tools.cad_api_info', 'CadApiInfo'),
+    39: ('map_tools.dimensioning', 'Dimensioning'),
+    43: ('map_tools.draw_profiles', 'DrawProfiles'),
+    44: ('map_tools.replace_feature', 'ReplaceFeatureMapTool'),
+    56: ('map_tools.flow_trace_flow_exit', 'FlowTraceFlowExitMapTool'),
+    57: ('map_tools.flow_trace_flow_exit', 'FlowTraceFlowExitMapTool'),
+    71: ('map_tools.cad_add_circle', 'CadAddCircle'),
+    72: ('map_tools.cad_add_point', 'CadAddPoint'),
+}
+
+# Time spent importing modules of the plugin when they are first needed {module: milliseconds}
+import_times = OrderedDict()
+
+
+def import_class(module_name, class_name):
+    """ Get class @class_name of plugin module @module_name, importing it if it is not loaded yet """
+
+    full_name = f"{__package__}.{module_name}"
+    module = sys.modules.get(full_name)
+    if module is None:
+        time_start = time()
+        module = importlib.import_module(full_name)
+        import_times[module_name] = (time() - time_start) * 1000
+
+    return getattr(module, class_name)
+
+
 class Giswater(QObject):
 
     def __init__(self, iface):
@@ -65,6 +79,7 @@ class Giswater(QObject):
         self.iface = iface
         self.actions = {}
         self.map_tools = {}
+        self.map_tool_classes = {}
         self.srid = None
         self.plugin_toolbars = {}
         self.available_layers = []
@@ -127,8 +142,16 @@ class Giswater(QObject):
             self.action = QAction("Show info", self.iface.mainWindow())
 
         self.toolButton.setDefaultAction(self.action)
-        self.update_sql = UpdateSQL(self.iface, self.settings, self.controller, self.plugin_dir)
-        self.action.triggered.connect(self.update_sql.init_sql)
+        self.action.triggered.connect(self.open_update_sql)
+
+
+    def open_update_sql(self):
+        """ Open project manager. Module 'update_sql' is imported the first time """
+
+        if self.update_sql is None:
+            UpdateSQL = import_class('actions.update_sql', 'UpdateSQL')
+            self.update_sql = UpdateSQL(self.iface, self.settings, self.controller, self.plugin_dir)
+        self.update_sql.init_sql()
 
 
     def unset_info_button(self):
@@ -344,42 +367,28 @@ class Giswater(QObject):
 
     def manage_map_tool(self, index_action, function_name):
         """ Get the action with @index_action and check if has an associated map_tool.
-            If so, add it to dictionary of available map_tools
+            If so, keep it to create the map tool when the action is triggered
         """
 
-        map_tool = None
-        action = self.actions[index_action]
-
-        # Check if the @action has an associated map_tool
-        if int(index_action) == 16:
-            map_tool = MoveNodeMapTool(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 17:
-            map_tool = DeleteNodeMapTool(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 20:
-            map_tool = ConnecMapTool(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 28:
-            map_tool = ChangeElemType(self.iface, self.settings, action, index_action)
-        elif int(index_action) in (37, 199):
-            map_tool = CadApiInfo(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 39:
-            map_tool = Dimensioning(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 43:
-            map_tool = DrawProfiles(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 44:
-            map_tool = ReplaceFeatureMapTool(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 56:
-            map_tool = FlowTraceFlowExitMapTool(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 57:
-            map_tool = FlowTraceFlowExitMapTool(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 71:
-            map_tool = CadAddCircle(self.iface, self.settings, action, index_action)
-        elif int(index_action) == 72:
-            map_tool = CadAddPoint(self.iface, self.settings, action, index_action)
-
-        # If this action has an associated map tool, add this to dictionary of available map_tools
-        if map_tool:
+        # Check if the @action has an associated map_tool. It will be created when action is triggered
+        if int(index_action) in MAP_TOOL_CLASSES:
+            self.map_tool_classes[function_name] = index_action
+
+
+    def get_map_tool(self, function_name):
+        """ Get map tool associated to action with @function_name.
+            It is created the first time, importing its module (some of them, like 'draw_profiles', are heavy) """
+
+        map_tool = self.map_tools.get(function_name)
+        if map_tool is None and function_name in self.map_tool_classes:
+            index_action = self.map_tool_classes[function_name]
+            MapTool = import_class(*MAP_TOOL_CLASSES[int(index_action)])
+            map_tool = MapTool(self.iface, self.settings, self.actions[index_action], index_action)
+            map_tool.set_controller(self.controller)
             self.map_tools[function_name] = map_tool
 
+        return map_tool
+
 
     def manage_toolbars_common(self):
         """ Manage actions of the common plugin toolbars """
@@ -636,6 +645,8 @@ class Giswater(QObject):
         self.controller.set_plugin_dir(self.plugin_dir)
         self.controller.set_qgis_settings(self.qgis_settings)
         self.controller.set_giswater(self)
+        self.layer_config_cache = LayerConfigCache(self.controller)
+        self.layer_config_task = None
 
         # Set main information button (always visible)
         self.set_info_button()
@@ -701,6 +712,9 @@ class Giswater(QObject):
         # Remove Giswater dockers
         self.remove_dockers()
 
+        # Stop listening to project layers
+        self.controller.reset_layer_index()
+
         # Save toolbar position after unload plugin
         try:
             self.save_toolbars_position()
@@ -740,6 +754,7 @@ class Giswater(QObject):
             # Reset instance attributes
             self.actions = {}
             self.map_tools = {}
+            self.map_tool_classes = {}
             self.srid = None
             self.plugin_toolbars = {}
 
@@ -865,6 +880,14 @@ class Giswater(QObject):
     def initialize_toolbars(self):
         """ Initialize toolbars """
 
+        # Modules of the toolbars are imported once a Giswater project is read
+        Basic = import_class('actions.basic', 'Basic')
+        Utils = import_class('actions.utils', 'Utils')
+        Go2Epa = import_class('actions.go2epa', 'Go2Epa')
+        Om = import_class('actions.om', 'Om')
+        Edit = import_class('actions.edit', 'Edit')
+        Master = import_class('actions.master', 'Master')
+
         self.basic = Basic(self.iface, self.settings, self.controller, self.plugin_dir)
         self.basic.set_giswater(self)
         self.utils = Utils(self.iface, self.settings, self.controller, self.plugin_dir)
@@ -908,6 +931,9 @@ class Giswater(QObject):
         # Set PostgreSQL parameter 'search_path'
         self.controller.set_search_path(layer_source['schema'])
 
+        # Load names of database functions of current schema used by get_json
+        self.controller.load_routines_cache(self.schema_name)
+
         # Check if schema exists
         self.schema_exists = self.controller.check_schema(self.schema_name)
         if not self.schema_exists:
@@ -925,6 +951,8 @@ class Giswater(QObject):
         if status is False:
             return
 
+        ParentAction = import_class('actions.parent', 'ParentAction')
+        AddLayer = import_class('actions.add_layer', 'AddLayer')
         self.parent = ParentAction(self.iface, self.settings, self.controller, self.plugin_dir)
         self.add_layer = AddLayer(self.iface, self.settings, self.controller, self.plugin_dir)
 
@@ -949,6 +977,7 @@ class Giswater(QObject):
 
         # Set custom plugin toolbars (one action class per toolbar)
         if self.project_type == 'ws':
+            MincutParent = import_class('actions.mincut', 'MincutParent')
             self.mincut = MincutParent(self.iface, self.settings, self.controller, self.plugin_dir)
 
         # Manage layers and check project
@@ -977,7 +1006,7 @@ class Giswater(QObject):
         # Set project layers with gw_fct_getinfofromid: This process takes time for user
         if self.set_qgis_layers is True:
             self.get_layers_to_config()
-            self.set_layer_config(self.available_layers)
+            self.set_layer_config_cached(self.available_layers)
 
         # Create a thread to listen selected database channels
         if self.settings.value('system_variables/use_notify').upper() == 'TRUE':
@@ -1008,6 +1037,7 @@ class Giswater(QObject):
         # Log it
         message = "Project read successfully"
         self.controller.log_info(message)
+        self.log_import_times()
 
 
     def get_buttons_to_hide(self):
@@ -1149,6 +1179,7 @@ class Giswater(QObject):
 
         if self.project_type in ('ws', 'ud'):
             QApplication.setOverrideCursor(Qt.ArrowCursor)
+            CheckProjectResult = import_class('actions.check_project_result', 'CheckProjectResult')
             self.check_project_result = CheckProjectResult(self.iface, self.settings, self.controller, self.plugin_dir)
             self.check_project_result.set_controller(self.controller)
 
@@ -1227,10 +1258,10 @@ class Giswater(QObject):
         """ Action with corresponding funcion name has been triggered """
 
         try:
-            if function_name in self.map_tools:
+            map_tool = self.get_map_tool(function_name)
+            if map_tool:
                 self.controller.check_actions(False)
                 self.controller.prev_maptool = self.iface.mapCanvas().mapTool()
-                map_tool = self.map_tools[function_name]
                 if not (map_tool == self.iface.mapCanvas().mapTool()):
                     self.iface.mapCanvas().setMapTool(map_tool)
                 else:
@@ -1242,6 +1273,16 @@ class Giswater(QObject):
 
 
 
+    def log_import_times(self):
+        """ Log time spent importing plugin modules when they were first needed """
+
+        if not import_times:
+            return
+
+        report = ', '.join(f"{module}: {milliseconds:.0f} ms" for module, milliseconds in import_times.items())
+        self.controller.log_info(f"Modules imported: {report}")
+
+
     def project_read_pl(self):
         """ Function executed when a user opens a QGIS project of type 'pl' """
 
@@ -1260,6 +1301,7 @@ class Giswater(QObject):
         """ Function executed when a user opens a QGIS project of type 'tm' """
 
         # Set actions classes (define one class per plugin toolbar)
+        TmBasic = import_class('actions.tm_basic', 'TmBasic')
         self.tm_basic = TmBasic(self.iface, self.settings, self.controller, self.plugin_dir)
         self.tm_basic.set_tree_manage(self)
 
@@ -1345,112 +1387,237 @@ class Giswater(QObject):
                     self.available_layers.append(table_name)
 
 
-    def set_read_only(self, layer, field, field_index):
-        """ Set field readOnly according to client configuration into config_api_form_fields (field 'iseditable') """
-
-        # Get layer config
-        config = layer.editFormConfig()
-        try:
-            # Set field editability
-            config.setReadOnly(field_index, not field['iseditable'])
-        except KeyError:
-            pass
-        finally:
-            # Set layer config
-            layer.setEditFormConfig(config)
-
-
     def set_layer_config(self, layers):
         """ Set layer fields configured according to client configuration.
             At the moment manage:
                 Column names as alias, combos as ValueMap, typeahead as textedit"""
 
-        msg_failed = ""
-        msg_key = ""
+        layers_config = self.get_layers_config(layers)
+        self.apply_layers_config(layers_config)
+
+        return layers_config
+
+
+    def get_layers_config(self, layers):
+        """ Get fields configuration of @layers loaded in the project: {layer_name: fields} """
+
+        layers_name = []
         for layer_name in layers:
-            layer = self.controller.get_layer_by_tablename(layer_name)
-            if not layer:
-                continue
+            if layer_name not in layers_name and self.controller.get_layer_by_tablename(layer_name):
+                layers_name.append(layer_name)
+
+        return self.fetch_layers_config(layers_name)
+
+
+    def fetch_layers_config(self, layers_name):
+        """ Get fields configuration of @layers_name from database: {layer_name: fields} """
 
+        # Get configuration of all layers with one query. If it fails, get it layer by layer
+        parameters = self.get_layers_config_parameters(layers_name)
+        results = self.controller.get_json_batch('gw_fct_getinfofromid', parameters)
+        if results is None:
+            results = {}
+            for layer_name, body in parameters.items():
+                results[layer_name] = self.controller.get_json('gw_fct_getinfofromid', body)
+
+        return self.get_layers_config_from_results(layers_name, results)
+
+
+    def get_layers_config_parameters(self, layers_name):
+        """ Get body of gw_fct_getinfofromid for each layer of @layers_name: {layer_name: body} """
+
+        parameters = OrderedDict()
+        for layer_name in layers_name:
             feature = '"tableName":"' + str(layer_name) + '", "id":"", "isLayer":true'
             extras = f'"infoType":"{self.qgis_project_infotype}"'
-            body = self.create_body(feature=feature, extras=extras)
-            complet_result = self.controller.get_json('gw_fct_getinfofromid', body)
+            parameters[layer_name] = self.create_body(feature=feature, extras=extras)
+
+        return parameters
+
+
+    def get_layers_config_from_results(self, layers_name, results):
+        """ Get fields of each layer of @layers_name from @results of gw_fct_getinfofromid: {layer_name: fields} """
+
+        layers_config = OrderedDict()
+        for layer_name in layers_name:
+            complet_result = results.get(layer_name)
             if not complet_result:
                 continue
+            try:
+                layers_config[layer_name] = complet_result['body']['data']['fields']
+            except KeyError:
+                self.controller.log_warning("Key on returned json from ddbb is missed", parameter=layer_name)
+
+        return layers_config
+
+
+    def apply_layers_config(self, layers_config):
+        """ Set fields configuration of each layer of @layers_config ({layer_name: fields}) """
+
+        for layer_name, fields in layers_config.items():
+            layer = self.controller.get_layer_by_tablename(layer_name)
+            if layer:
+                self.set_layer_fields_config(layer, fields)
+
+
+    def set_layer_config_cached(self, layers):
+        """ Set layers configuration from local cache, if available, and revalidate it in the background.
+            Without cache, get configuration from database and save it when its stamp is got in the background """
 
-            for field in complet_result['body']['data']['fields']:
-                valuemap_values = {}
-
-                # Get column index
-                fieldIndex = layer.fields().indexFromName(field['columnname'])
-
-                # Hide selected fields according table config_api_form_fields.hidden
-                if 'hidden' in field:
-                    self.set_column_visibility(layer, field['columnname'], field['hidden'])
-
-                # Set alias column
-                if field['label']:
-                    layer.setFieldAlias(fieldIndex, field['label'])
-
-                # multiline
-                if field['widgettype'] == 'text':
-                    self.set_column_multiline(layer, field, fieldIndex)
-
-                if 'widgetcontrols' in field:
-
-                    # Set field constraints
-                    if field['widgetcontrols'] and 'setQgisConstraints' in field['widgetcontrols']:
-                        if field['widgetcontrols']['setQgisConstraints'] is True:
-                            layer.setFieldConstraint(fieldIndex, QgsFieldConstraints.ConstraintNotNull,
-                                                     QgsFieldConstraints.ConstraintStrengthSoft)
-                            layer.setFieldConstraint(fieldIndex, QgsFieldConstraints.ConstraintUnique,
-                                                     QgsFieldConstraints.ConstraintStrengthHard)
-
-                if 'ismandatory' in field and not field['ismandatory']:
-                    layer.setFieldConstraint(fieldIndex, QgsFieldConstraints.ConstraintNotNull,
-                                             QgsFieldConstraints.ConstraintStrengthSoft)
-                # Manage editability
-                self.set_read_only(layer, field, fieldIndex)
-
-                # Manage new values in ValueMap
-                if field['widgettype'] == 'combo':
-                    if 'comboIds' in field:
-                        # Set values
-                        for i in range(0, len(field['comboIds'])):
-                            valuemap_values[field['comboNames'][i]] = field['comboIds'][i]
-                    # Set values into valueMap
-                    editor_widget_setup = QgsEditorWidgetSetup('ValueMap', {'map': valuemap_values})
-                    layer.setEditorWidgetSetup(fieldIndex, editor_widget_setup)
-                elif field['widgettype'] == 'check':
-                    config = {'CheckedState': 'true', 'UncheckedState': 'false'}
-                    editor_widget_setup = QgsEditorWidgetSetup('CheckBox', config)
-                    layer.setEditorWidgetSetup(fieldIndex, editor_widget_setup)
-                elif field['widgettype'] == 'datetime':
-                    config = {'allow_null': True,
-                              'calendar_popup': True,
-                              'display_format': 'yyyy-MM-dd',
-                              'field_format': 'yyyy-MM-dd',
-                              'field_iso_format': False}
-                    editor_widget_setup = QgsEditorWidgetSetup('DateTime', config)
-                    layer.setEditorWidgetSetup(fieldIndex, editor_widget_setup)
-
-        if msg_failed != "":
-            self.controller.show_exceptions_msg("Execute failed.", msg_failed)
-
-        if msg_key != "":
-            self.controller.show_exceptions_msg("Key on returned json from ddbb is missed.", msg_key)
-
-
-    def set_column_visibility(self, layer, col_name, hidden):
-        """ Hide selected fields according table config_api_form_fields.hidden """
+        schema_name = self.schema_name.replace('"', '')
+        version = self.controller.get_project_version()
+        info_type = self.qgis_project_infotype
+        cache = self.layer_config_cache.load(schema_name, version, info_type)
+        if cache is None:
+            # Configuration is up to date. Stamp is got in background and saved with it
+            layers_config = self.set_layer_config(layers)
+            stamp = None
+        else:
+            # Apply cached configuration. Layers not found in cache are requested to database
+            layers_config = OrderedDict()
+            missing_layers = []
+            for layer_name in layers:
+                if layer_name in cache['layers']:
+                    layers_config[layer_name] = cache['layers'][layer_name]
+                elif layer_name not in missing_layers:
+                    missing_layers.append(layer_name)
+            self.apply_layers_config(layers_config)
+            if missing_layers:
+                layers_config.update(self.set_layer_config(missing_layers))
+            stamp = cache['stamp']
+
+        cache_key = (schema_name, version, info_type)
+        parameters = self.get_layers_config_parameters(layers_config.keys())
+        task = QgsTask.fromFunction("Revalidate layer configuration", self.revalidate_layer_config,
+                                    schema_name, stamp, parameters,
+                                    on_finished=partial(self.revalidate_layer_config_finished, cache_key,
+                                                        layers_config),
+                                    flags=QgsTask.Silent)
+        self.layer_config_task = task
+        QgsApplication.taskManager().addTask(task)
+
+
+    def revalidate_layer_config(self, task, schema_name, stamp, parameters):
+        """ Executed in a background thread. Only queries database: if configuration has changed, get responses
+            of gw_fct_getinfofromid for @parameters. They are managed in the UI thread, as they modify layers.
+            Without @stamp, configuration has just been read, so only current stamp is got """
+
+        with self.controller.dao.lease():
+            current_stamp = self.layer_config_cache.get_stamp(schema_name)
+            if current_stamp is None or stamp is None or current_stamp == stamp:
+                return current_stamp, False, None
+
+            results = self.controller.get_json_batch('gw_fct_getinfofromid', parameters, manage_result=False)
+            return current_stamp, True, results
+
+
+    def revalidate_layer_config_finished(self, cache_key, layers_config, exception, result=None):
+        """ Executed in the UI thread. Apply and save configuration if it has changed """
+
+        self.layer_config_task = None
+        if exception:
+            self.controller.log_warning(f"Error revalidating layer configuration: {exception}")
+            return
+
+        if not result:
+            return
+
+        stamp, changed, results = result
+        if changed:
+            layers_name = list(layers_config.keys())
+            if results is None:
+                # Query with all layers failed. Get configuration layer by layer
+                new_layers_config = self.fetch_layers_config(layers_name)
+            else:
+                for json_result in results.values():
+                    self.controller.manage_json_result(json_result)
+                new_layers_config = self.get_layers_config_from_results(layers_name, results)
+            changed_layers = OrderedDict((layer_name, fields) for layer_name, fields in new_layers_config.items()
+                                         if layers_config.get(layer_name) != fields)
+            self.apply_layers_config(changed_layers)
+            layers_config.update(new_layers_config)
+            self.controller.log_info(f"Layer configuration updated: {len(changed_layers)} layers")
+        schema_name, version, info_type = cache_key
+        self.layer_config_cache.save(schema_name, version, info_type, stamp, layers_config)
+
+
+    def set_layer_fields_config(self, layer, fields):
+        """ Set configuration of @fields into @layer. Form and attribute table configs are set only once """
+
+        form_config = layer.editFormConfig()
+        hidden_columns = {}
+        for field in fields:
+            valuemap_values = {}
+
+            # Get column index
+            fieldIndex = layer.fields().indexFromName(field['columnname'])
+
+            # Hide selected fields according table config_api_form_fields.hidden
+            if 'hidden' in field:
+                hidden_columns[str(field['columnname'])] = field['hidden']
+
+            # Set alias column
+            if field['label']:
+                layer.setFieldAlias(fieldIndex, field['label'])
+
+            # multiline
+            if field['widgettype'] == 'text':
+                self.set_column_multiline(layer, field, fieldIndex)
+
+            if 'widgetcontrols' in field:
+
+                # Set field constraints
+                if field['widgetcontrols'] and 'setQgisConstraints' in field['widgetcontrols']:
+                    if field['widgetcontrols']['setQgisConstraints'] is True:
+                        layer.setFieldConstraint(fieldIndex, QgsFieldConstraints.ConstraintNotNull,
+                                                 QgsFieldConstraints.ConstraintStrengthSoft)
+                        layer.setFieldConstraint(fieldIndex, QgsFieldConstraints.ConstraintUnique,
+                                                 QgsFieldConstraints.ConstraintStrengthHard)
+
+            if 'ismandatory' in field and not field['ismandatory']:
+                layer.setFieldConstraint(fieldIndex, QgsFieldConstraints.ConstraintNotNull,
+                                         QgsFieldConstraints.ConstraintStrengthSoft)
+            # Manage editability
+            if 'iseditable' in field:
+                form_config.setReadOnly(fieldIndex, not field['iseditable'])
+
+            # Manage new values in ValueMap
+            if field['widgettype'] == 'combo':
+                if 'comboIds' in field:
+                    # Set values
+                    for i in range(0, len(field['comboIds'])):
+                        valuemap_values[field['comboNames'][i]] = field['comboIds'][i]
+                # Set values into valueMap
+                editor_widget_setup = QgsEditorWidgetSetup('ValueMap', {'map': valuemap_values})
+                layer.setEditorWidgetSetup(fieldIndex, editor_widget_setup)
+            elif field['widgettype'] == 'check':
+                config = {'CheckedState': 'true', 'UncheckedState': 'false'}
+                editor_widget_setup = QgsEditorWidgetSetup('CheckBox', config)
+                layer.setEditorWidgetSetup(fieldIndex, editor_widget_setup)
+            elif field['widgettype'] == 'datetime':
+                config = {'allow_null': True,
+                          'calendar_popup': True,
+                          'display_format': 'yyyy-MM-dd',
+                          'field_format': 'yyyy-MM-dd',
+                          'field_iso_format': False}
+                editor_widget_setup = QgsEditorWidgetSetup('DateTime', config)
+                layer.setEditorWidgetSetup(fieldIndex, editor_widget_setup)
+
+        layer.setEditFormConfig(form_config)
+        if hidden_columns:
+            self.set_columns_visibility(layer, hidden_columns)
+
+
+    def set_columns_visibility(self, layer, hidden_columns):
+        """ Hide selected fields according table config_api_form_fields.hidden
+        :param hidden_columns: {column_name: hidden} (dict)
+        """
 
         config = layer.attributeTableConfig()
         columns = config.columns()
         for column in columns:
-            if column.name == str(col_name):
-                column.hidden = hidden
-                break
+            if column.name in hidden_columns:
+                column.hidden = hidden_columns[column.name]
         config.setColumns(columns)
         layer.setAttributeTableConfig(config)
 
@@ -5,24 +5,32 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 # -*- coding: utf-8 -*-
-from qgis.core import QgsFeatureRequest, QgsVectorLayer, QgsExpression
+from qgis.core import QgsApplication, QgsFeatureRequest, QgsTask, QgsVectorLayer, QgsExpression
 from qgis.gui import QgsMapToolEmitPoint
 from qgis.PyQt.QtCore import Qt, QDate
-from qgis.PyQt.QtWidgets import QListWidget, QListWidgetItem, QLineEdit, QAction
+from qgis.PyQt.QtWidgets import QListWidget, QListWidgetItem, QLineEdit, QAction, QMainWindow
 
 from functools import partial
-from decimal import Decimal
+from itertools import accumulate
 from collections import OrderedDict
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+import numpy as np
 import math
 import os
 import json
 
 from .. import utils_giswater
 from .parent import ParentMapTool
+from .profile_labels import ProfileLabels
 from ..ui_manager import Profile
 from ..ui_manager import ProfilesList
 
+# Width in points of a column of values of the guitar (three lines of fontsize 6)
+LABEL_WIDTH = 22
+
 
 class NodeData:
 
@@ -64,7 +72,7 @@ class DrawProfiles(ParentMapTool):
         self.nodes = []
         self.links = []
         self.rotation_vd_exist = False
-        self.lastnode_datatype = 'REAL'
+        self.drawing = False
 
     def activate(self):
 
@@ -129,6 +137,10 @@ class DrawProfiles(ParentMapTool):
 
     def get_profile(self):
 
+        # Profile is drawn in a worker thread
+        if self.drawing:
+            return
+
         # Clear main variables
         self.nodes.clear()
         self.links.clear()
@@ -158,19 +170,20 @@ class DrawProfiles(ParentMapTool):
         if not self.profile_json:
             return
 
-        # Execute draw profile
-        self.draw_profile(self.profile_json['body']['data']['arc'], self.profile_json['body']['data']['node'],
-                         self.profile_json['body']['data']['terrain'])
+        # Execute draw profile in a worker thread. Window is shown when finished
+        title = utils_giswater.getWidgetText(self.dlg_draw_profile, self.dlg_draw_profile.txt_title)
+        date = str(utils_giswater.getCalendarDate(self.dlg_draw_profile, self.dlg_draw_profile.date))
+        data = self.profile_json['body']['data']
+        self.drawing = True
+        self.dlg_draw_profile.btn_draw_profile.setEnabled(False)
+        task = QgsTask.fromFunction("Draw profile", self.draw_profile, data['arc'], data['node'], data['terrain'],
+                                    title, date, on_finished=self.draw_profile_finished, flags=QgsTask.Silent)
+        self.draw_task = task
+        QgsApplication.taskManager().addTask(task)
 
         # Save profile values
         self.controller.plugin_settings_set_value("minDistanceProfile", links_distance)
-        self.controller.plugin_settings_set_value("titleProfile", utils_giswater.getWidgetText(self.dlg_draw_profile,
-                                                                  self.dlg_draw_profile.txt_title))
-
-        # Maximize window (after drawing)
-        self.plot.show()
-        mng = self.plot.get_current_fig_manager()
-        mng.window.showMaximized()
+        self.controller.plugin_settings_set_value("titleProfile", title)
 
 
     def save_profile(self):
@@ -400,103 +413,147 @@ class DrawProfiles(ParentMapTool):
             self.controller.log_info(f"{type(e).__name__} --> {e}")
 
 
-    def draw_profile(self, arcs, nodes, terrains):
-        """ Parent function - Draw profiles """
-
-        # Clear plot
-        plt.gcf().clear()
+    def draw_profile(self, task, arcs, nodes, terrains, title, date):
+        """ Parent function - Draw profiles. Executed in a worker thread, return figure saved as 'profile.png' """
 
         # Set main parameters
         self.set_profile_variables(arcs, nodes, terrains)
         self.fill_profile_variables(arcs, nodes, terrains)
         self.set_guitar_parameters()
 
-        # Draw start node
-        self.draw_start_node(self.nodes[0])
-
-        # Draw nodes and precedessor arcs between start and end nodes
-        for i in range(1, self.n - 1):
-            self.draw_nodes(self.nodes[i], self.nodes[i - 1], i)
-
-        # Draw terrain
-        for i in range(1, self.t):
-
-            # define variables
-            self.first_top_x = self.links[i - 1].start_point # start_point = total_x
-            self.node_top_x = self.links[i].start_point  # start_point = total_x
-            self.first_top_y = self.links[i - 1].node_id  # node_id = top_n1
-            self.node_top_y = self.links[i - 1].geom  # geom = top_n2
-
-            # Draw terrain
-            self.draw_terrain(i)
+        # Lines are grouped by style in a line collection and texts are drawn by a single artist
+        figure = Figure(figsize=(10.4, 4.8))
+        FigureCanvasAgg(figure)
+        self.axes = figure.add_subplot(111)
+        self.lines = OrderedDict()
+        self.labels = ProfileLabels()
+        self.set_text_styles()
 
-            # Fill text terrain
-            self.fill_guitar_text_terrain(self.node_top_x, i)
-            self.draw_guitar_auxiliar_lines(self.node_top_x, first_vl=False)
-
-        # Draw last node and precedessor arc
-        self.draw_end_node(self.nodes[self.n - 1], self.nodes[self.n - 2], self.n - 1)
+        # Draw nodes, arcs and terrain
+        self.draw_nodes()
+        self.draw_terrain()
 
         # Draw guitar & grid
+        self.draw_guitar_vertical_lines(self.nodes[0].start_point)
+        self.draw_guitar_auxiliar_lines()
         self.draw_guitar_horitzontal_lines()
+        self.fill_guitar_text_legend(self.nodes[0].start_point, title, date)
+        self.fill_guitar_text_node()
+        self.fill_guitar_text_terrain()
         self.draw_grid()
 
-        # Manage layout and plot
-        self.set_profile_layout()
-        self.plot = plt
+        for (line_style, line_color, line_width, zorder), segments in self.lines.items():
+            self.axes.add_collection(LineCollection(segments, linestyles=line_style, colors=line_color,
+                                                    linewidths=line_width, zorder=zorder))
+        self.axes.add_artist(self.labels)
+        self.axes.autoscale_view()
+
+        # Manage layout
+        self.set_profile_layout(figure)
 
         # If file profile.png exist overwrite
         plugin_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
         img_path = plugin_path + os.sep + "templates" + os.sep + "profile.png"
-        fig_size = plt.rcParams["figure.figsize"]
-
-        # Set figure width to 10.4  and height to 4.8
-        fig_size[0] = 10.4
-        fig_size[1] = 4.8
-        plt.rcParams["figure.figsize"] = fig_size
 
         # Save profile with dpi = 300
-        plt.savefig(img_path, dpi=300)
+        figure.savefig(img_path, dpi=300)
 
+        return figure
 
-    def set_profile_layout(self):
-        """ Set properties of main window """
 
-        # Set window name
-        self.win = plt.gcf()
-        self.win.canvas.set_window_title('Draw Profile')
+    def draw_profile_finished(self, exception, result=None):
+        """ Executed in the UI thread. Show profile drawn in a window with matplotlib toolbar """
+
+        self.drawing = False
+        self.dlg_draw_profile.btn_draw_profile.setEnabled(True)
+        if exception or result is None:
+            self.controller.log_info(f"Profile not drawn: {exception}")
+            self.controller.show_warning("Error drawing profile", parameter=str(exception))
+            return
+
+        # Maximize window (after drawing)
+        self.plot = QMainWindow()
+        self.plot.setWindowTitle('Draw Profile')
+        canvas = FigureCanvasQTAgg(result)
+        self.plot.setCentralWidget(canvas)
+        self.plot.addToolBar(NavigationToolbar2QT(canvas, self.plot))
+        self.plot.showMaximized()
+
+
+    def set_profile_layout(self, figure):
+        """ Set properties of figure """
 
         # Hide axes
-        self.axes = plt.gca()
         self.axes.set_axis_off()
 
         # Set background color of window
-        self.fig1 = plt.figure(1)
-        self.fig1.tight_layout()
-        self.rect = self.fig1.patch
-        self.rect.set_facecolor('white')
+        figure.tight_layout()
+        figure.patch.set_facecolor('white')
+
+
+    def set_text_styles(self):
+        """ Set styles of the texts drawn by self.labels """
+
+        stylesheet = self.profile_json['body']['data']['stylesheet']
+        text = {'color': stylesheet['guitar']['text']['color'], 'fontweight': stylesheet['guitar']['text']['weight']}
+        title = {'color': stylesheet['title']['text']['color'], 'fontweight': stylesheet['title']['text']['weight']}
+        grid = {'color': stylesheet['grid']['text']['color'], 'fontweight': stylesheet['grid']['text']['weight']}
+
+        self.labels.add_style('legend', fontsize=7.5, horizontalalignment='center', **text)
+        self.labels.add_style('legend_vertical', fontsize=7.5, rotation='vertical', horizontalalignment='center',
+                              verticalalignment='center', **text)
+        self.labels.add_style('legend_row', fontsize=7.5, verticalalignment='center', **text)
+        self.labels.add_style('code', fontsize=7.5, horizontalalignment='center', verticalalignment='center', **text)
+        self.labels.add_style('value', fontsize=6, rotation='vertical', horizontalalignment='center',
+                              verticalalignment='center', **text)
+        self.labels.add_style('title', fontsize=stylesheet['title']['text']['size'], verticalalignment='center',
+                              **title)
+        self.labels.add_style('date', fontsize=stylesheet['title']['text']['size'] * 0.7,
+                              verticalalignment='center', **title)
+        self.labels.add_style('reference', fontsize=8.5, verticalalignment='center', **grid)
+        self.labels.add_style('grid_left', fontsize=7.5, horizontalalignment='right', verticalalignment='center',
+                              **grid)
+        self.labels.add_style('grid_right', fontsize=7.5, horizontalalignment='left', verticalalignment='center',
+                              **grid)
+        self.labels.add_style('grid_top', fontsize=6.5, horizontalalignment='center', **grid)
+
+
+    def add_lines(self, segments, line_style, line_color, line_width, zorder=100):
+        """ Add @segments (sequences of points) to the line collection of its style """
+
+        self.lines.setdefault((line_style, line_color, line_width, zorder), []).extend(segments)
+
+
+    def get_row_y(self, row):
+        """ Get y coordinate of @row of the guitar, in row heights below min_top_elev """
+
+        return self.min_top_elev - row * self.height_row
+
+
+    def get_vertical_segments(self, xs, rows):
+        """ Get a vertical segment for every x of @xs and pair of guitar rows (row1, row2) of @rows """
+
+        xs = np.asarray(xs, dtype=float)
+        segments = np.empty((len(xs), len(rows), 2, 2))
+        segments[..., 0] = xs[:, None, None]
+        for j, (row1, row2) in enumerate(rows):
+            segments[:, j, 0, 1] = self.get_row_y(row1)
+            segments[:, j, 1, 1] = self.get_row_y(row2)
+
+        return segments.reshape(-1, 2, 2)
+
 
-       
     def set_profile_variables(self, arcs, nodes, terrains):
         """ Get and calculate parameters and values for drawing """
 
         # Declare list elements
         self.list_of_selected_arcs = arcs
-        self.list_of_selected_nodes = []
-        self.list_of_selected_terrains = []
-
-        # Populate list nodes
-        for node in nodes:
-            self.list_of_selected_nodes.append(node)
-
-        # Populate list terrains
-        for terrain in terrains:
-            self.list_of_selected_terrains.append(terrain)
+        self.list_of_selected_nodes = list(nodes)
+        self.list_of_selected_terrains = list(terrains)
 
         self.gis_length = [0]
         self.arc_dimensions = []
         self.arc_catalog = []
-        self.start_point = [0]
 
         # Get arcs between nodes (on shortest path)
         self.n = len(self.list_of_selected_nodes)
@@ -504,22 +561,19 @@ class DrawProfiles(ParentMapTool):
 
         for arc in arcs:
             self.gis_length.append(arc['length'])
-            self.arc_dimensions.append([json.loads(arc['descript'], object_pairs_hook=OrderedDict)][0]['dimensions'])
-            self.arc_catalog.append([json.loads(arc['descript'], object_pairs_hook=OrderedDict)][0]['catalog'])
+            descript = json.loads(arc['descript'], object_pairs_hook=OrderedDict)
+            self.arc_dimensions.append(descript['dimensions'])
+            self.arc_catalog.append(descript['catalog'])
 
         # Calculate start_point (coordinates) of drawing for each node
-        n = len(self.gis_length)
-        for i in range(1, n):
-            x = self.start_point[i - 1] + self.gis_length[i]
-            self.start_point.append(x)
-            i += 1
+        self.start_point = list(accumulate(self.gis_length))
+
 
     def fill_profile_variables(self, arcs, nodes, terrains):
         """ Get parameters from data base. Fill self.nodes with parameters postgres """
 
         # Get parameters and fill the nodes
-        n = 0
-        for node in nodes:
+        for n, node in enumerate(nodes):
             parameters = NodeData()
             parameters.start_point = self.start_point[n]
             parameters.top_elev = node['top_elev']
@@ -527,32 +581,24 @@ class DrawProfiles(ParentMapTool):
             parameters.elev = node['elev']
             parameters.node_id = node['node_id']
             parameters.geom = node['cat_geom1']
-            parameters.descript = [json.loads(node['descript'], object_pairs_hook=OrderedDict)][0]
+            parameters.descript = json.loads(node['descript'], object_pairs_hook=OrderedDict)
             parameters.data_type = node['data_type']
             parameters.surface_type = node['surface_type']
-
-
             self.nodes.append(parameters)
-            n = n + 1
 
         # Get parameters and fill the links
-        n = 0
         for terrain in terrains:
             parameters = NodeData()
             parameters.start_point = terrain['total_x']
-            parameters.top_elev = [json.loads(terrain['label_n1'], object_pairs_hook=OrderedDict)][0]['top_elev']
+            parameters.descript = json.loads(terrain['label_n1'], object_pairs_hook=OrderedDict)
+            parameters.top_elev = parameters.descript['top_elev']
             parameters.node_id = terrain['top_n1']
             parameters.geom = terrain['top_n2']
-            parameters.descript = [json.loads(terrain['label_n1'], object_pairs_hook=OrderedDict)][0]
             parameters.surface_type = terrain['surface_type']
-
             self.links.append(parameters)
-            n = n + 1
-
-        n = 0
 
         # Populate node parameters with associated arcs
-        for arc in arcs:
+        for n, arc in enumerate(arcs):
             self.nodes[n].z1 = arc['z1']
             self.nodes[n].z2 = arc['z2']
             self.nodes[n].cat_geom = arc['cat_geom1']
@@ -563,66 +609,87 @@ class DrawProfiles(ParentMapTool):
             self.nodes[n].slope = 1
             self.nodes[n].node_1 = arc['node_1']
             self.nodes[n].node_2 = arc['node_2']
-            n += 1
-
-
-    def draw_start_node(self, node):
-        """ Draw first node """
-
-        # Get superior points
-        s1x = -node.geom / 2
-        s1y = node.top_elev
-        s2x = node.geom / 2
-        s2y = node.top_elev
-        s3x = node.geom / 2
-        s3y = node.top_elev - node.ymax + node.z1 + node.cat_geom
-
-        # Get inferior points
-        i1x = -node.geom / 2
-        i1y = node.top_elev - node.ymax
-        i2x = node.geom / 2
-        i2y = node.top_elev - node.ymax
-        i3x = node.geom / 2
-        i3y = node.top_elev - node.ymax + node.z1
-
-        # Create list points
-        xinf = [s1x, i1x, i2x, i3x]
-        yinf = [s1y, i1y, i2y, i3y]
-        xsup = [s1x, s2x, s3x]
-        ysup = [s1y, s2y, s3y]
-
-        # draw first node bottom line
-        plt.plot(xinf, yinf,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(node.data_type)[0],
-                 color=self.get_stylesheet(node.data_type)[1],
-                 linewidth=self.get_stylesheet(node.data_type)[2])
-
-        # draw first node upper line
-        plt.plot(xsup, ysup,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(node.data_type)[0],
-                 color=self.get_stylesheet(node.data_type)[1],
-                 linewidth=self.get_stylesheet(node.data_type)[2])
-
-        self.first_top_x = 0
-        self.first_top_y = node.top_elev
-
-        # Save last points for first node
-        self.slast = [s3x, s3y]
-        self.ilast = [i3x, i3y]
-
-        # Save last points for first node
-        self.slast2 = [s3x, s3y]
-        self.ilast2 = [i3x, i3y]
-
-        # Fill table with start node values
-        self.fill_guitar_text_node(0, 0)
-
-        # Draw header
-        self.draw_guitar_vertical_lines(node.start_point)
-        self.fill_guitar_text_legend(node.start_point)
-        self.draw_guitar_auxiliar_lines(0)
+
+
+    def draw_nodes(self):
+        """ Draw all nodes and the arcs between them. Nodes between first and last node without
+            node_1 are skipped: arc is drawn from the previous node drawn """
+
+        n = self.n
+        x = np.array([node.start_point for node in self.nodes], dtype=float)
+        geom = np.array([node.geom or 0 for node in self.nodes], dtype=float)
+        top = np.array([node.top_elev for node in self.nodes], dtype=float)
+        bottom = top - np.array([node.ymax for node in self.nodes], dtype=float)
+        left = x - geom / 2
+        right = x + geom / 2
+
+        # Values of the arc starting at every node
+        z1 = np.array([node.z1 for node in self.nodes[:-1]], dtype=float)
+        z2 = np.array([node.z2 for node in self.nodes[:-1]], dtype=float)
+        cat_geom = np.array([node.cat_geom for node in self.nodes[:-1]], dtype=float)
+
+        # Nodes drawn between start and end nodes
+        mid = np.array([i for i in range(1, n - 1) if self.nodes[i].node_1 is not None], dtype=int)
+        self.drawn_nodes = [0] + mid.tolist() + [n - 1]
+
+        # Start node
+        out_inf = bottom[0] + z1[0]
+        out_sup = out_inf + cat_geom[0]
+        node_inf = [np.array([[left[0], top[0]], [left[0], bottom[0]], [right[0], bottom[0]], [right[0], out_inf]])]
+        node_sup = [np.array([[left[0], top[0]], [right[0], top[0]], [right[0], out_sup]])]
+        node_types = [self.nodes[0].data_type]
+
+        # Nodes between start and end nodes
+        in_inf = bottom[mid] + z2[mid - 1]
+        in_sup = in_inf + cat_geom[mid - 1]
+        out_inf = bottom[mid] + z1[mid]
+        out_sup = out_inf + cat_geom[mid]
+        node_inf.extend(np.stack([np.column_stack([left[mid], in_inf]), np.column_stack([left[mid], bottom[mid]]),
+                                  np.column_stack([right[mid], bottom[mid]]), np.column_stack([right[mid], out_inf])],
+                                 axis=1))
+        for j, i in enumerate(mid):
+            if self.nodes[i].surface_type == 'TOP':
+                node_sup.append(np.array([[left[i], in_sup[j]], [left[i], top[i]], [right[i], top[i]],
+                                          [right[i], out_sup[j]]]))
+            else:
+                node_sup.append(np.array([[left[i], in_sup[j]], [right[i], out_sup[j]]]))
+            node_types.append(self.nodes[i].data_type)
+
+        # End node
+        e = n - 1
+        in_inf = bottom[e] + z2[e - 1]
+        in_sup = in_inf + cat_geom[e - 1]
+        node_inf.append(np.array([[left[e], in_inf], [left[e], bottom[e]], [right[e], bottom[e]]]))
+        node_sup.append(np.array([[left[e], in_sup], [left[e], top[e]], [right[e], top[e]], [right[e], bottom[e]]]))
+        node_types.append(self.nodes[e].data_type)
+
+        for data_type in dict.fromkeys(node_types):
+            inf = [segment for segment, node_type in zip(node_inf, node_types) if node_type == data_type]
+            sup = [segment for segment, node_type in zip(node_sup, node_types) if node_type == data_type]
+            self.add_lines(inf + sup, *self.get_stylesheet(data_type))
+
+        # Arcs from every node drawn to the next one
+        source = np.array(self.drawn_nodes[:-1], dtype=int)
+        target = np.array(self.drawn_nodes[1:], dtype=int)
+        out_inf = bottom[source] + z1[source]
+        in_inf = bottom[target] + z2[target - 1]
+        arc_inf = np.stack([np.column_stack([right[source], out_inf]), np.column_stack([left[target], in_inf])], axis=1)
+        arc_sup = np.stack([np.column_stack([right[source], out_inf + cat_geom[source]]),
+                            np.column_stack([left[target], in_inf + cat_geom[target - 1]])], axis=1)
+
+        # Arc is interpolated if the node drawn before or the node after (but the end node) are interpolated
+        arc_types = []
+        for i, j in zip(source, target):
+            prev_type = 'REAL' if i == 0 else self.nodes[i].data_type
+            if prev_type == 'INTERPOLATED' or (j != e and self.nodes[j].data_type == 'INTERPOLATED'):
+                arc_types.append('INTERPOLATED')
+            else:
+                arc_types.append('REAL')
+
+        arc_types = np.array(arc_types)
+        for data_type in dict.fromkeys(arc_types):
+            mask = arc_types == data_type
+            self.add_lines(list(arc_inf[mask]) + list(arc_sup[mask]), *self.get_stylesheet(data_type))
 
 
     def draw_guitar_vertical_lines(self, start_point):
@@ -633,508 +700,118 @@ class DrawProfiles(ParentMapTool):
         line_style = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['style']
         line_width = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['width']
 
-        # Vertical line [-1,0]
-        # x = [start_point - self.fix_x * Decimal(0.2), start_point - self.fix_x * Decimal(0.2)]
-        # y = [self.min_top_elev - 1 * self.height_row, self.min_top_elev - Decimal(5.85) * self.height_row]
-        # plt.plot(x, y, linestyle=line_style, color=line_color, linewidth=line_width, zorder=100)
-
-        # Vertical line [-2,0]
-        x = [start_point - self.fix_x * Decimal(0.75), start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(1.9) * self.height_row, self.min_top_elev - Decimal(5.10) * self.height_row]
-        plt.plot(x, y, linestyle=line_style, color=line_color, linewidth=line_width, zorder=100)
-
-        # Vertical line [-3,0]
-        x = [start_point - self.fix_x, start_point - self.fix_x]
-        y = [self.min_top_elev - 1 * self.height_row, self.min_top_elev - Decimal(5.85) * self.height_row]
-        plt.plot(x, y, linestyle=line_style, color=line_color, linewidth=line_width, zorder=100)
+        # Vertical line [-2,0] and vertical line [-3,0]
+        segments = [[(start_point - self.fix_x * 0.75, self.get_row_y(1.9)),
+                     (start_point - self.fix_x * 0.75, self.get_row_y(5.10))],
+                    [(start_point - self.fix_x, self.get_row_y(1)), (start_point - self.fix_x, self.get_row_y(5.85))]]
+        self.add_lines(segments, line_style, line_color, line_width)
 
 
-    def draw_guitar_auxiliar_lines(self, start_point, first_vl=True):
-        """ Draw marks for each node """
+    def draw_guitar_auxiliar_lines(self):
+        """ Draw marks for each node drawn and each terrain point """
 
         # Get stylesheet
         auxline_color = self.profile_json['body']['data']['stylesheet']['guitar']['auxiliarlines']['color']
         auxline_style = self.profile_json['body']['data']['stylesheet']['guitar']['auxiliarlines']['style']
         auxline_width = self.profile_json['body']['data']['stylesheet']['guitar']['auxiliarlines']['width']
 
-        if first_vl: # separator for first slope / length (only for nodes)
-            # Vertical line [0,0]
-            x = [start_point, start_point]
-            y = [self.min_top_elev - 1 * self.height_row,
-                 self.min_top_elev - Decimal(1.9) * self.height_row]
-            plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        # Vertical lines
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(1.90) * self.height_row, self.min_top_elev - Decimal(2.05) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(2.60) * self.height_row, self.min_top_elev - Decimal(2.85) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
+        rows = [(1.90, 2.05), (2.60, 2.85), (3.4, 3.65), (4.20, 4.45), (5, 5.25), (5.85, 5.7)]
+        node_x = [self.nodes[i].start_point for i in self.drawn_nodes]
+        terrain_x = [self.links[i].start_point for i in range(1, self.t)]
 
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(3.4) * self.height_row, self.min_top_elev - Decimal(3.65) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
+        # Separator for first slope / length only for nodes
+        segments = self.get_vertical_segments(node_x, [(1, 1.9)] + rows)
+        self.add_lines(segments, auxline_style, auxline_color, auxline_width)
+        segments = self.get_vertical_segments(terrain_x, rows)
+        self.add_lines(segments, auxline_style, auxline_color, auxline_width)
 
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(4.20) * self.height_row, self.min_top_elev - Decimal(4.45) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
 
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(5) * self.height_row, self.min_top_elev - Decimal(5.25) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
+    def fill_guitar_text_legend(self, start_point, title, date):
 
-        x = [start_point, start_point]
-        y = [self.min_top_elev - Decimal(5.85) * self.height_row, self.min_top_elev - Decimal(5.7) * self.height_row]
-        plt.plot(x, y, linestyle=auxline_style, color=auxline_color, linewidth=auxline_width, zorder=100)
-
-
-    def fill_guitar_text_legend(self, start_point):
+        legend = self.profile_json['body']['data']['legend']
+        c = (self.fix_x - self.fix_x * 0.2) / 2
+        self.labels.add_text(-(c + self.fix_x * 0.2), self.get_row_y(1.35), legend['catalog'], 'legend')
+        self.labels.add_text(-(c + self.fix_x * 0.2), self.get_row_y(1.68), legend['dimensions'], 'legend')
 
-        # Get stylesheet values
-        text_color = self.profile_json['body']['data']['stylesheet']['guitar']['text']['color']
-        text_weight = self.profile_json['body']['data']['stylesheet']['guitar']['text']['weight']
-        title_color = self.profile_json['body']['data']['stylesheet']['title']['text']['color']
-        title_weight = self.profile_json['body']['data']['stylesheet']["title"]['text']['weight']
-        title_size = self.profile_json['body']['data']['stylesheet']["title"]['text']['size']
+        c = (self.fix_x * 0.25) / 2
+        self.labels.add_text(-(c + self.fix_x * 0.74), self.get_row_y(3.5), legend['ordinates'], 'legend_vertical')
+        self.labels.add_text(-self.fix_x * 0.70, self.get_row_y(2.35), legend['topelev'], 'legend_row')
+        self.labels.add_text(-self.fix_x * 0.70, self.get_row_y(3.15), legend['ymax'], 'legend_row')
+        self.labels.add_text(-self.fix_x * 0.70, self.get_row_y(3.95), legend['elev'], 'legend_row')
+        self.labels.add_text(-self.fix_x * 0.70, self.get_row_y(4.75), legend['distance'], 'legend_row')
 
-        legend = self.profile_json['body']['data']['legend']
-        c = (self.fix_x - self.fix_x * Decimal(0.2)) / 2
-        plt.text(-(c + self.fix_x * Decimal(0.2)),
-                 self.min_top_elev - 1 * self.height_row - Decimal(0.35) * self.height_row, legend['catalog'],
-                 fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 horizontalalignment='center')
-
-        plt.text(-(c + self.fix_x * Decimal(0.2)),
-                 self.min_top_elev - 1 * self.height_row - Decimal(0.68) * self.height_row, legend['dimensions'],
-                 fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 horizontalalignment='center')
-
-        c = (self.fix_x * Decimal(0.25)) / 2
-        plt.text(-(c + self.fix_x * Decimal(0.74)),
-                 self.min_top_elev - Decimal(2) * self.height_row - self.height_row * 3 / 2, legend['ordinates'],
-                 fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(1.85) * self.height_row - self.height_row / 2,
-                 legend['topelev'], fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(2.65) * self.height_row - self.height_row / 2,
-                 legend['ymax'], fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(3.45) * self.height_row - self.height_row / 2,
-                 legend['elev'], fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 verticalalignment='center')
-
-        plt.text(-self.fix_x * Decimal(0.70), self.min_top_elev - Decimal(4.25) * self.height_row - self.height_row / 2,
-                 legend['distance'], fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 verticalalignment='center')
-
-        c = (self.fix_x - self.fix_x * Decimal(0.2)) / 2
-        plt.text(-(c + self.fix_x * Decimal(0.2)),
-                 self.min_top_elev - Decimal(self.height_row * 5 + self.height_row / 2), legend['code'],
-                 fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 horizontalalignment='center', verticalalignment='center')
+        c = (self.fix_x - self.fix_x * 0.2) / 2
+        self.labels.add_text(-(c + self.fix_x * 0.2), self.get_row_y(5.5), legend['code'], 'code')
 
         # print title
-        title = utils_giswater.getWidgetText(self.dlg_draw_profile, self.dlg_draw_profile.txt_title)
         if title in (None, 'null'):
             title = ''
-        plt.text(-self.fix_x * Decimal(1), self.min_top_elev - Decimal(5.75) * self.height_row - self.height_row / 2,
-                 title.upper(), fontsize=title_size,
-                 color=title_color, fontweight=title_weight,
-                 verticalalignment='center')
-        plt.text(-self.fix_x * Decimal(1), self.min_top_elev - Decimal(6) * self.height_row - self.height_row / 2,
-                 "" + str(utils_giswater.getCalendarDate(self.dlg_draw_profile, self.dlg_draw_profile.date)) + "",
-                 fontsize=title_size*0.7,
-                 color=title_color, fontweight=title_weight,
-                 verticalalignment='center')
-
-    def draw_nodes(self, node, prev_node, index):
-        """ Draw nodes between first and last node """
-
-        z1 = prev_node.z2
-        z2 = node.z1
-
-        if node.node_1 is None:
-            return
-
-        # Get superior points
-        s1x = self.slast[0]
-        s1y = self.slast[1]
-
-        if node.geom is None:
-            node.geom = 0
-
-        s2x = node.start_point - node.geom / 2
-        s2y = node.top_elev - node.ymax + z1 + prev_node.cat_geom
-        s3x = node.start_point - node.geom / 2
-        s3y = node.top_elev
-        s4x = node.start_point + node.geom / 2
-        s4y = node.top_elev
-        s5x = node.start_point + node.geom / 2
-        s5y = node.top_elev - node.ymax + z2 + node.cat_geom
-
-        # Get inferior points
-        i1x = self.ilast[0]
-        i1y = self.ilast[1]
-        i2x = node.start_point - node.geom / 2
-        i2y = node.top_elev - node.ymax + z1
-        i3x = node.start_point - node.geom / 2
-        i3y = node.top_elev - node.ymax
-        i4x = node.start_point + node.geom / 2
-        i4y = node.top_elev - node.ymax
-        i5x = node.start_point + node.geom / 2
-        i5y = node.top_elev - node.ymax + z2
-
-        # Create arc list points
-        xainf = [i1x, i2x]
-        yainf = [i1y, i2y]
-        xasup = [s1x, s2x]
-        yasup = [s1y, s2y]
-
-        # Create node list points
-        xninf = [i2x, i3x, i4x, i5x]
-        yninf = [i2y, i3y, i4y, i5y]
-
-        if node.surface_type == 'TOP':
-          xnsup = [s2x, s3x, s4x, s5x]
-          ynsup = [s2y, s3y, s4y, s5y]
-        else:
-          xnsup = [s2x, s5x]
-          ynsup = [s2y, s5y]
-
-        # draw node bottom line
-        plt.plot(xninf, yninf,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(node.data_type)[0],
-                 color=self.get_stylesheet(node.data_type)[1],
-                 linewidth=self.get_stylesheet(node.data_type)[2])
-
-        # draw node upper line
-        plt.plot(xnsup, ynsup,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(node.data_type)[0],
-                 color=self.get_stylesheet(node.data_type)[1],
-                 linewidth=self.get_stylesheet(node.data_type)[2])
-
-        if self.lastnode_datatype == 'INTERPOLATED' or node.data_type == 'INTERPOLATED':
-            data_type = 'INTERPOLATED'
-        else:
-            data_type = 'REAL'
-
-        # draw arc bottom line
-        plt.plot(xainf, yainf,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(data_type)[0],
-                 color=self.get_stylesheet(data_type)[1],
-                 linewidth=self.get_stylesheet(data_type)[2])
-
-        # draw arc upper line
-        plt.plot(xasup, yasup,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(data_type)[0],
-                 color=self.get_stylesheet(data_type)[1],
-                 linewidth=self.get_stylesheet(data_type)[2])
-
-        self.node_top_x = node.start_point
-        self.node_top_y = node.top_elev
-        self.first_top_x = prev_node.start_point
-        self.first_top_y = prev_node.top_elev
-
-        # Draw guitar auxiliar lines
-        self.draw_guitar_auxiliar_lines(node.start_point)
-
-        # Fill table
-        self.fill_guitar_text_node(node.start_point, index)
-
-        # Save last points before the last node
-        self.slast = [s5x, s5y]
-        self.ilast = [i5x, i5y]
-        self.lastnode_datatype = node.data_type
-
-        # Save last points for draw ground
-        self.slast2 = [s3x, s3y]
-        self.ilast2 = [i3x, i3y]
-
-
-    def fill_guitar_text_node(self, start_point, index):
-
-        # Get stylesheet values
-        text_color = self.profile_json['body']['data']['stylesheet']['guitar']['text']['color']
-        text_weight = self.profile_json['body']['data']['stylesheet']['guitar']['text']['weight']
-
-        # Fill top_elevation
-        plt.annotate(' ' + '\n' + str(self.nodes[index].descript['top_elev']) + '\n' + ' ',
-                     xy=(Decimal(start_point), self.min_top_elev - \
-                         Decimal(self.height_row * Decimal(1.8) + self.height_row / 2)),
-                     fontsize=6,
-                     color=text_color, fontweight=text_weight,
-                     rotation='vertical', horizontalalignment='center', verticalalignment='center')
-        # Fill code
-        plt.text(0 + start_point, self.min_top_elev - Decimal(self.height_row * 5 + self.height_row / 2),
-                 self.nodes[index].descript['code'], fontsize=7.5,
-                 color=text_color, fontweight=text_weight,
-                 horizontalalignment='center', verticalalignment='center')
-
-        # Node init
-        if index == 0:
-
-            y1 = self.nodes[0].y1
-            elev1 = self.nodes[0].elev1
-
-            # Fill y_max
-            plt.annotate(' ' + '\n' + str(self.nodes[0].descript['ymax']) + '\n' + str(y1),
-                         xy=(Decimal(0 + start_point),
-                             self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(' ' + '\n' + str(self.nodes[0].descript['elev']) + '\n' + str(elev1),
-                         xy=(Decimal(0 + start_point),
-                             self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
+        self.labels.add_text(-self.fix_x, self.get_row_y(6.25), title.upper(), 'title')
+        self.labels.add_text(-self.fix_x, self.get_row_y(6.5), date, 'date')
+
+
+    def fill_guitar_text_node(self):
+        """ Fill table with values of each node drawn and the arc starting at it. Every node is a column
+            of labels that is not drawn if it would overlap another one. First and last nodes are always drawn """
+
+        for index in self.drawn_nodes:
+            node = self.nodes[index]
+            start_point = node.start_point
+            code = str(node.descript['code'])
+            priority = 0 if index in (0, self.n - 1) else 1
+            column = self.labels.add_column('node', start_point, max(LABEL_WIDTH, len(code) * 7.5 * 0.6), priority)
+
+            # Fill top_elevation and code
+            self.labels.add_text(start_point, self.get_row_y(2.3), f" \n{node.descript['top_elev']}\n ", 'value',
+                                 column)
+            self.labels.add_text(start_point, self.get_row_y(5.5), code, 'code', column)
+
+            # Fill y_max and elevation
+            if index == 0:
+                ymax = f" \n{node.descript['ymax']}\n{node.y1}"
+                elev = f" \n{node.descript['elev']}\n{node.elev1}"
+            elif index < self.n - 1:
+                ymax = f"{self.nodes[index - 1].y2}\n{node.descript['ymax']}\n{self.nodes[0].y1}"
+                elev = f"{self.nodes[index - 1].elev2}\n{node.descript['elev']}\n{self.nodes[0].elev1}"
+            else:
+                ymax = f"{self.nodes[index - 1].y2}\n{node.descript['ymax']}"
+                elev = f"{self.nodes[index - 1].elev2}\n{node.descript['elev']}"
+            self.labels.add_text(start_point, self.get_row_y(3.1), ymax, 'value', column)
+            self.labels.add_text(start_point, self.get_row_y(3.9), elev, 'value', column)
 
             # Fill total length
-            plt.annotate(str(self.nodes[index].descript['total_distance']),
-                         xy=(Decimal(0 + start_point),
-                             self.min_top_elev - Decimal(
-                                 self.height_row * Decimal(4.20) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-        # Nodes between init and end
-        elif index < self.n-1:
-
-            # defining variables
-            y2_prev = self.nodes[index-1].y2
-            elev2_prev = self.nodes[index-1].elev2
-            y1 = self.nodes[0].y1
-            elev1 = self.nodes[0].elev1
-
-            # Fill y_max
-            plt.annotate(
-                str(y2_prev) + '\n' + str(self.nodes[index].descript['ymax']) + '\n' + str(y1),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(
-                str(elev2_prev) + '\n' + str(self.nodes[index].descript['elev']) + '\n' + str(elev1),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
+            self.labels.add_text(start_point, self.get_row_y(4.7), node.descript['total_distance'], 'value', column)
 
-            # Fill total length
-            plt.annotate(str(self.nodes[index].descript['total_distance']),
-                         xy=(Decimal(0 + start_point),
-                         self.min_top_elev - Decimal(self.height_row * Decimal(4.20) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-        # Node end
-        elif index == self.n-1:
-
-            # Fill y_max
-            plt.annotate(
-                str(self.nodes[index - 1].y2) + '\n' + str(self.nodes[index].descript['ymax']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(
-                str(self.nodes[index - 1].elev2) + '\n' + str(self.nodes[index].descript['elev']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
+            # Fill diameter and slope / length
+            if index != self.n - 1:
+                center = start_point + self.gis_length[index + 1] / 2
+                catalog = str(self.arc_catalog[index])
+                dimensions = str(self.arc_dimensions[index])
+                width = max(len(catalog), len(dimensions)) * 7.5 * 0.6
+                column = self.labels.add_column('arc', center, width)
+                self.labels.add_text(center, self.get_row_y(1.35), catalog, 'legend', column)
+                self.labels.add_text(center, self.get_row_y(1.68), dimensions, 'legend', column)
 
-            # Fill total length
-            plt.annotate(str(self.nodes[index].descript['total_distance']),
-                         xy=(Decimal(0 + start_point),
-                         self.min_top_elev - Decimal(self.height_row * Decimal(4.20) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-
-        # Fill diameter and slope / length
-        if index != self.n - 1:
-
-            # Fill diameter
-            center = self.gis_length[index + 1] / 2
-            plt.text(center + start_point, self.min_top_elev - 1 * self.height_row - Decimal(0.35) * self.height_row,
-                     self.arc_catalog[index],
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='center')  # PUT IN THE MIDDLE PARAMETRIZATION
-
-            # Fill slope / length
-            plt.text(center + start_point, self.min_top_elev - 1 * self.height_row - Decimal(0.68) * self.height_row,
-                     self.arc_dimensions[index],
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='center')  # PUT IN THE MIDDLE PARAMETRIZATION
-
-
-    def fill_guitar_text_terrain(self, start_point, index):
-
-        if str(self.links[index].surface_type) == 'VNODE':
-
-            # Get stylesheet values
-            text_color = self.profile_json['body']['data']['stylesheet']['guitar']['text']['color']
-            text_weight = self.profile_json['body']['data']['stylesheet']['guitar']['text']['weight']
-
-            # Fill top_elevation
-            plt.annotate(' ' + '\n' + str(self.links[index].descript['top_elev']) + '\n' + ' ',
-                         xy=(Decimal(start_point), self.min_top_elev - \
-                             Decimal(self.height_row * Decimal(1.8) + self.height_row / 2)),
-                         fontsize=6,
-                         color=text_color, fontweight=text_weight,
-                         rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill code
-            plt.text(0 + start_point, self.min_top_elev - Decimal(self.height_row * Decimal(5) + self.height_row / 2),
-                     self.links[index].descript['code'],
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='center', verticalalignment='center')
-
-             # Fill y_max
-            plt.annotate(
-                str(self.links[index].descript['ymax']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(2.60) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
-
-            # Fill elevation
-            plt.annotate(
-                str(self.links[index].descript['elev']),
-                xy=(Decimal(0 + start_point),
-                    self.min_top_elev - Decimal(self.height_row * Decimal(3.40) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
 
-            # Fill total length
-            plt.annotate(str(self.links[index].descript['total_distance']),
-                 xy=(Decimal(0 + start_point),
-                     self.min_top_elev - Decimal(self.height_row * Decimal(4.20) + self.height_row / 2)),
-                fontsize=6,
-                color=text_color, fontweight=text_weight,
-                rotation='vertical', horizontalalignment='center', verticalalignment='center')
+    def fill_guitar_text_terrain(self):
+        """ Fill table with values of terrain points of type VNODE. Their columns are drawn after node ones """
 
+        for index in range(1, self.t):
+            link = self.links[index]
+            if str(link.surface_type) != 'VNODE':
+                continue
 
-    def draw_end_node(self, node, prev_node, index):
-        """
-        draws last arc and nodes of profile
-        :param node:
-        :param prev_node:
-        :param index:
-        :return:
-        """
+            start_point = link.start_point
+            code = str(link.descript['code'])
+            column = self.labels.add_column('node', start_point, max(LABEL_WIDTH, len(code) * 7.5 * 0.6), 2)
 
-        s1x = self.slast[0]
-        s1y = self.slast[1]
-
-        s2x = node.start_point - node.geom / 2
-        s2y = node.top_elev - node.ymax + prev_node.z2 + prev_node.cat_geom
-        s3x = node.start_point - node.geom / 2
-        s3y = node.top_elev
-        s4x = node.start_point + node.geom / 2
-        s4y = node.top_elev
-
-        # Get inferior points
-        i1x = self.ilast[0]
-        i1y = self.ilast[1]
-        i2x = node.start_point - node.geom / 2
-        i2y = node.top_elev - node.ymax + prev_node.z2
-        i3x = node.start_point - node.geom / 2
-        i3y = node.top_elev - node.ymax
-        i4x = node.start_point + node.geom / 2
-        i4y = node.top_elev - node.ymax
-
-        # Create arc list points
-        xainf = [i1x, i2x]
-        yainf = [i1y, i2y]
-        xasup = [s1x, s2x]
-        yasup = [s1y, s2y]
-
-        # Create node list points
-        xninf = [i2x, i3x, i4x]
-        yninf = [i2y, i3y, i4y]
-        xnsup = [s2x, s3x, s4x, i4x]
-        ynsup = [s2y, s3y, s4y, i4y]
-
-        # draw node bottom line
-        plt.plot(xninf, yninf,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(node.data_type)[0],
-                 color=self.get_stylesheet(node.data_type)[1],
-                 linewidth=self.get_stylesheet(node.data_type)[2])
-
-        # draw node upper line
-        plt.plot(xnsup, ynsup,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(node.data_type)[0],
-                 color=self.get_stylesheet(node.data_type)[1],
-                 linewidth=self.get_stylesheet(node.data_type)[2])
-
-        # draw arc bottom line
-        plt.plot(xainf, yainf,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(self.lastnode_datatype)[0],
-                 color=self.get_stylesheet(self.lastnode_datatype)[1],
-                 linewidth=self.get_stylesheet(self.lastnode_datatype)[2])
-
-        # draw arc upper line
-        plt.plot(xasup, yasup,
-                 zorder=100,
-                 linestyle=self.get_stylesheet(self.lastnode_datatype)[0],
-                 color=self.get_stylesheet(self.lastnode_datatype)[1],
-                 linewidth=self.get_stylesheet(self.lastnode_datatype)[2])
-
-        self.first_top_x = self.slast2[0]
-        self.first_top_y = self.slast2[1]
-
-        self.node_top_x = node.start_point
-        self.node_top_y = node.top_elev
-
-        # Draw table-marks
-        self.draw_guitar_auxiliar_lines(node.start_point)
-
-        # Fill table
-        self.fill_guitar_text_node(node.start_point, index)
-
-        # Reset lastnode_datatype
-        self.lastnode_datatype = 'REAL'
+            # Fill top_elevation, code, y_max, elevation and total length
+            self.labels.add_text(start_point, self.get_row_y(2.3), f" \n{link.descript['top_elev']}\n ", 'value',
+                                 column)
+            self.labels.add_text(start_point, self.get_row_y(5.5), code, 'code', column)
+            self.labels.add_text(start_point, self.get_row_y(3.1), link.descript['ymax'], 'value', column)
+            self.labels.add_text(start_point, self.get_row_y(3.9), link.descript['elev'], 'value', column)
+            self.labels.add_text(start_point, self.get_row_y(4.7), link.descript['total_distance'], 'value', column)
 
 
     def set_guitar_parameters(self):
@@ -1144,30 +821,22 @@ class DrawProfiles(ParentMapTool):
         """
 
         # Search y coordinate min_top_elev ( top_elev- ymax)
-        self.min_top_elev = Decimal(self.nodes[0].top_elev - self.nodes[0].ymax)
-
-        #self.min_top_elev_descript = Decimal(self.nodes[0].descript['top_elev'] - self.nodes[0].descript['ymax'])
-        for i in range(1, self.n):
-            if (self.nodes[i].top_elev - self.nodes[i].ymax) < self.min_top_elev:
-                self.min_top_elev = Decimal(self.nodes[i].top_elev - self.nodes[i].ymax)
+        self.min_top_elev = float(min(node.top_elev - node.ymax for node in self.nodes))
 
         # Search y coordinate max_top_elev
-        self.max_top_elev = self.nodes[0].top_elev
+        self.max_top_elev = max(node.top_elev for node in self.nodes)
         self.max_top_elev_descript = self.nodes[0].descript['top_elev']
-        for i in range(1, self.n):
-            if self.nodes[i].top_elev > self.max_top_elev:
-                self.max_top_elev = self.nodes[i].top_elev
 
         # Calculating dimensions of x-fixed part of table
-        self.fix_x = Decimal(Decimal(0.15) * Decimal(self.nodes[self.n - 1].start_point))
+        self.fix_x = 0.15 * float(self.nodes[self.n - 1].start_point)
 
         # Calculating dimensions of y-fixed part of table
         # Height y = height of table + height of graph
-        self.z = Decimal(self.max_top_elev) - Decimal(self.min_top_elev)
-        self.height_row = (Decimal(self.z) * Decimal(0.97)) / Decimal(5)
+        self.z = float(self.max_top_elev) - self.min_top_elev
+        self.height_row = self.z * 0.97 / 5
 
         # Height of graph + table
-        self.height_y = Decimal(self.z * 2)
+        self.height_y = self.z * 2
 
 
     def draw_guitar_horitzontal_lines(self):
@@ -1179,35 +848,13 @@ class DrawProfiles(ParentMapTool):
         line_style = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['style']
         line_width = self.profile_json['body']['data']['stylesheet']['guitar']['lines']['width']
 
-        self.set_guitar_parameters()
-
-        # Draw upper horizontal lines (long ones)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - self.height_row, self.min_top_elev - self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - Decimal(1.9) * self.height_row, self.min_top_elev - Decimal(1.9) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-
-        # Draw middle horizontal lines (short ones)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(2.70) * self.height_row, self.min_top_elev - Decimal(2.70) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(3.50) * self.height_row, self.min_top_elev - Decimal(3.50) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x * Decimal(0.75)]
-        y = [self.min_top_elev - Decimal(4.30) * self.height_row, self.min_top_elev - Decimal(4.30) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-
-        # Draw lower horizontal lines (long ones)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - Decimal(5.10) * self.height_row, self.min_top_elev - Decimal(5.10) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
-        x = [self.nodes[self.n - 1].start_point, self.nodes[0].start_point - self.fix_x]
-        y = [self.min_top_elev - Decimal(5.85) * self.height_row, self.min_top_elev - Decimal(5.85) * self.height_row]
-        plt.plot(x, y, color=line_color, linestyle=line_style, linewidth=line_width, zorder=100)
+        # Upper and lower horizontal lines (long ones) and middle horizontal lines (short ones)
+        end_x = self.nodes[self.n - 1].start_point
+        start_x = self.nodes[0].start_point - self.fix_x
+        short_x = self.nodes[0].start_point - self.fix_x * 0.75
+        segments = [[(end_x, self.get_row_y(row)), (start_x, self.get_row_y(row))] for row in (1, 1.9, 5.10, 5.85)]
+        segments += [[(end_x, self.get_row_y(row)), (short_x, self.get_row_y(row))] for row in (2.70, 3.50, 4.30)]
+        self.add_lines(segments, line_style, line_color, line_width)
 
 
     def draw_grid(self):
@@ -1222,94 +869,65 @@ class DrawProfiles(ParentMapTool):
         boundary_style = self.profile_json['body']['data']['stylesheet']['grid']['boundary']['style']
         boundary_width = self.profile_json['body']['data']['stylesheet']['grid']['boundary']['width']
 
-        # get values for text
-        text_color = self.profile_json['body']['data']['stylesheet']['grid']['text']['color']
-        text_weight = self.profile_json['body']['data']['stylesheet']['grid']['text']['weight']
-
         start_point = self.nodes[self.n - 1].start_point
-        geom1 = self.nodes[self.n - 1].geom
+        geom1 = float(self.nodes[self.n - 1].geom or 0)
+        bottom = self.get_row_y(1)
+        top = int(math.ceil(self.max_top_elev) + 1)
 
         # Draw main text
-        plt.text(-self.fix_x * Decimal(1), self.min_top_elev - Decimal(0.5) * self.height_row - self.height_row / 2,
-                 'REFERENCE: ' + str(round(self.min_top_elev - 1 * self.height_row, 2)) + '\n' + ' ',
-                 fontsize=8.5,
-                 color=text_color, fontweight=text_weight,
-                 verticalalignment='center')
+        self.labels.add_text(-self.fix_x, self.get_row_y(1), f"REFERENCE: {round(bottom, 2)}\n ", 'reference')
 
         # Draw boundary
-        x = [0, 0]
-        y = [self.min_top_elev - 1 * self.height_row, int(math.ceil(self.max_top_elev) + 1)]
-        plt.plot(x, y, color=boundary_color, linestyle=boundary_style, linewidth=boundary_width, zorder=100)
-        x = [start_point, start_point]
-        y = [self.min_top_elev - 1 * self.height_row, int(math.ceil(self.max_top_elev) + 1)]
-        plt.plot(x, y, color=boundary_color, linestyle=boundary_style, linewidth=boundary_width, zorder=100)
-        x = [0, start_point]
-        y = [int(math.ceil(self.max_top_elev) + 1), int(math.ceil(self.max_top_elev) + 1)]
-        plt.plot(x, y, color=boundary_color, linestyle=boundary_style, linewidth=boundary_width, zorder=100)
-
-        # Draw horitzontal lines
-        y = int(math.ceil(self.min_top_elev - 1 * self.height_row))
-        x = int(math.floor(self.max_top_elev))
-        if x % 2 == 0:
-            x = x + 2
-        else:
-            x = x + 1
+        segments = [[(0, bottom), (0, top)], [(start_point, bottom), (start_point, top)],
+                    [(0, top), (start_point, top)]]
+        self.add_lines(segments, boundary_style, boundary_color, boundary_width)
 
-        for i in range(y, x):
-            if i % 2 == 0:
-                x1 = [0, start_point]
-                y1 = [i, i]
-            else:
-                i = i + 1
-                x1 = [0, start_point]
-                y1 = [i, i]
-
-            # set line
-            plt.plot(x1, y1, color=line_color, linestyle=line_style, linewidth=line_width, zorder=1)
-
-            # set texts
-            plt.text(0 - Decimal(geom1) * Decimal(1.5), i, str(i),
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='right', verticalalignment='center')
-            plt.text(Decimal(start_point) + Decimal(geom1) * Decimal(1.5), i, str(i),
-                     fontsize=7.5,
-                     color=text_color, fontweight=text_weight,
-                     horizontalalignment='left', verticalalignment='center')
-
-        # Draw vertical lines
-        x = int(math.floor(start_point))
-        for i in range(50, x, 50):
-            x1 = [i, i]
-            y1 = [self.min_top_elev - 1 * self.height_row, int(math.ceil(self.max_top_elev) + 1)]
-
-            # set line
-            plt.plot(x1, y1,  color=line_color, linestyle=line_style, linewidth=line_width, zorder=1)
-
-            # set texts
-            plt.annotate(str(i) + '\n' + ' ', xy=(i, int(math.ceil(self.max_top_elev) + 1)),
-                fontsize=6.5,
-                color=text_color, fontweight=text_weight,
-                horizontalalignment='center')
-
-
-    def draw_terrain(self, index):
+        # Draw horitzontal lines at even elevations
+        y = int(math.ceil(bottom))
+        x = int(math.floor(self.max_top_elev))
+        x = x + 2 if x % 2 == 0 else x + 1
+        elevations = np.arange(y + y % 2, x + 1, 2)
+        segments = np.empty((len(elevations), 2, 2))
+        segments[:, :, 0] = (0, start_point)
+        segments[:, :, 1] = elevations[:, None]
+        self.add_lines(segments, line_style, line_color, line_width, zorder=1)
+        for i in elevations:
+            self.labels.add_text(-geom1 * 1.5, i, i, 'grid_left')
+            self.labels.add_text(start_point + geom1 * 1.5, i, i, 'grid_right')
+
+        # Draw vertical lines each 50 meters
+        distances = np.arange(50, int(math.floor(start_point)), 50)
+        segments = np.empty((len(distances), 2, 2))
+        segments[:, :, 0] = distances[:, None]
+        segments[:, :, 1] = (bottom, top)
+        self.add_lines(segments, line_style, line_color, line_width, zorder=1)
+        for i in distances:
+            column = self.labels.add_column('grid', i, len(str(i)) * 6.5 * 0.6 + 6.5)
+            self.labels.add_text(i, top, f"{i}\n ", 'grid_top', column)
+
+
+    def draw_terrain(self):
+        """ Draw terrain line between each pair of terrain points and a marker at each point """
 
         # getting variables
         line_color = self.profile_json['body']['data']['stylesheet']['terrain']['color']
         line_style = self.profile_json['body']['data']['stylesheet']['terrain']['style']
         line_width = self.profile_json['body']['data']['stylesheet']['terrain']['width']
 
-        # Draw marker
-        if index == 1:
-            plt.plot(self.first_top_x, self.first_top_y, marker='|', color=line_color)
-        else:
-            plt.plot(self.node_top_x, self.node_top_y, marker='|', color=line_color)
+        if self.t < 2:
+            return
 
-        # Draw line
-        x = [self.first_top_x, self.node_top_x]
-        y = [self.first_top_y, self.node_top_y]
-        plt.plot(x, y, color=line_color, linewidth=line_width, linestyle=line_style)
+        # Line from each point (start_point = total_x, node_id = top_n1) to the next one (geom = top_n2)
+        x = np.array([link.start_point for link in self.links], dtype=float)
+        top_n1 = np.array([link.node_id for link in self.links], dtype=float)
+        top_n2 = np.array([link.geom for link in self.links], dtype=float)
+        segments = np.stack([np.column_stack([x[:-1], top_n1[:-1]]), np.column_stack([x[1:], top_n2[:-1]])], axis=1)
+        self.add_lines(segments, line_style, line_color, line_width, zorder=2)
+
+        # Draw markers
+        marker_x = np.concatenate([x[:1], x[2:]])
+        marker_y = np.concatenate([top_n1[:1], top_n2[1:-1]])
+        self.axes.plot(marker_x, marker_y, linestyle='None', marker='|', color=line_color)
 
 
     def clear_profile(self):
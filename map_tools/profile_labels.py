@@ -0,0 +1,96 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.text import Text
+
+from bisect import bisect
+
+
+class ProfileLabels(Artist):
+    """ Texts of a profile drawn by a single artist, reusing one Text instance per style.
+        Texts can belong to a column (all the values of a node in the guitar, label of an arc...).
+        Columns of the same group that would overlap at current scale are not drawn, so labels of
+        dense profiles are thinned out and appear again when zooming in """
+
+    def __init__(self):
+
+        super().__init__()
+        self.styles = {}
+        # (x, y, text, style, column)
+        self.texts = []
+        # (group, x, width in points, priority). Columns with priority 0 are always drawn
+        self.columns = []
+        self.set_in_layout(False)
+
+
+    def add_style(self, style, **kwargs):
+        """ Add @style with properties @kwargs of matplotlib Text (fontsize, color, rotation...) """
+
+        self.styles[style] = Text(0, 0, '', **kwargs)
+
+
+    def add_column(self, group, x, width, priority=1):
+        """ Add column centered on @x with @width in points. Return its index """
+
+        self.columns.append((group, x, width, priority))
+        return len(self.columns) - 1
+
+
+    def add_text(self, x, y, text, style, column=None):
+
+        self.texts.append((x, y, str(text), style, column))
+
+
+    def get_visible_columns(self, renderer):
+        """ Get indexes of the columns drawn at current scale. Columns are kept in order of priority
+            and position while they don't overlap another column of their group already kept """
+
+        if not self.columns:
+            return set()
+
+        xs = self.get_transform().transform([(column[1], 0) for column in self.columns])[:, 0]
+        pixels = renderer.points_to_pixels(1)
+        order = sorted(range(len(self.columns)), key=lambda i: (self.columns[i][3], xs[i]))
+        intervals = {}
+        visible = set()
+        for i in order:
+            group, x, width, priority = self.columns[i]
+            start = xs[i] - width * pixels / 2
+            end = xs[i] + width * pixels / 2
+            starts, ends = intervals.setdefault(group, ([], []))
+            pos = bisect(starts, start)
+            if priority > 0 and ((pos > 0 and ends[pos - 1] > start) or (pos < len(starts) and starts[pos] < end)):
+                continue
+            starts.insert(pos, start)
+            ends.insert(pos, end)
+            visible.add(i)
+
+        return visible
+
+
+    @allow_rasterization
+    def draw(self, renderer):
+
+        if not self.get_visible():
+            return
+
+        visible = self.get_visible_columns(renderer)
+        for text in self.styles.values():
+            text.set_figure(self.figure)
+            text.set_transform(self.get_transform())
+
+        for x, y, string, style, column in self.texts:
+            if column is not None and column not in visible:
+                continue
+            text = self.styles[style]
+            text.set_position((x, y))
+            text.set_text(string)
+            text.draw(renderer)
+
+        self.stale = False
+
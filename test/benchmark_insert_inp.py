@@ -0,0 +1,182 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import importlib
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+# Import plugin as a package, whatever its folder name is
+plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+package_name = os.path.basename(plugin_dir)
+sys.path.append(os.path.dirname(plugin_dir))
+PgDao = importlib.import_module(f"{package_name}.dao.pg_dao").PgDao
+UpdateSQL = importlib.import_module(f"{package_name}.actions.update_sql").UpdateSQL
+
+
+class ControllerDummy(object):
+    """ Methods of DaoController used by insert_inp_into_db, executed with PgDao """
+
+    def __init__(self, conn_string):
+
+        self.dao = PgDao()
+        self.dao.set_conn_string(conn_string)
+        if not self.dao.init_db():
+            raise RuntimeError(self.dao.last_error)
+
+
+    def execute_sql(self, sql, commit=True, **kwargs):
+
+        status = self.dao.execute_sql(sql, commit)
+        if not status:
+            raise RuntimeError(self.dao.last_error)
+        return status
+
+
+    def copy_expert(self, sql, file, log_sql=False, commit=True):
+
+        error = self.dao.copy_expert(sql, file, commit)
+        if error:
+            raise RuntimeError(error)
+        return True
+
+
+    def log_info(self, *args, **kwargs):
+        pass
+
+
+class TaskDummy(object):
+
+    def set_progress_rate(self, progress, rows, elapsed):
+        pass
+
+
+def write_inp_file(filepath, total):
+    """ Write INP file with @total junctions, conduits and coordinates, like the exported by go2epa """
+
+    with open(filepath, 'w', encoding='utf8') as f:
+        f.write("[TITLE]\n;;Project Title/Notes\nbenchmark\n\n[OPTIONS]\nFLOW_UNITS           CMS\n\n")
+        f.write("[JUNCTIONS]\n;;Name           Elevation  MaxDepth   InitDepth  SurDepth   Aponded\n")
+        f.write(";;-------------- ---------- ---------- ---------- ---------- ----------\n")
+        for i in range(total):
+            f.write(f"N{i:<16}{random.uniform(10, 90):<11.3f}{random.uniform(1, 5):<11.3f}0          0          0\n")
+        f.write("\n[CONDUITS]\n;;Name           From Node        To Node          Length     Roughness\n")
+        for i in range(total - 1):
+            f.write(f"A{i:<16}N{i:<16}N{i + 1:<16}{random.uniform(5, 80):<11.2f}0.0130\t0\t0\t0\t0\n")
+        f.write("\n[COORDINATES]\n;;Node           X-Coord            Y-Coord\n")
+        for i in range(total):
+            f.write(f"N{i:<16}{random.uniform(418000, 421000):<19.3f}{random.uniform(4576000, 4579000):.3f}\n")
+        # Token null is loaded as text, only empty values are loaded as NULL
+        f.write("\n[TAGS]\nNode  N1  null\n")
+        f.write("\n[TEMPERATURE]\nTIMESERIES T1\n\n[CONTROLS]\nRULE R1\nIF NODE N1 DEPTH > 2\n")
+
+
+def insert_inp_into_db_old(update_sql, folder_path):
+    """ Previous implementation of UpdateSQL.insert_inp_into_db: INSERT statements sent every 500 lines """
+
+    _file = open(folder_path, "r+", encoding='utf8')
+    full_file = _file.readlines()
+    sql = ""
+    progress = 0
+    target = ""
+    for row in full_file:
+        progress += 1
+        row = row.rstrip()
+        if len(row) == 0:
+            continue
+        if str(row[0]) == "[":
+            target = str(row)
+        if target in ('[TRANSECTS]', '[CONTROLS]', '[RULES]'):
+            sp_n = [row]
+        elif target in ('[EVAPORATION]', '[TEMPERATURE]'):
+            sp_n = re.split(' |\t', row, 1)
+        else:
+            if str(row[0]) != ';':
+                list_aux = row.split("\t")
+                dirty_list = []
+                for x in range(0, len(list_aux)):
+                    aux = list_aux[x].split(" ")
+                    for i in range(len(aux)):
+                        dirty_list.append(aux[i])
+            else:
+                dirty_list = [row]
+
+            for x in range(len(dirty_list) - 1, -1, -1):
+                if dirty_list[x] == '' or "**" in dirty_list[x] or "--" in dirty_list[x] or dirty_list[x] == '; '\
+                        or dirty_list[x] == ';' or dirty_list[x] == ';\n':
+                    dirty_list.pop(x)
+            sp_n = dirty_list
+
+        if len(sp_n) > 0:
+            sql += "INSERT INTO temp_csv (fid, source, "
+            values = "VALUES(239, $$" + target + "$$, "
+            for x in range(0, len(sp_n)):
+                if "''" not in sp_n[x]:
+                    sql += "csv" + str(x + 1) + ", "
+                    value = "$$" + sp_n[x].strip().replace("\n", "") + "$$, "
+                    values += value.replace("$$$$", "null")
+                else:
+                    sql += "csv" + str(x + 1) + ", "
+                    values = "VALUES(null, "
+            sql = sql[:-2] + ") "
+            values = values[:-2] + ");\n"
+            sql += values
+
+        if progress % 500 == 0:
+            update_sql.controller.execute_sql(sql, commit=update_sql.dev_user)
+            sql = ""
+
+    if sql != "":
+        update_sql.controller.execute_sql(sql, commit=update_sql.dev_user)
+
+    _file.close()
+
+
+def get_loaded_rows(controller):
+
+    columns = ', '.join(f'csv{x + 1}' for x in range(15))
+    return controller.dao.get_rows(f"SELECT fid, source, {columns} FROM temp_csv ORDER BY id")
+
+
+def run_benchmark(conn_string, total=100000):
+
+    controller = ControllerDummy(conn_string)
+    columns = ', '.join(f'csv{x + 1} text' for x in range(40))
+    controller.execute_sql(f"CREATE TEMP TABLE temp_csv (id serial PRIMARY KEY, fid integer, source text, {columns})")
+
+    # Previous implementation runs methods of UpdateSQL, so it's used without calling its constructor
+    update_sql = UpdateSQL.__new__(UpdateSQL)
+    update_sql.controller = controller
+    update_sql.task1 = TaskDummy()
+    update_sql.dev_user = 'TRUE'
+
+    filepath = os.path.join(tempfile.mkdtemp(), 'benchmark.inp')
+    write_inp_file(filepath, total)
+    print(f"INP file: {os.path.getsize(filepath) / 1024 / 1024:.1f} MB, {3 * total} rows")
+
+    results = {}
+    for name, function in (('INSERT every 500 lines', insert_inp_into_db_old),
+                           ('COPY', UpdateSQL.insert_inp_into_db)):
+        controller.execute_sql("TRUNCATE temp_csv RESTART IDENTITY")
+        time_start = time.time()
+        function(update_sql, filepath)
+        elapsed = time.time() - time_start
+        results[name] = get_loaded_rows(controller)
+        print(f"    {name:<24} {elapsed:6.2f} s  {len(results[name])} rows")
+
+    old, new = results.values()
+    print(f"Same rows loaded: {[tuple(row) for row in old] == [tuple(row) for row in new]}")
+
+
+if __name__ == '__main__':
+
+    # Connection string, e.g. "host=localhost dbname=gis user=postgres". Default uses libpq environment variables
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else '')
+
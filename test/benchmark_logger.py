@@ -0,0 +1,77 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import inspect
+import logging
+import os
+import sys
+import tempfile
+import timeit
+
+# Logger folder is created into user folder
+os.environ['HOME'] = tempfile.mkdtemp()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dao.logger import Logger
+
+
+class ControllerDummy(object):
+
+    plugin_name = 'giswater_benchmark'
+
+    def log_info(self, *args, **kwargs):
+        pass
+
+    def log_warning(self, *args, **kwargs):
+        print(args)
+
+
+def log_inspect(logger, msg=None, log_level=logging.INFO, stack_level=2):
+    """ Previous implementation of Logger.log, based on inspect.stack() """
+
+    module_path = inspect.stack()[stack_level][1]
+    file_name = os.path.basename(module_path)
+    function_line = inspect.stack()[stack_level][2]
+    function_name = inspect.stack()[stack_level][3]
+    header = "{" + file_name + " | Line " + str(function_line) + " (" + str(function_name) + ")}"
+    text = header
+    if msg:
+        text += "\n" + str(msg)
+    logger.logger_file.log(log_level, text)
+
+
+def nested_call(function, depth=15):
+    """ Call @function from a stack of @depth frames, similar to a plugin call from QGIS """
+
+    if depth == 0:
+        return function()
+    return nested_call(function, depth - 1)
+
+
+def run_benchmark(number=2000):
+
+    controller = ControllerDummy()
+    results = {}
+    for use_queue in (False, True):
+        logger = Logger(controller, f'benchmark_{use_queue}', logging.INFO, '%Y%m%d', use_queue=use_queue)
+        old = timeit.timeit(lambda: nested_call(lambda: log_inspect(logger, "message", stack_level=2)),
+                            number=number)
+        new = timeit.timeit(lambda: nested_call(lambda: logger.info("message")), number=number)
+        disabled = timeit.timeit(lambda: nested_call(lambda: logger.debug("message")), number=number)
+        logger.close_logger()
+        results[use_queue] = (old, new, disabled)
+
+    for use_queue, (old, new, disabled) in results.items():
+        print(f"use_queue={use_queue}")
+        print(f"    inspect.stack():  {old * 1e6 / number:8.1f} us/call")
+        print(f"    sys._getframe():  {new * 1e6 / number:8.1f} us/call")
+        print(f"    disabled level:   {disabled * 1e6 / number:8.1f} us/call")
+
+
+if __name__ == '__main__':
+    run_benchmark()
+
@@ -0,0 +1,126 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+from qgis.core import QgsApplication, QgsFeature, QgsField, QgsGeometry, QgsProject, QgsVectorLayer
+from qgis.PyQt.QtCore import QVariant
+
+import importlib
+import os
+import random
+import sys
+import time
+
+# Import plugin as a package, whatever its folder name is
+plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(plugin_dir))
+AddLayer = importlib.import_module(f"{os.path.basename(plugin_dir)}.actions.add_layer").AddLayer
+
+
+class IfaceDummy(object):
+
+    def mapCanvas(self):
+        return None
+
+
+class ControllerDummy(object):
+    """ Attributes read by AddLayer.__init__. populate_vlayer doesn't use the database """
+
+    def __init__(self):
+
+        self.dao = None
+        self.schema_name = None
+
+
+    def log_info(self, *args, **kwargs):
+        pass
+
+
+def random_point():
+    return [round(random.uniform(418000, 421000), 3), round(random.uniform(4576000, 4579000), 3)]
+
+
+def random_ring(size=8):
+
+    ring = [random_point() for _ in range(size)]
+    return ring + [ring[0]]
+
+
+def get_data(geometry_type, total):
+    """ Build GeoJson like the returned by toolbox functions """
+
+    features = []
+    for index in range(total):
+        if geometry_type == 'Point':
+            geometry = {'type': 'Point', 'coordinates': random_point()}
+        elif geometry_type == 'LineString':
+            geometry = {'type': 'LineString', 'coordinates': [random_point() for _ in range(6)]}
+        else:
+            geometry = {'type': 'MultiPolygon', 'coordinates': [[random_ring(), random_ring()], [random_ring()]]}
+        properties = {'id': index, 'feature_id': str(index), 'length': random.random() * 100,
+                      'state': 1, 'descript': 'Feature checked'}
+        features.append({'type': 'Feature', 'geometry': geometry, 'properties': properties})
+
+    return {'layer': {'geometryType': geometry_type, 'features': features}}
+
+
+def populate_vlayer_wkt(add_layer, virtual_layer, data, layer_type):
+    """ Previous implementation of AddLayer.populate_vlayer: WKT string and addFeatures for every feature """
+
+    prov = virtual_layer.dataProvider()
+    virtual_layer.startEditing()
+    for key, value in list(data[layer_type]['features'][0]['properties'].items()):
+        prov.addAttributes([QgsField(str(key), QVariant.String)])
+
+    for feature in data[layer_type]['features']:
+        geometry_type = feature['geometry']['type']
+        coords = feature['geometry']['coordinates']
+        if geometry_type == 'Point':
+            wkt = f"Point({coords[0]} {coords[1]})"
+        elif geometry_type == 'LineString':
+            wkt = "LineString(" + ", ".join(f"{c[0]} {c[1]}" for c in coords) + ")"
+        else:
+            wkt = "MultiPolygon(" + ", ".join(
+                "(" + ", ".join("(" + ", ".join(f"{c[0]} {c[1]}" for c in ring) + ")" for ring in polygon) + ")"
+                for polygon in coords) + ")"
+        fet = QgsFeature()
+        fet.setGeometry(QgsGeometry.fromWkt(wkt))
+        fet.setAttributes(list(feature['properties'].values()))
+        prov.addFeatures([fet])
+
+    virtual_layer.commitChanges()
+
+
+def run_benchmark(total=50000):
+
+    add_layer = AddLayer(IfaceDummy(), None, ControllerDummy(), None)
+    for geometry_type in ('Point', 'LineString', 'MultiPolygon'):
+        data = get_data(geometry_type, total)
+
+        layer = QgsVectorLayer(f"{geometry_type}?crs=epsg:25831", 'wkt', 'memory')
+        time_start = time.time()
+        populate_vlayer_wkt(add_layer, layer, data, 'layer')
+        old = time.time() - time_start
+
+        layer = QgsVectorLayer(f"{geometry_type}?crs=epsg:25831", 'bulk', 'memory')
+        time_start = time.time()
+        add_layer.populate_vlayer(layer, data, 'layer', total)
+        new = time.time() - time_start
+
+        field_types = {field.typeName() for field in layer.fields()}
+        print(f"{geometry_type} ({total} features, {layer.featureCount()} loaded, field types {field_types})")
+        print(f"    wkt and addFeatures per feature:  {old:6.2f} s")
+        print(f"    bulk loader:                      {new:6.2f} s")
+        QgsProject.instance().removeAllMapLayers()
+
+
+if __name__ == '__main__':
+
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+    run_benchmark()
+    qgs.exitQgis()
+
@@ -0,0 +1,82 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+# Import plugin as a package, whatever its folder name is
+plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+package_name = os.path.basename(plugin_dir)
+sys.path.append(os.path.dirname(plugin_dir))
+
+
+def get_ui_files(ui_manager):
+    """ Get UI files of the form classes declared in ui_manager """
+
+    ui_files = set()
+    for value in vars(ui_manager).values():
+        if isinstance(value, type) and issubclass(value, ui_manager.LazyForm) and value.ui_file_path:
+            ui_files.add(value.ui_file_path)
+
+    return sorted(ui_files)
+
+
+def run_mode(mode):
+    """ Executed in a new Python process, so modules and form classes are not already loaded """
+
+    time_start = time.time()
+    if mode == 'eager':
+        # Previous import: uic.loadUiType for every UI file when module was imported
+        from qgis.PyQt import uic
+        ui_manager = importlib.import_module(f"{package_name}.ui_manager")
+        for ui_file_path in get_ui_files(ui_manager):
+            uic.loadUiType(ui_file_path)
+    elif mode == 'lazy':
+        ui_manager = importlib.import_module(f"{package_name}.ui_manager")
+    else:
+        # First use of every form, with generated code read from '__uicache__' or not
+        ui_manager = importlib.import_module(f"{package_name}.ui_manager")
+        for ui_file_path in get_ui_files(ui_manager):
+            ui_manager.load_form_class(ui_file_path)
+
+    print(f"{time.time() - time_start:.3f}")
+
+
+def measure(mode, repeat=3):
+
+    times = []
+    for _ in range(repeat):
+        if mode == 'forms_cold':
+            for folder in ('ui', os.path.join('ui', 'tm')):
+                shutil.rmtree(os.path.join(plugin_dir, folder, '__uicache__'), ignore_errors=True)
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), mode])
+        times.append(float(output.decode().strip().splitlines()[-1]))
+
+    return min(times)
+
+
+def run_benchmark():
+
+    print("Import of ui_manager (best of 3 new processes)")
+    print(f"    loadUiType of every form at import:      {measure('eager'):6.3f} s")
+    print(f"    lazy form classes:                        {measure('lazy'):6.3f} s")
+    print("First use of every form")
+    print(f"    generating code (no __uicache__):         {measure('forms_cold'):6.3f} s")
+    print(f"    code read from __uicache__:               {measure('forms_warm'):6.3f} s")
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1:
+        run_mode(sys.argv[1])
+    else:
+        run_benchmark()
+
@@ -0,0 +1,65 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+# Import plugin as a package, whatever its folder name is
+plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+package_name = os.path.basename(plugin_dir)
+
+# Stages of the plugin initialization and the modules they import
+STAGES = (
+    ('plugin load (classFactory + initGui)', ['giswater']),
+    ('project_read', ['actions.parent', 'actions.add_layer', 'actions.basic', 'actions.utils', 'actions.go2epa',
+                      'actions.om', 'actions.edit', 'actions.master', 'actions.mincut']),
+    ('first use of map tools', ['map_tools.cad_api_info', 'map_tools.draw_profiles', 'map_tools.dimensioning']),
+    ('first use of project manager', ['actions.update_sql']),
+)
+
+
+def get_import_times(modules):
+    """ Import @modules in a new process with '-X importtime'.
+        Return {module: (self ms, cumulative ms)} of the modules imported, in import order """
+
+    statements = '; '.join(f"import {package_name}.{module}" for module in modules)
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(plugin_dir) + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statements], env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times[module.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+
+    return times
+
+
+def run_profile(limit=15):
+
+    previous = []
+    for stage, modules in STAGES:
+        # Modules of previous stages are imported first, so times of this stage only include new modules
+        times = get_import_times(previous + modules)
+        loaded = get_import_times(previous) if previous else {}
+        new_times = {module: value for module, value in times.items() if module not in loaded}
+        total = sum(value[0] for value in new_times.values())
+        print(f"{stage}: {len(new_times)} modules, {total:.0f} ms")
+        for module, (self_ms, cumulative_ms) in sorted(new_times.items(), key=lambda item: -item[1][0])[:limit]:
+            print(f"    {self_ms:8.1f} ms self {cumulative_ms:8.1f} ms cumulative  {module}")
+        previous += modules
+
+
+if __name__ == '__main__':
+
+    run_profile()
+
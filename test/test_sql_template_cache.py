@@ -0,0 +1,60 @@
+"""
+This file is part of Giswater 3
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+# -*- coding: utf-8 -*-
+import importlib
+import os
+import sys
+
+# Import plugin as a package, whatever its folder name is
+plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(plugin_dir))
+SqlTemplateCache = importlib.import_module(
+    f"{os.path.basename(plugin_dir)}.dao.sql_template_cache").SqlTemplateCache
+
+
+def split(text):
+    """ Split @text with the smallest chunk size, so every statement boundary found ends a chunk """
+
+    chunks = SqlTemplateCache(chunk_size=1).split_chunks(text)
+    assert ''.join(chunks) == text
+    return chunks
+
+
+def test_statements():
+
+    assert split("SELECT 1;\nSELECT 2;\nSELECT 3") == ["SELECT 1;", "\nSELECT 2;", "\nSELECT 3"]
+
+
+def test_string_literals():
+
+    assert split("SELECT 'a;b';SELECT 'it''s;';") == ["SELECT 'a;b';", "SELECT 'it''s;';"]
+    assert split('SELECT 1 AS "x;y";SELECT 2;') == ['SELECT 1 AS "x;y";', 'SELECT 2;']
+
+
+def test_comments():
+
+    assert split("SELECT 1; -- comment; with 'quote\nSELECT 2;") == \
+        ["SELECT 1;", " -- comment; with 'quote\nSELECT 2;"]
+    assert split("SELECT 1 /* comment; 'quote */;SELECT 2;") == ["SELECT 1 /* comment; 'quote */;", "SELECT 2;"]
+
+
+def test_dollar_quotes():
+
+    function = ("CREATE FUNCTION f() RETURNS void AS $BODY$\nBEGIN\n  PERFORM 1; PERFORM $$a;b$$;\nEND;\n"
+                "$BODY$ LANGUAGE plpgsql;")
+    assert split(function + "\nSELECT 2;") == [function, "\nSELECT 2;"]
+    assert split("SELECT $$a;b$$;SELECT 2;") == ["SELECT $$a;b$$;", "SELECT 2;"]
+
+
+def test_escape_strings():
+
+    assert split(r"SELECT E'it\'s;';SELECT 2;") == [r"SELECT E'it\'s;';", "SELECT 2;"]
+    assert split(r"SELECT e'a\\';SELECT 'b;';") == [r"SELECT e'a\\';", "SELECT 'b;';"]
+    assert split(r"SELECT E'a''b\n;';SELECT 2;") == [r"SELECT E'a''b\n;';", "SELECT 2;"]
+    # Backslash doesn't escape in standard strings, also after an identifier ending with 'e'
+    assert split(r"SELECT 'a\';SELECT 2;") == [r"SELECT 'a\';", "SELECT 2;"]
+    assert split(r"SELECT name'a\';SELECT 2;") == [r"SELECT name'a\';", "SELECT 2;"]
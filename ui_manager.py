@@ -9,7 +9,10 @@ from qgis.PyQt import uic, QtCore
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QMainWindow, QDialog, QDockWidget, QWhatsThis, QLineEdit
 import configparser
+import io
 import os
+import tempfile
+import warnings
 import webbrowser
 
 
@@ -105,15 +108,108 @@ class GwMainWindow(QMainWindow):
         return False
 
 
+# Form classes generated from UI files {ui_file_path: form class}
+form_classes = {}
+
+
+def load_form_class(ui_file_path):
+    """ Get form class generated from @ui_file_path. Python code generated by uic is cached
+        in folder '__uicache__' next to the UI file and generated again if the file is modified """
+
+    form_class = form_classes.get(ui_file_path)
+    if form_class is not None:
+        return form_class
+
+    stat = os.stat(ui_file_path)
+    key = f"# {stat.st_mtime_ns} {stat.st_size}\n"
+    cache_folder = os.path.join(os.path.dirname(ui_file_path), '__uicache__')
+    cache_path = os.path.join(cache_folder, os.path.basename(ui_file_path)[:-3] + '.py')
+    source = None
+    try:
+        with open(cache_path, 'r', encoding='utf8') as f:
+            if f.readline() == key:
+                source = f.read()
+    except OSError:
+        pass
+
+    form_class = None
+    if source is not None:
+        try:
+            form_class = exec_form_source(source, ui_file_path)
+        except Exception:
+            # Cache file is corrupted or was generated by another version of uic
+            source = None
+
+    if source is None:
+        source = compile_form_source(ui_file_path)
+        write_form_cache(cache_folder, cache_path, key + source)
+        form_class = exec_form_source(source, ui_file_path)
+
+    form_classes[ui_file_path] = form_class
+    return form_class
+
+
+def compile_form_source(ui_file_path):
+    """ Generate Python code of @ui_file_path with uic """
+
+    stream = io.StringIO()
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        uic.compileUi(ui_file_path, stream)
+    return stream.getvalue()
+
+
+def exec_form_source(source, ui_file_path):
+    """ Execute Python code generated from @ui_file_path and get its form class """
+
+    ui_globals = {}
+    exec(compile(source, ui_file_path, 'exec'), ui_globals)
+    return [value for name, value in ui_globals.items() if name.startswith('Ui_') and isinstance(value, type)][0]
+
+
+def write_form_cache(cache_folder, cache_path, text):
+    """ Write @text to a temporary file replacing @cache_path when complete, so other QGIS instances
+        never read a partial file """
+
+    temp_path = None
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=cache_folder)
+        with os.fdopen(fd, 'w', encoding='utf8') as f:
+            f.write(text)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # Plugin folder is not writable: keep generated class only for this session
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+class LazyForm(object):
+    """ Form class whose UI file is loaded the first time a dialog of that class is set up """
+
+    ui_file_path = None
+
+    def setupUi(self, form):
+        load_form_class(self.ui_file_path).setupUi(self, form)
+
+
+    def retranslateUi(self, form):
+        load_form_class(self.ui_file_path).retranslateUi(self, form)
+
+
 def get_ui_class(ui_file_name, subfolder=None):
-    """ Get UI Python class from @ui_file_name """
+    """ Get UI Python class from @ui_file_name. UI file is not read until the class is used """
 
     # Folder that contains UI files
     ui_folder_path = os.path.dirname(__file__) + os.sep + 'ui'
     if subfolder:
         ui_folder_path += os.sep + subfolder
     ui_file_path = os.path.abspath(os.path.join(ui_folder_path, ui_file_name))
-    return uic.loadUiType(ui_file_path)[0]
+    name = os.path.splitext(ui_file_name)[0]
+    return type(f"LazyForm_{name}", (LazyForm,), {'ui_file_path': ui_file_path})
 
 
 FORM_CLASS = get_ui_class('docker.ui')